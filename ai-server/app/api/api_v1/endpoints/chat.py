@@ -88,7 +88,7 @@ async def chat_stream(
     """
     try:
         # Verify JWT and get user ID
-        user_id = auth_middleware.get_user_id_from_token(credentials)
+        user_id = await auth_middleware.get_user_id_from_token(credentials)
         logger.info(f"Chat request from user_id: {user_id}")
 
         # Chuẩn hóa message từ hai dạng payload
@@ -97,7 +97,7 @@ async def upload_file_to_file_search(
     """
     try:
         # Verify JWT and check admin permissions
-        user_id = auth_middleware.get_user_id_from_token(credentials)
+        user_id = await auth_middleware.get_user_id_from_token(credentials)
         # TODO: Add admin check if needed
         logger.info(f"File upload request from user_id: {user_id}")
 
@@ -277,7 +277,7 @@ async def get_file_status(
     """
     try:
         # Verify JWT
-        user_id = auth_middleware.get_user_id_from_token(credentials)
+        user_id = await auth_middleware.get_user_id_from_token(credentials)
         logger.info(
             f"File status request from user_id: {user_id} for file: {file_name}"
         )
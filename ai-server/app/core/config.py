@@ -20,6 +20,9 @@ class Settings(BaseSettings):
     # Use JWKS URL for asymmetric key verification (RS256/ES256)
     # Get from: https://your-project-ref.supabase.co/auth/v1/.well-known/jwks.json
     SUPABASE_JWKS_URL: str = ""
+    SUPABASE_JWKS_TTL_SECONDS: int = 600  # 10 minutes
+    # Verified-token LRU (entries expire at the token's exp). 0 = disabled
+    AUTH_TOKEN_CACHE_SIZE: int = 2048
 
     # Gemini AI Configuration
     # Get API key from Google AI Studio: https://aistudio.google.com/apikey
@@ -15,6 +15,7 @@ from contextlib import asynccontextmanager
 
 from .core.config import settings
 from .api.api_v1.api import api_router
+from .middleware.auth import auth_middleware
 
 # Setup logging
 logging.basicConfig(
@@ -36,6 +37,9 @@ async def lifespan(app: FastAPI):
     if not settings.FILE_SEARCH_STORE_NAME:
         logger.warning("FILE_SEARCH_STORE_NAME not configured")
 
+    # Prefetch Supabase JWKS (failures are logged and retried on demand)
+    await auth_middleware.warm_up()
+
     logger.info("AI Server started successfully")
 
     yield
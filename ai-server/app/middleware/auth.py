@@ -9,10 +9,13 @@ it only queries vector embeddings (not user-specific data).
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt, jwk
+from collections import OrderedDict
+import asyncio
+import hashlib
+import httpx
 import json
 import time
-import requests
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 import logging
 from ..core.config import settings
 
@@ -24,12 +27,28 @@ security = HTTPBearer()
 class AuthMiddleware:
     """JWT Authentication Middleware for AI Server"""
 
+    # Supported asymmetric algorithms by JWK key type
+    _SUPPORTED_KTY = {"RSA", "EC"}
+    # Minimum gap between JWKS fetch attempts, successful or not
+    _JWKS_RETRY_SECONDS = 30.0
+
     def __init__(self):
         # Supabase has migrated from Legacy JWT Secret to new JWT Signing Keys
         # Only JWKS URL is needed for asymmetric key verification (RS256/ES256)
         self.jwks_url = getattr(settings, "SUPABASE_JWKS_URL", "") or ""
-        self._jwks_cache: dict | None = None
-        self._jwks_cache_exp: float = 0.0
+        self.jwks_ttl = float(settings.SUPABASE_JWKS_TTL_SECONDS)
+        # Refresh in the background once the key set is this close to expiring
+        self.jwks_refresh_margin = min(60.0, self.jwks_ttl / 2)
+        self._jwks_fetched_at: float = 0.0
+        # -inf: the first fetch is never throttled (monotonic() may be small after boot)
+        self._jwks_last_attempt: float = float("-inf")
+        self._jwks_refresh_task: Optional[asyncio.Task] = None
+        # kid -> (pre-built key object, algorithm), rebuilt once per JWKS fetch
+        self._keys_by_kid: Dict[str, Tuple[Any, str]] = {}
+
+        # Verified tokens: sha256(token) -> (user_id, exp); LRU, dropped at exp
+        self._token_cache: "OrderedDict[bytes, Tuple[str, float]]" = OrderedDict()
+        self._token_cache_size = max(0, int(settings.AUTH_TOKEN_CACHE_SIZE))
 
         if not self.jwks_url:
             logger.warning(
@@ -38,27 +57,66 @@ class AuthMiddleware:
         else:
             logger.info(f"JWKS URL configured: {self.jwks_url}")
 
-    def _get_jwks(self) -> dict | None:
-        """Fetch and cache JWKS for 10 minutes."""
-        if not self.jwks_url:
-            return None
-        now = time.time()
-        if self._jwks_cache and now < self._jwks_cache_exp:
-            return self._jwks_cache
+    # ------------------------------------------------------------------
+    # JWKS (async fetch, background refresh, single-flight)
+    # ------------------------------------------------------------------
+    async def _fetch_jwks(self) -> None:
+        """Fetch JWKS and rebuild the kid -> key registry."""
+        self._jwks_last_attempt = time.monotonic()
         try:
-            resp = requests.get(self.jwks_url, timeout=5)
-            resp.raise_for_status()
-            self._jwks_cache = resp.json()
-            self._jwks_cache_exp = now + 600  # 10 minutes
-            return self._jwks_cache
+            async with httpx.AsyncClient(timeout=5.0) as client:
+                resp = await client.get(self.jwks_url)
+                resp.raise_for_status()
+                jwks = resp.json()
         except Exception as e:
             logger.warning(f"Failed to fetch JWKS: {e}")
-            return None
+            return
+
+        keys: Dict[str, Tuple[Any, str]] = {}
+        for key in jwks.get("keys", []):
+            kid = key.get("kid")
+            kty = key.get("kty")
+            if not kid:
+                continue
+            if kty not in self._SUPPORTED_KTY:
+                logger.warning(f"Unsupported JWKS kty: {kty}")
+                continue
+            alg = key.get("alg") or ("ES256" if kty == "EC" else "RS256")
+            try:
+                # Use jose.jwk to construct RSA/EC key from JWK (once per fetch)
+                keys[kid] = (jwk.construct(key, algorithm=alg), alg)
+            except Exception as e:
+                logger.warning(f"Failed to build key from JWK (kid={kid}): {e}")
+
+        self._keys_by_kid = keys
+        self._jwks_fetched_at = time.monotonic()
+        logger.debug(f"✅ JWKS loaded with {len(keys)} key(s)")
+
+    async def _refresh_jwks(self, wait: bool) -> None:
+        """Start a JWKS fetch unless one is already running (single-flight)."""
+        task = self._jwks_refresh_task
+        if task is None or task.done():
+            task = asyncio.create_task(self._fetch_jwks())
+            self._jwks_refresh_task = task
+        if wait:
+            # shield: a cancelled request must not cancel the shared fetch
+            await asyncio.shield(task)
+
+    def _jwks_fetch_allowed(self, now: float) -> bool:
+        """A fetch is running, or the last attempt (even a failed one) is old enough."""
+        task = self._jwks_refresh_task
+        if task is not None and not task.done():
+            return True
+        return now - self._jwks_last_attempt >= self._JWKS_RETRY_SECONDS
 
-    def _get_key_from_jwks(self, token: str):
+    async def warm_up(self) -> None:
+        """Prefetch JWKS at startup so the first chat request skips the fetch."""
+        if self.jwks_url:
+            await self._refresh_jwks(wait=True)
+
+    async def _get_key_from_jwks(self, token: str):
         """Resolve proper key from JWKS by kid"""
-        jwks = self._get_jwks()
-        if not jwks:
+        if not self.jwks_url:
             return None, None
         try:
             header = jwt.get_unverified_header(token)
@@ -66,56 +124,72 @@ class AuthMiddleware:
             logger.warning(f"Failed to parse JWT header: {e}")
             return None, None
         kid = header.get("kid")
-        alg = header.get("alg")
         # HS256 tokens won't have kid; skip JWKS
         if not kid:
             return None, None
-        if not kid or not alg:
+
+        # Every fetch path is throttled by _jwks_last_attempt: while Supabase is
+        # unreachable, requests fail fast instead of each waiting on a new fetch
+        now = time.monotonic()
+        if not self._keys_by_kid:
+            if self._jwks_fetch_allowed(now):
+                await self._refresh_jwks(wait=True)
+        elif (
+            now - self._jwks_fetched_at >= self.jwks_ttl - self.jwks_refresh_margin
+            and self._jwks_fetch_allowed(now)
+        ):
+            # Serve the current keys while refreshing in the background
+            await self._refresh_jwks(wait=False)
+
+        entry = self._keys_by_kid.get(kid)
+        if entry is None:
+            # Unknown kid (key rotation): join the running fetch, or refetch
+            # at most every 30 seconds so forged kids can't force a fetch each time
+            if self._jwks_fetch_allowed(now):
+                logger.info(f"JWKS cache miss for kid {kid}. Refreshing…")
+                await self._refresh_jwks(wait=True)
+                entry = self._keys_by_kid.get(kid)
+        if entry is None:
             return None, None
-        for key in jwks.get("keys", []):
-            if key.get("kid") == kid:
-                try:
-                    kty = key.get("kty")
-                    if kty == "RSA":
-                        # For RSA keys (RS256/RS384/RS512)
-                        try:
-                            # Use jose.jwk to construct RSA key from JWK
-                            key_obj = jwk.construct(key, algorithm=alg)
-                            logger.debug(
-                                f"✅ RSA key resolved (kty={kty}, alg={alg}, kid={kid})"
-                            )
-                            return key_obj, alg
-                        except Exception as e:
-                            logger.warning(f"Failed to parse RSA key from JWKS: {e}")
-                            return None, None
-                    elif kty == "EC":
-                        # For EC keys (ES256/ES384/ES512)
-                        # Key format: {"kty": "EC", "crv": "P-256", "x": "...", "y": "...", "alg": "ES256", "kid": "..."}
-                        try:
-                            # Use jose.jwk to construct EC key from JWK
-                            key_obj = jwk.construct(key, algorithm=alg)
-                            logger.debug(
-                                f"✅ EC key resolved (kty={kty}, crv={key.get('crv')}, alg={alg}, kid={kid})"
-                            )
-                            return key_obj, alg
-                        except Exception as e:
-                            logger.warning(f"Failed to parse EC key from JWKS: {e}")
-                            return None, None
-                    else:
-                        logger.warning(f"Unsupported JWKS kty: {kty}")
-                        return None, None
-                except Exception as e:
-                    logger.warning(f"Failed to build key from JWK: {e}")
-                    return None, None
-        return None, None
-
-    def verify_token(self, token: str) -> Optional[str]:
+        return entry
+
+    # ------------------------------------------------------------------
+    # Verified-token cache
+    # ------------------------------------------------------------------
+    def _cache_get(self, cache_key: bytes) -> Optional[str]:
+        entry = self._token_cache.get(cache_key)
+        if entry is None:
+            return None
+        user_id, exp = entry
+        if exp <= time.time():
+            del self._token_cache[cache_key]
+            return None
+        self._token_cache.move_to_end(cache_key)
+        return user_id
+
+    def _cache_set(self, cache_key: bytes, user_id: str, exp: Any) -> None:
+        if not self._token_cache_size or not isinstance(exp, (int, float)):
+            return
+        if exp <= time.time():
+            return
+        self._token_cache[cache_key] = (user_id, float(exp))
+        self._token_cache.move_to_end(cache_key)
+        while len(self._token_cache) > self._token_cache_size:
+            self._token_cache.popitem(last=False)
+
+    async def verify_token(self, token: str) -> Optional[str]:
         """
         Verify JWT token and return user ID as string.
 
         Supabase has migrated from Legacy JWT Secret (HS256) to new JWT Signing Keys (RS256/ES256).
         Only RS256/ES256 tokens are supported, verified using JWKS (SUPABASE_JWKS_URL).
+        Repeat calls with an already verified token are served from cache until `exp`.
         """
+        cache_key = hashlib.sha256(token.encode("utf-8")).digest()
+        cached_user_id = self._cache_get(cache_key)
+        if cached_user_id is not None:
+            return cached_user_id
+
         try:
             # Step 1: Read token header to detect algorithm
             try:
@@ -143,7 +217,7 @@ class AuthMiddleware:
                     )
 
                 logger.debug(f"Token uses {token_alg}, verifying with JWKS")
-                key_obj, algo = self._get_key_from_jwks(token)
+                key_obj, algo = await self._get_key_from_jwks(token)
 
                 if not key_obj or not algo:
                     raise JWTError(
@@ -169,6 +243,7 @@ class AuthMiddleware:
             # Supabase JWT may not have 'type' field. Accept if 'sub' exists.
             if user_id and (token_type == "access" or token_type is None):
                 # Return as string to support both UUID and integer IDs
+                self._cache_set(cache_key, str(user_id), payload.get("exp"))
                 return str(user_id)
             return None
 
@@ -199,13 +274,13 @@ class AuthMiddleware:
             # Don't log configured secrets on failure (only log successful ones)
             return None
 
-    def get_user_id_from_token(
+    async def get_user_id_from_token(
         self,
         credentials: HTTPAuthorizationCredentials = Depends(security),
     ) -> str:
         """Get user ID from JWT token"""
         token = credentials.credentials
-        user_id = self.verify_token(token)
+        user_id = await self.verify_token(token)
 
         if not user_id:
             raise HTTPException(
@@ -19,12 +19,13 @@ from ....schemas.admin import (
     RoleUpdateRequest,
     UserListResponse,
 )
-from ....core.database import get_db_session_read, engine_write, engine_read
+from ....core.database import get_db_session_read, get_write_engine, get_read_engine
 from ....core.supabase_client import get_supabase_client
 from ....core.config import settings
 from ....middleware.auth import (
     AuthenticatedUser,
     get_current_admin_user,
+    invalidate_user_profile,
 )
 from ....middleware.rate_limiter import clear_rate_limit_store
 from ....utils.auth_metadata import (
@@ -146,6 +147,7 @@ def set_user_role(
                 "app_metadata": {"user_role": target_role},
             },
         )
+        invalidate_user_profile(user_id)
         logger.info(
             "User %s role updated to '%s' by admin %s",
             user_id_str,
@@ -677,7 +679,7 @@ async def list_users(
     status_code=status.HTTP_200_OK,
     dependencies=[Depends(get_current_admin_user)],
 )
-def clear_rate_limit(
+async def clear_rate_limit(
     current_user: AuthenticatedUser = Depends(get_current_admin_user),
 ):
     """
@@ -690,7 +692,7 @@ def clear_rate_limit(
         Success message
     """
     try:
-        clear_rate_limit_store()
+        await clear_rate_limit_store()
         logger.info("Rate limit store cleared by admin %s", current_user.user_id)
         return {"message": "Rate limit store cleared successfully"}
     except Exception as e:
@@ -836,11 +838,9 @@ async def get_metrics_json(
         from ....main import (
             prometheus_available,
             http_requests_total,
-            http_request_duration_seconds,
-            http_requests_in_progress,
-            http_errors_total,
             app_uptime_seconds,
             app_start_time,
+            latency_windows,
         )
         
         if not prometheus_available or not settings.PROMETHEUS_ENABLED:
@@ -860,50 +860,49 @@ async def get_metrics_json(
             "enabled": True,
             "timestamp": time.time(),
             "http": {},
+            "latency": {},
             "database": {},
             "application": {},
         }
         
-        # HTTP Request metrics
+        # HTTP Request metrics (tổng trên mọi route, mọi worker khi chạy multiprocess)
         try:
-            # Get counter values
-            requests_total = http_requests_total._value.get() if http_requests_total else 0
-            requests_in_progress = http_requests_in_progress._value.get() if http_requests_in_progress else 0
-            errors_total = http_errors_total._value.get() if http_errors_total else 0
-            
-            # Get average duration from histogram
-            avg_duration = 0
-            if http_request_duration_seconds:
-                try:
-                    samples = http_request_duration_seconds.collect()[0].samples
-                    if samples:
-                        total = sum(s.value for s in samples)
-                        count = len(samples)
-                        avg_duration = total / count if count > 0 else 0
-                except Exception:
-                    pass
-            
+            duration_count = _sum_samples("http_request_duration_seconds", "_count")
+            duration_sum = _sum_samples("http_request_duration_seconds", "_sum")
             metrics_data["http"] = {
-                "requests_total": requests_total,
-                "requests_in_progress": requests_in_progress,
-                "errors_total": errors_total,
-                "avg_duration_seconds": round(avg_duration, 4),
+                "requests_total": _sum_samples("http_requests", "_total"),
+                "requests_in_progress": _sum_samples("http_requests_in_progress"),
+                "errors_total": _sum_samples("http_errors", "_total"),
+                "avg_duration_seconds": round(duration_sum / duration_count, 4)
+                if duration_count
+                else 0,
             }
         except Exception as e:
             logger.warning(f"Error collecting HTTP metrics: {e}")
             metrics_data["http"] = {"error": str(e)}
         
+        # p50/p95/p99 theo route template trong 1/5/60 phút gần nhất
+        try:
+            if latency_windows is not None:
+                metrics_data["latency"] = latency_windows.summarize()
+        except Exception as e:
+            logger.warning(f"Error computing latency percentiles: {e}")
+            metrics_data["latency"] = {"error": str(e)}
+        
         # Database metrics
         try:
             db_metrics = {
                 "connections": {},
             }
             
+            engine_write = get_write_engine()
+            engine_read = get_read_engine()
+
             # Write pool
             if engine_write and hasattr(engine_write, "pool"):
                 pool = engine_write.pool
                 try:
-                    active = pool.size() - pool.checkedout()  # type: ignore
+                    active = pool.checkedout()  # type: ignore
                     idle = pool.checkedin()  # type: ignore
                     db_metrics["connections"]["write"] = {
                         "active": active,
@@ -917,7 +916,7 @@ async def get_metrics_json(
             if engine_read and hasattr(engine_read, "pool"):
                 pool = engine_read.pool
                 try:
-                    active = pool.size() - pool.checkedout()  # type: ignore
+                    active = pool.checkedout()  # type: ignore
                     idle = pool.checkedin()  # type: ignore
                     db_metrics["connections"]["read"] = {
                         "active": active,
@@ -965,6 +964,17 @@ async def get_metrics_json(
         )
 
 
+def _sum_samples(family_name: str, suffix: str = "") -> float:
+    """Sum every sample of a metric family, e.g. all `http_requests_total` series."""
+    from ....core.metrics import collect_family
+
+    family = collect_family(family_name)
+    if family is None:
+        return 0
+    sample_name = family_name + suffix
+    return sum(s.value for s in family.samples if s.name == sample_name)
+
+
 def _format_uptime(seconds: float) -> str:
     """Format uptime in human-readable format"""
     days = int(seconds // 86400)
@@ -19,7 +19,7 @@ from fastapi import (
 from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 import logging
 import httpx
 import re
@@ -36,6 +36,7 @@ from ....schemas.admin import (
 )
 from ....core.database import get_db_session_write, get_db_session_read
 from ....core.config import settings
+from ....core.serialization import trusted_list_response, validate_list
 from ....middleware.auth import (
     AuthenticatedUser,
     get_current_admin_user,
@@ -113,11 +114,11 @@ def _get_status_text(status: FileSearchStatus) -> str:
     return status_map.get(status, "Chưa xử lý")
 
 
-def _build_ai_data_response(
+def _ai_data_fields(
     gemini_file: GeminiFile, subject_name: Optional[str] = None
-) -> AIDataItemResponse:
-    """Build AIDataItemResponse from GeminiFile model"""
-    return AIDataItemResponse(
+) -> Dict[str, Any]:
+    """AIDataItemResponse fields for a GeminiFile row (shared by single and bulk paths)"""
+    return dict(
         id=gemini_file.id,  # type: ignore
         title=gemini_file.title,  # type: ignore
         description=gemini_file.description,  # type: ignore
@@ -141,6 +142,13 @@ def _build_ai_data_response(
     )
 
 
+def _build_ai_data_response(
+    gemini_file: GeminiFile, subject_name: Optional[str] = None
+) -> AIDataItemResponse:
+    """Build AIDataItemResponse from GeminiFile model"""
+    return AIDataItemResponse(**_ai_data_fields(gemini_file, subject_name))
+
+
 def _map_gemini_state_to_status(state: str) -> FileSearchStatus:
     """
     Map Gemini File Search state to our status enum.
@@ -423,14 +431,20 @@ async def list_ai_files(
             subject_map = {s.id: s.name for s in subjects}
 
         # Build response
-        responses = []
-        for gf in gemini_files:
-            subject_name: Optional[str] = None
-            if gf.subject_id is not None:
-                subject_name = subject_map.get(gf.subject_id)  # type: ignore
-            responses.append(_build_ai_data_response(gf, subject_name))
+        responses = validate_list(
+            AIDataItemResponse,
+            [
+                _ai_data_fields(
+                    gf,
+                    subject_map.get(gf.subject_id)  # type: ignore
+                    if gf.subject_id is not None
+                    else None,
+                )
+                for gf in gemini_files
+            ],
+        )
 
-        return responses
+        return trusted_list_response(AIDataItemResponse, responses)
 
     except HTTPException:
         raise
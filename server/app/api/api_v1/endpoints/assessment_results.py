@@ -170,7 +170,7 @@ async def get_student_results(
         result = await db.execute(query)
         results = result.scalars().all()
 
-        logger.info("Fetched %s results for student %s", len(results), student_id)
+        logger.debug("Fetched %s results for student %s", len(results), student_id)
         return [AssessmentResultResponse.model_validate(r) for r in results]
 
     except HTTPException:
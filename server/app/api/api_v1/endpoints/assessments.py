@@ -6,6 +6,7 @@ import random
 import logging
 
 from ....core.database import get_db_session_write, get_db_session_read
+from ....core.serialization import trusted_list_response, validate_list
 from ....middleware.auth import (
     AuthenticatedUser,
     get_current_authenticated_user,
@@ -80,20 +81,13 @@ async def list_assessments(
     result = await db.execute(query)
     rows = result.all()
 
-    assessments: List[AssessmentSchema] = []
-    for assessment, subj_code, subj_name, questions_count in rows:
-        base_data = AssessmentSchema.model_validate(
-            assessment, from_attributes=True
-        ).model_dump()
-        base_data.update(
-            {
-                "subject_code": subj_code,
-                "subject_name": subj_name,
-                "questions_count": questions_count or 0,
-            }
-        )
-        assessments.append(AssessmentSchema(**base_data))
-    return assessments
+    # Validate cả trang trong một lần gọi rồi gán các cột join (đã đúng kiểu)
+    assessments = validate_list(AssessmentSchema, [row[0] for row in rows])
+    for item, (_, subj_code, subj_name, questions_count) in zip(assessments, rows):
+        item.subject_code = subj_code
+        item.subject_name = subj_name
+        item.questions_count = questions_count or 0
+    return trusted_list_response(AssessmentSchema, assessments)
 
 
 @router.post("/", response_model=AssessmentSchema)
@@ -12,6 +12,7 @@ from ....models.user import Profile
 from ....middleware.auth import (
     AuthenticatedUser,
     get_current_authenticated_user,
+    invalidate_user_profile,
 )
 
 logger = logging.getLogger(__name__)
@@ -206,6 +207,7 @@ async def oauth_google(
                     setattr(profile, "full_name", oauth_data.full_name)  # type: ignore[arg-type]
                     await db.commit()
                     await db.refresh(profile)
+                    invalidate_user_profile(user_uuid)
                     logger.info(
                         f"Updated Profile for user {user_uuid} ({oauth_data.email})"
                     )
@@ -21,6 +21,7 @@ import logging
 from uuid import UUID
 
 from ....core.database import get_db_session_write, get_db_session_read
+from ....core.serialization import trusted_list_response, validate_list
 from ....core.supabase_client import get_supabase_client
 from ....middleware.auth import (
     AuthenticatedUser,
@@ -104,7 +105,8 @@ def _has_instructor_access(role: Optional[str]) -> bool:
     return (role or "").lower() == "instructor"
 
 
-def _material_to_response(material: Material) -> LectureResponse:
+def _material_fields(material: Material) -> dict[str, Any]:
+    """LectureResponse fields for a Material row (shared by single and bulk paths)."""
     subject = getattr(material, "subject", None)
     uploader = getattr(material, "uploader", None)
     metadata = _normalize_metadata(getattr(material, "file_metadata", None))
@@ -128,7 +130,7 @@ def _material_to_response(material: Material) -> LectureResponse:
     created_at = getattr(material, "created_at", None)
     updated_at = getattr(material, "updated_at", None)
 
-    return LectureResponse(
+    return dict(
         id=int(getattr(material, "id")),
         title=getattr(material, "title"),
         description=getattr(material, "description", None),
@@ -151,6 +153,10 @@ def _material_to_response(material: Material) -> LectureResponse:
     )
 
 
+def _material_to_response(material: Material) -> LectureResponse:
+    return LectureResponse(**_material_fields(material))
+
+
 async def _library_document_to_lecture_response(
     document: LibraryDocument,
     db: AsyncSession,
@@ -339,13 +345,13 @@ async def list_lectures(
         result = await db.execute(query)
         lectures = result.scalars().all()
 
-        logger.info(f"Found {len(lectures)} lectures after filtering")
-        if len(lectures) == 0:
+        logger.debug("Found %s lectures after filtering", len(lectures))
+        if len(lectures) == 0 and logger.isEnabledFor(logging.DEBUG):
             # Debug: Check if there are any materials at all
             debug_query = select(func.count(Material.id))
             debug_result = await db.execute(debug_query)
             total_materials = debug_result.scalar()
-            logger.info(f"Total materials in database: {total_materials}")
+            logger.debug("Total materials in database: %s", total_materials)
 
             # Check materials with file_metadata
             debug_query2 = select(func.count(Material.id)).where(
@@ -353,29 +359,36 @@ async def list_lectures(
             )
             debug_result2 = await db.execute(debug_query2)
             materials_with_metadata = debug_result2.scalar()
-            logger.info(f"Materials with file_metadata: {materials_with_metadata}")
+            logger.debug("Materials with file_metadata: %s", materials_with_metadata)
 
             # Debug: Check actual file_metadata values
             debug_query3 = select(Material.id, Material.title, Material.file_metadata)
             debug_result3 = await db.execute(debug_query3)
             all_materials = debug_result3.all()
             for mat in all_materials:
-                logger.info(
-                    f"Material ID {mat.id} ({mat.title}): file_metadata = {mat.file_metadata}"
+                logger.debug(
+                    "Material ID %s (%s): file_metadata = %s",
+                    mat.id,
+                    mat.title,
+                    mat.file_metadata,
                 )
                 if mat.file_metadata and isinstance(mat.file_metadata, dict):
                     uploaded_for = mat.file_metadata.get("uploaded_for")
-                    logger.info(
-                        f"  -> uploaded_for value: {uploaded_for} (type: {type(uploaded_for)})"
+                    logger.debug(
+                        "  -> uploaded_for value: %s (type: %s)",
+                        uploaded_for,
+                        type(uploaded_for),
                     )
 
         # Convert to response format
-        lecture_list = [_material_to_response(material) for material in lectures]
+        lecture_list = validate_list(
+            LectureResponse, [_material_fields(material) for material in lectures]
+        )
 
-        logger.info(
+        logger.debug(
             "Retrieved %s lectures for user %s", len(lecture_list), current_user.user_id
         )
-        return lecture_list
+        return trusted_list_response(LectureResponse, lecture_list)
 
     except Exception as e:
         logger.error(f"Error listing lectures: {e}")
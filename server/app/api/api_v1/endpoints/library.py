@@ -11,15 +11,19 @@ from fastapi import (
     File,
     Form,
     Query,
+    Request,
+    Response,
 )
-from typing import List, Optional
+from fastapi.routing import APIRoute
+from typing import Callable, Coroutine, Any, List, Optional
 from datetime import datetime
+import hashlib
 import logging
 import aiofiles
 from pathlib import Path
 import uuid
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, desc, func as sql_func, delete
+from sqlalchemy import select, and_, desc, func as sql_func, delete, update
 
 from ....models.library import (
     LibraryDocument,
@@ -41,7 +45,15 @@ from ....schemas.library import (
     SubjectResponse,
     LibraryStatisticsResponse,
 )
-from ....core.database import get_db_session_write, get_db_session_read
+from ....core.catalog_versions import catalog_version, conditional_get
+from ....core.config import settings
+from ....core.response_cache import response_cache
+from ....core.serialization import validate_list
+from ....core.database import (
+    get_db_session_write,
+    get_db_session_read,
+    execute_on_primary,
+)
 from ....middleware.auth import (
     AuthenticatedUser,
     get_current_authenticated_user,
@@ -51,7 +63,34 @@ from ....middleware.auth import (
 )
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+
+
+class _UploadSizeLimitedRoute(APIRoute):
+    """
+    Rejects multipart requests whose Content-Length is over the upload limit.
+
+    FastAPI reads the whole form into temporary files before the endpoint or
+    its dependencies run, so the check has to wrap the route handler itself.
+    Chunked requests (no Content-Length) are only limited while copying.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def size_limited_handler(request: Request) -> Response:
+            if request.headers.get("content-type", "").startswith("multipart/form-data"):
+                length = request.headers.get("content-length", "")
+                if length.isdigit() and int(length) > MAX_FILE_SIZE + UPLOAD_FORM_OVERHEAD:
+                    raise HTTPException(
+                        status_code=http_status.HTTP_413_CONTENT_TOO_LARGE,
+                        detail=f"File quá lớn. Tối đa {MAX_FILE_SIZE // (1024 * 1024)}MB",
+                    )
+            return await handler(request)
+
+        return size_limited_handler
+
+
+router = APIRouter(route_class=_UploadSizeLimitedRoute)
 
 
 def _is_admin(user: AuthenticatedUser) -> bool:
@@ -66,7 +105,11 @@ def _is_supervisor(user: AuthenticatedUser) -> bool:
 UPLOAD_DIR = Path("uploads/library")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
+MAX_FILE_SIZE = settings.UPLOAD_MAX_SIZE
+# Đọc/ghi từng khối cố định: RAM mỗi upload không phụ thuộc kích thước file
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+# Phần dư cho các trường form khác (content_html, tags, ...) và boundary multipart
+UPLOAD_FORM_OVERHEAD = 1024 * 1024  # 1MB
 ALLOWED_EXTENSIONS = {
     # Documents
     ".pdf",
@@ -147,10 +190,48 @@ def validate_file(file: UploadFile) -> tuple[bool, str]:
     return True, "OK"
 
 
+async def write_upload_stream(
+    file: UploadFile,
+    destination: Path,
+    max_size: int = MAX_FILE_SIZE,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> tuple[int, str]:
+    """
+    Stream `file` to `destination` chunk by chunk and return (size, sha256 hex).
+
+    The body has already been received (Starlette spools multipart files to
+    a temporary file; oversized requests with a Content-Length are refused
+    earlier by _UploadSizeLimitedRoute). This copy stops with 413 once more
+    than `max_size` bytes have been read, and on any failure the partially
+    written file is removed.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(destination, "wb") as f:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        status_code=http_status.HTTP_413_CONTENT_TOO_LARGE,
+                        detail=f"File quá lớn. Tối đa {max_size // (1024 * 1024)}MB",
+                    )
+                digest.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        # Kể cả khi client ngắt giữa chừng (CancelledError): không để file dở dang
+        destination.unlink(missing_ok=True)
+        raise
+    return size, digest.hexdigest()
+
+
 async def save_uploaded_file(
     file: UploadFile, subject_code: str
-) -> tuple[str, str, int]:
-    """Save uploaded file and return (file_path, file_url, file_size)"""
+) -> tuple[str, str, int, str]:
+    """Save uploaded file and return (file_path, file_url, file_size, sha256)"""
     if not file.filename:
         raise HTTPException(
             status_code=http_status.HTTP_400_BAD_REQUEST,
@@ -166,18 +247,14 @@ async def save_uploaded_file(
     subject_dir.mkdir(exist_ok=True)
 
     file_path = subject_dir / unique_filename
-    file_size = 0
 
     # Save file
-    async with aiofiles.open(file_path, "wb") as f:
-        content = await file.read()
-        file_size = len(content)
-        await f.write(content)
+    file_size, sha256 = await write_upload_stream(file, file_path)
 
     # Generate file URL (relative to uploads directory)
     file_url = f"/uploads/library/{subject_code}/{unique_filename}"
 
-    return str(file_path), file_url, file_size
+    return str(file_path), file_url, file_size, sha256
 
 
 # ===============================
@@ -187,6 +264,8 @@ async def save_uploaded_file(
 
 @router.get("/public/documents/", response_model=List[LibraryDocumentResponse])
 async def get_public_documents(
+    request: Request,
+    response: Response,
     subject_code: Optional[str] = Query(None),
     document_type: Optional[DocumentType] = Query(None),
     author: Optional[str] = Query(None),
@@ -195,7 +274,11 @@ async def get_public_documents(
     db: AsyncSession = Depends(get_db_session_read),
 ):
     """Get published library documents (public access)"""
-    try:
+    not_modified = await conditional_get(request, response, db, LibraryDocument)
+    if not_modified is not None:
+        return not_modified
+
+    async def load() -> List[LibraryDocumentResponse]:
         query = select(LibraryDocument).where(
             LibraryDocument.status == DocumentStatus.PUBLISHED
         )
@@ -212,9 +295,27 @@ async def get_public_documents(
         )
 
         result = await db.execute(query)
-        documents = result.scalars().all()
+        return validate_list(LibraryDocumentResponse, result.scalars().all())
 
-        return [LibraryDocumentResponse.model_validate(doc) for doc in documents]
+    try:
+        key = response_cache.key(
+            request.url.path,
+            subject_code=subject_code,
+            document_type=document_type,
+            author=author,
+            limit=limit,
+            skip=skip,
+        )
+        # Lọc theo môn: chỉ ghi vào tài liệu của môn đó mới làm mất entry
+        tags = [f"library:subject:{subject_code}" if subject_code else "library:documents"]
+        return await response_cache.respond(
+            key,
+            tags,
+            LibraryDocumentResponse,
+            load,
+            headers=response.headers,
+            version=catalog_version(request),
+        )
 
     except Exception as e:
         logger.error(f"Error getting public documents: {e}")
@@ -226,6 +327,8 @@ async def get_public_documents(
 
 @router.get("/public/subjects/", response_model=List[SubjectResponse])
 async def get_public_subjects(
+    request: Request,
+    response: Response,
     is_active: Optional[bool] = Query(True),
     department: Optional[str] = Query(None),
     limit: int = Query(50, ge=1, le=100),
@@ -233,7 +336,11 @@ async def get_public_subjects(
     db: AsyncSession = Depends(get_db_session_read),
 ):
     """Get active subjects (public access)"""
-    try:
+    not_modified = await conditional_get(request, response, db, LibrarySubject)
+    if not_modified is not None:
+        return not_modified
+
+    async def load() -> List[SubjectResponse]:
         query = select(LibrarySubject)
 
         if is_active is not None:
@@ -244,9 +351,24 @@ async def get_public_subjects(
         query = query.offset(skip).limit(limit)
 
         result = await db.execute(query)
-        subjects = result.scalars().all()
+        return validate_list(SubjectResponse, result.scalars().all())
 
-        return [SubjectResponse.model_validate(subject) for subject in subjects]
+    try:
+        key = response_cache.key(
+            request.url.path,
+            is_active=is_active,
+            department=department,
+            limit=limit,
+            skip=skip,
+        )
+        return await response_cache.respond(
+            key,
+            ["library:subjects"],
+            SubjectResponse,
+            load,
+            headers=response.headers,
+            version=catalog_version(request),
+        )
 
     except Exception as e:
         logger.error(f"Error getting public subjects: {e}")
@@ -314,7 +436,7 @@ async def get_documents(
 async def get_document(
     document_id: int,
     current_user: AuthenticatedUser = Depends(get_current_authenticated_user),
-    db: AsyncSession = Depends(get_db_session_write),
+    db: AsyncSession = Depends(get_db_session_read),
 ):
     """Get a specific document"""
     try:
@@ -340,19 +462,22 @@ async def get_document(
                 status_code=http_status.HTTP_403_FORBIDDEN, detail="Access denied"
             )
 
-        # Increment view count
-        current_views = document.view_count or 0
-        setattr(document, "view_count", current_views + 1)
-        await db.commit()
-        await db.refresh(document)
+        # Increment view count (atomic UPDATE on primary, reads stay on read engine)
+        await execute_on_primary(
+            update(LibraryDocument)
+            .where(LibraryDocument.id == document_id)
+            .values(view_count=sql_func.coalesce(LibraryDocument.view_count, 0) + 1),
+            session=db,
+        )
+        response = LibraryDocumentResponse.model_validate(document)
+        response.view_count = (document.view_count or 0) + 1
 
-        return LibraryDocumentResponse.model_validate(document)
+        return response
 
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error getting document {document_id}: {e}")
-        await db.rollback()
         raise HTTPException(
             status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get document",
@@ -474,10 +599,11 @@ async def upload_document(
         file_path = None
         file_url = None
         file_size = None
+        file_sha256 = None
         file_type = None
         mime_type = None
         if file:
-            file_path, file_url, file_size = await save_uploaded_file(
+            file_path, file_url, file_size, file_sha256 = await save_uploaded_file(
                 file, subject_code
             )
             # Get file type from extension
@@ -524,6 +650,7 @@ async def upload_document(
                 "file_size": file_size or 0,
                 "file_name": file.filename if file else None,
                 "file_path": file_path,
+                "sha256": file_sha256,
                 "mime_type": mime_type,
                 "uploaded_for": "lecture",
                 "storage": "supabase" if file_url else None,
@@ -563,6 +690,7 @@ async def upload_document(
             ),
             tags=tags_list,
             content_html=content_html,
+            document_metadata={"sha256": file_sha256} if file_sha256 else None,
             semester=semester,
             academic_year=academic_year,
             chapter=chapter,
@@ -2,7 +2,7 @@
 News API endpoints
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
 from typing import List, Optional, Dict, Tuple
 from typing import cast as typing_cast
 from datetime import datetime, timezone
@@ -24,12 +24,20 @@ from sqlalchemy import (
     delete,
     cast,
     String,
+    func,
+    update,
 )
 
 from ....models.news import News, NewsStatus
 from ....models.user import Profile
 from ....schemas.news import NewsCreate, NewsUpdate, NewsResponse
-from ....core.database import get_db_session_write, get_db_session_read
+from ....core.catalog_versions import catalog_version, conditional_get
+from ....core.response_cache import response_cache
+from ....core.database import (
+    get_db_session_write,
+    get_db_session_read,
+    execute_on_primary,
+)
 from ....middleware.auth import (
     AuthenticatedUser,
     get_current_authenticated_user,
@@ -117,6 +125,16 @@ def _news_to_response(news: News) -> NewsResponse:
     )
 
 
+async def _increment_news_views(db: AsyncSession, news: News) -> None:
+    """Atomic views + 1 on the primary (on `db` itself when it already reads from the primary)."""
+    await execute_on_primary(
+        update(News)
+        .where(News.id == news.id)
+        .values(views=func.coalesce(News.views, 0) + 1),
+        session=db,
+    )
+
+
 @router.get("/", response_model=List[NewsResponse])
 async def list_news(
     status: Optional[NewsStatus] = Query(None, description="Filter by status"),
@@ -173,28 +191,35 @@ async def list_news(
 @router.get("/{news_id}", response_model=NewsResponse)
 async def get_news(
     news_id: int,
-    db: AsyncSession = Depends(get_db_session_write),
+    current_user: AuthenticatedUser = Depends(get_current_authenticated_user),
+    db: AsyncSession = Depends(get_db_session_read),
 ):
     """Get a specific news article"""
     try:
-        result = await db.execute(select(News).where(News.id == news_id))
+        query = select(News).where(News.id == news_id)
+        # Session đọc không đặt RLS context: lọc quyền ngay trong query.
+        # Bài chưa publish chỉ admin và tác giả xem được (người khác nhận 404)
+        if current_user.role != "admin":
+            query = query.where(
+                or_(
+                    News.status == NewsStatus.PUBLISHED,
+                    News.author_id == current_user.user_id,
+                )
+            )
+        result = await db.execute(query)
         news = result.scalar_one_or_none()
 
         if not news:
             raise HTTPException(status_code=404, detail="News not found")
 
-        # RLS will handle permission checking automatically
-        # If user doesn't have access, RLS will filter it out
-
         status_attr = typing_cast(Optional[NewsStatus], getattr(news, "status", None))
 
+        response = _news_to_response(news)
         if status_attr == NewsStatus.PUBLISHED:
-            current_views = typing_cast(Optional[int], getattr(news, "views", 0)) or 0
-            setattr(news, "views", current_views + 1)
-            await db.commit()
-            await db.refresh(news)
+            await _increment_news_views(db, news)
+            response.views = (response.views or 0) + 1
 
-        return _news_to_response(news)
+        return response
     except HTTPException:
         raise
     except Exception as e:
@@ -356,11 +381,17 @@ async def delete_news(
 
 @router.get("/public/featured", response_model=List[NewsResponse])
 async def get_featured_news(
+    request: Request,
+    response: Response,
     limit: int = Query(5, ge=1, le=20, description="Number of featured articles"),
     db: AsyncSession = Depends(get_db_session_read),
 ):
     """Get featured news for homepage (public endpoint)"""
-    try:
+    not_modified = await conditional_get(request, response, db, News)
+    if not_modified is not None:
+        return not_modified
+
+    async def load() -> List[NewsResponse]:
         query = (
             select(News)
             .where(
@@ -377,6 +408,16 @@ async def get_featured_news(
         news_list = result.scalars().all()
 
         return [_news_to_response(news) for news in news_list]
+
+    try:
+        return await response_cache.respond(
+            response_cache.key(request.url.path, limit=limit),
+            ["news"],
+            NewsResponse,
+            load,
+            headers=response.headers,
+            version=catalog_version(request),
+        )
     except Exception as e:
         logger.error(f"Error getting featured news: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch featured news")
@@ -384,11 +425,17 @@ async def get_featured_news(
 
 @router.get("/public/latest", response_model=List[NewsResponse])
 async def get_latest_news(
+    request: Request,
+    response: Response,
     limit: int = Query(10, ge=1, le=50, description="Number of latest articles"),
     db: AsyncSession = Depends(get_db_session_read),
 ):
     """Get latest published news (public endpoint)"""
-    try:
+    not_modified = await conditional_get(request, response, db, News)
+    if not_modified is not None:
+        return not_modified
+
+    async def load() -> List[NewsResponse]:
         query = select(News).where(News.status == NewsStatus.PUBLISHED)
 
         # Order by published_at if available, otherwise by created_at
@@ -412,6 +459,16 @@ async def get_latest_news(
             return []
 
         return [_news_to_response(news) for news in news_list]
+
+    try:
+        return await response_cache.respond(
+            response_cache.key(request.url.path, limit=limit),
+            ["news"],
+            NewsResponse,
+            load,
+            headers=response.headers,
+            version=catalog_version(request),
+        )
     except Exception as e:
         logger.error(f"Error getting latest news: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch latest news")
@@ -507,7 +564,7 @@ async def search_public_news(
 @router.get("/public/by-slug/{slug}", response_model=NewsResponse)
 async def get_news_by_slug(
     slug: str,
-    db: AsyncSession = Depends(get_db_session_write),
+    db: AsyncSession = Depends(get_db_session_read),
 ):
     """Get published news by slug (public endpoint)"""
     try:
@@ -520,12 +577,11 @@ async def get_news_by_slug(
         if not news:
             raise HTTPException(status_code=404, detail="News not found")
 
-        current_views = typing_cast(Optional[int], getattr(news, "views", 0)) or 0
-        setattr(news, "views", current_views + 1)
-        await db.commit()
-        await db.refresh(news)
+        response = _news_to_response(news)
+        await _increment_news_views(db, news)
+        response.views = (response.views or 0) + 1
 
-        return _news_to_response(news)
+        return response
     except HTTPException:
         raise
     except Exception as e:
@@ -17,6 +17,7 @@ from ....middleware.auth import (
     get_current_authenticated_user,
     get_current_supervisor_user,
     get_current_user_profile,
+    invalidate_user_profile,
 )
 from ....services.notification_service import (
     create_notification,
@@ -239,6 +240,7 @@ async def update_notification_preferences_endpoint(
 
     await db.commit()
     await db.refresh(profile)
+    invalidate_user_profile(current_user.user_id)
 
     return NotificationPreferences(**current_preferences)
 
@@ -3,7 +3,7 @@ Products API endpoints
 """
 
 from typing import List, Optional, cast
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from datetime import datetime
 import logging
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -11,6 +11,9 @@ from sqlalchemy import select, and_, func as sql_func, desc, delete
 
 from ....models.product import Product, ProductType
 from ....schemas.product import ProductCreate, ProductUpdate, ProductResponse
+from ....core.catalog_versions import catalog_version, conditional_get
+from ....core.response_cache import response_cache
+from ....core.serialization import validate_list
 from ....core.database import get_db_session_write, get_db_session_read
 from ....middleware.auth import AuthenticatedUser, get_current_supervisor_user
 
@@ -21,6 +24,8 @@ router = APIRouter()
 
 @router.get("/", response_model=List[ProductResponse])
 async def list_products(
+    request: Request,
+    response: Response,
     subject: Optional[str] = Query(None, description="Filter by subject code"),
     type: Optional[ProductType] = Query(None, description="Filter by product type"),
     semester: Optional[str] = Query(None, description="Filter by semester"),
@@ -31,7 +36,11 @@ async def list_products(
     db: AsyncSession = Depends(get_db_session_read),
 ):
     """List all products with optional filtering"""
-    try:
+    not_modified = await conditional_get(request, response, db, Product)
+    if not_modified is not None:
+        return not_modified
+
+    async def load() -> List[ProductResponse]:
         query = select(Product)
         conditions = []
 
@@ -54,8 +63,28 @@ async def list_products(
         result = await db.execute(query)
         products = result.scalars().all()
 
-        logger.info(f"Retrieved {len(products)} products")
-        return [ProductResponse.model_validate(product) for product in products]
+        logger.debug("Retrieved %s products", len(products))
+        return validate_list(ProductResponse, products)
+
+    try:
+        key = response_cache.key(
+            request.url.path,
+            subject=subject,
+            type=type,
+            semester=semester,
+            group=group,
+            instructor=instructor,
+            skip=skip,
+            limit=limit,
+        )
+        return await response_cache.respond(
+            key,
+            ["products"],
+            ProductResponse,
+            load,
+            headers=response.headers,
+            version=catalog_version(request),
+        )
 
     except Exception as e:
         logger.error(f"Error listing products: {str(e)}")
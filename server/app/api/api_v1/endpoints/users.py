@@ -15,6 +15,7 @@ from ....middleware.auth import (
     get_current_authenticated_user,
     get_current_admin_user,
     get_current_user_profile,
+    invalidate_user_profile,
 )
 
 logger = logging.getLogger(__name__)
@@ -169,6 +170,7 @@ async def update_current_user(
 
         await db.commit()
         await db.refresh(profile)
+        invalidate_user_profile(current_user.user_id)
 
         logger.info(f"Profile updated for user {current_user.user_id}")
 
@@ -338,6 +340,7 @@ async def patch_user(
                 user_id_str,
                 attributes=attributes,
             )
+            invalidate_user_profile(user_id)
             logger.info(
                 "User %s is_active updated to %s by admin %s",
                 user_id_str,
@@ -404,6 +407,7 @@ def delete_user(
     # Delete user
     try:
         supabase.auth.admin.delete_user(user_id_str)
+        invalidate_user_profile(user_id)
         logger.info(
             "User %s deleted by admin %s",
             user_id_str,
@@ -0,0 +1,162 @@
+"""
+Per-table version stamps and weak ETags for public catalog endpoints.
+
+The stamp of a table is `count(*)`, `max(created_at)` and `max(updated_at)`,
+read with one aggregate query and cached per worker for
+CATALOG_VERSION_TTL_SECONDS. Commits that write a tracked table (ORM flush
+or bulk insert/update/delete, detected with Session events like the
+read-your-writes pinning in database.py) drop the cached stamp in this
+worker; other workers pick the change up when their cache expires.
+
+`conditional_get()` turns the stamps into a weak ETag for the request URL and
+answers `If-None-Match` with a bare 304 before the endpoint touches the ORM.
+Counter columns (views, downloads) do not bump `updated_at`, so the ETag
+also rolls over every CATALOG_ETAG_MAX_AGE_SECONDS to let them refresh.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .database import COUNTER_WRITE_KEY
+
+_WRITTEN_TABLES_KEY = "catalog_written_tables"
+
+
+class TableVersions:
+    """Cached version stamp per table."""
+
+    def __init__(self, ttl: float = 5.0) -> None:
+        self.ttl = ttl
+        self._stamps: Dict[str, Tuple[float, str]] = {}
+
+    async def stamp(self, db: AsyncSession, model: Any) -> str:
+        table = model.__table__
+        now = time.monotonic()
+        cached = self._stamps.get(table.name)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        columns = [func.count()]
+        for name in ("created_at", "updated_at"):
+            if name in table.c:
+                columns.append(func.max(table.c[name]))
+        row = (await db.execute(select(*columns).select_from(table))).one()
+        value = "|".join("" if part is None else str(part) for part in row)
+        self._stamps[table.name] = (now + self.ttl, value)
+        return value
+
+    def invalidate(self, tables: Iterable[str]) -> None:
+        for name in tables:
+            self._stamps.pop(name, None)
+
+    def clear(self) -> None:
+        self._stamps.clear()
+
+
+table_versions = TableVersions(ttl=settings.CATALOG_VERSION_TTL_SECONDS)
+
+
+def _tables_of(objects: Iterable[Any]) -> Set[str]:
+    names = set()
+    for obj in objects:
+        table = getattr(obj, "__table__", None)
+        if table is not None:
+            names.add(table.name)
+    return names
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session: Session, flush_context: Any) -> None:
+    tables = _tables_of(session.new) | _tables_of(session.dirty) | _tables_of(session.deleted)
+    if tables:
+        session.info.setdefault(_WRITTEN_TABLES_KEY, set()).update(tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_tables(orm_execute_state: Any) -> None:
+    if not (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ) or orm_execute_state.session.info.get(COUNTER_WRITE_KEY):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    name = getattr(table, "name", None)
+    if name:
+        orm_execute_state.session.info.setdefault(_WRITTEN_TABLES_KEY, set()).add(name)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_written_tables(session: Session) -> None:
+    tables = session.info.pop(_WRITTEN_TABLES_KEY, None)
+    if tables:
+        table_versions.invalidate(tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_written_tables(session: Session) -> None:
+    session.info.pop(_WRITTEN_TABLES_KEY, None)
+
+
+def catalog_version(request: Request) -> Optional[str]:
+    """Table stamps the request's ETag was built from (None without ETags)."""
+    return getattr(request.state, "catalog_version", None)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison (RFC 9110 13.1.2) against an If-None-Match header."""
+    if not if_none_match:
+        return False
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+async def conditional_get(
+    request: Request, response: Response, db: AsyncSession, *models: Any
+) -> Optional[Response]:
+    """
+    Set a weak ETag built from the tables behind `models`.
+
+    Returns a 304 response when the client's `If-None-Match` still matches,
+    otherwise None (and the ETag is added to `response`). The data version
+    behind the ETag is kept for `catalog_version()`.
+    """
+    if not settings.CATALOG_ETAG_ENABLED:
+        return None
+
+    parts = []
+    for model in models:
+        parts.append(await table_versions.stamp(db, model))
+    if settings.CATALOG_ETAG_MAX_AGE_SECONDS > 0:
+        parts.append(str(int(time.time() // settings.CATALOG_ETAG_MAX_AGE_SECONDS)))
+    version = "\n".join(parts)
+    request.state.catalog_version = version
+    digest = hashlib.blake2b(
+        "\n".join((request.url.path, request.url.query, version)).encode(),
+        digest_size=12,
+    ).hexdigest()
+    etag = f'W/"{digest}"'
+    # no-cache: trình duyệt giữ bản sao nhưng luôn hỏi lại bằng If-None-Match
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
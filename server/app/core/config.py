@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 import os
 from pathlib import Path
 
@@ -64,6 +64,14 @@ class Settings(BaseSettings):
 
     # Optional: Read-only (Transaction pooler 6543) dedicated URL
     READ_DATABASE_URL: str = ""
+    # Sau khi user ghi, các lượt đọc của user đó đi qua primary trong X giây (read-your-writes)
+    READ_YOUR_WRITES_SECONDS: int = 5
+    # Đọc chuyển về primary khi engine đọc lỗi hoặc chậm hơn primary quá ngưỡng này
+    READ_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    READ_REPLICA_HEALTH_INTERVAL_SECONDS: int = 15
+    # Khởi động: auto = so revision alembic/extension bằng 1 query, chỉ chạy DDL khi lệch;
+    # always = luôn CREATE EXTENSION + create_all; skip = không kiểm tra
+    DB_SCHEMA_STARTUP_MODE: str = "auto"
 
     # Security
     SECRET_KEY: str = "your-secret-key-change-this-in-production"
@@ -92,6 +100,16 @@ class Settings(BaseSettings):
     # Use JWKS URL for asymmetric key verification (RS256/ES256)
     # Get from: https://your-project-ref.supabase.co/auth/v1/.well-known/jwks.json
     SUPABASE_JWKS_URL: str = ""
+    SUPABASE_JWKS_TTL_SECONDS: int = 3600
+    # Làm mới JWKS ở nền khi còn X giây trước khi hết TTL (vẫn dùng bản cũ trong lúc chờ)
+    SUPABASE_JWKS_REFRESH_MARGIN_SECONDS: int = 300
+    # Số token đã verify được cache (LRU, hết hạn theo claim `exp`). 0 = tắt cache
+    AUTH_TOKEN_CACHE_SIZE: int = 4096
+    # Cache profile trong tiến trình cho get_current_user_profile. 0 = tắt cache
+    # Ghi qua PATCH /users/me và các endpoint admin sẽ xoá cache ngay (chỉ trong worker đó;
+    # worker khác thấy thay đổi sau tối đa PROFILE_CACHE_TTL_SECONDS)
+    PROFILE_CACHE_SIZE: int = 2048
+    PROFILE_CACHE_TTL_SECONDS: int = 30
 
     # Redis Cache & Queue
     # NOTE: server/ (Render) does NOT use Redis according to system architecture
@@ -118,11 +136,62 @@ class Settings(BaseSettings):
     # Rate Limiting
     RATE_LIMIT_REQUESTS: int = 100
     RATE_LIMIT_WINDOW: int = 3600  # 1 hour
+    # Mỗi lớp route (read, write, upload, export, admin_analytics) có ngân sách riêng
+    # (token mỗi cửa sổ, thiếu = chi phí x RATE_LIMIT_REQUESTS, tức vẫn RATE_LIMIT_REQUESTS
+    # request mỗi lớp) và chi phí token mỗi request
+    RATE_LIMIT_ROUTE_BUDGETS: Dict[str, int] = {}
+    RATE_LIMIT_ROUTE_COSTS: Dict[str, int] = {
+        "read": 1,
+        "write": 2,
+        "upload": 10,
+        "export": 20,
+        "admin_analytics": 5,
+    }
+    # memory = theo worker (mặc định); shared_memory = chung cho các worker trên một host;
+    # redis = chung cho mọi instance (cần REDIS_URL và package redis)
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_SHM_PATH: str = ""  # rỗng = /dev/shm/elearning-rate-limit
+    RATE_LIMIT_SHM_SLOTS: int = 65536
 
     # Monitoring
     SENTRY_DSN: str = ""
     PROMETHEUS_ENABLED: bool = True
     LOG_LEVEL: str = "INFO"
+    # json | text; format chạy trên thread riêng (QueueListener), không trên event loop
+    LOG_FORMAT: str = "json"
+    # Hàng đợi log có giới hạn; đầy thì bỏ record thay vì chặn request (0 = ghi đồng bộ)
+    LOG_QUEUE_SIZE: int = 10000
+    # Tỉ lệ dòng "Request completed" được ghi; lỗi 5xx và request chậm luôn được ghi
+    LOG_REQUEST_SAMPLE_RATE: float = 0.1
+    LOG_SLOW_REQUEST_MS: int = 1000
+    # Số series tối đa mỗi metric có nhãn; vượt quá sẽ gộp vào series __overflow__ (0 = không giới hạn)
+    METRICS_MAX_SERIES_PER_METRIC: int = 1000
+    # Chu kỳ chụp histogram thời gian request (ring buffer 60 phút) cho p50/p95/p99 ở /admin/metrics
+    METRICS_LATENCY_SNAPSHOT_SECONDS: int = 15
+    # Header Server-Timing (db;dur=...) + cảnh báo N+1 / query chậm theo request (0 = tắt ngưỡng)
+    SERVER_TIMING_ENABLED: bool = True
+    DB_REQUEST_QUERY_WARN_COUNT: int = 25
+    DB_REQUEST_TIME_WARN_MS: int = 500
+    # Endpoint danh sách (lectures, ai-data, assessments) tự dump JSON bằng pydantic-core,
+    # bỏ qua bước FastAPI validate lại theo response_model (false = validate lại như cũ)
+    RESPONSE_SKIP_REVALIDATION: bool = True
+    # Nén response (br nếu cài package brotli, không thì gzip). Ngân sách CPU:
+    # body nhỏ hơn COMPRESSION_MINIMUM_SIZE byte gửi nguyên, mức nén giữ thấp
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 5
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    # ETag yếu + 304 cho endpoint catalog công khai (library/news/products).
+    # Version stamp mỗi bảng được cache theo worker trong TTL (ghi ở worker khác thấy sau tối đa TTL);
+    # ETag đổi ít nhất mỗi MAX_AGE giây để bộ đếm view/download được cập nhật (0 = không)
+    CATALOG_ETAG_ENABLED: bool = True
+    CATALOG_VERSION_TTL_SECONDS: float = 5.0
+    CATALOG_ETAG_MAX_AGE_SECONDS: int = 300
+    # Cache response (LRU + TTL, theo worker) cho endpoint công khai library/news/products.
+    # Ghi qua ORM vô hiệu hóa theo tag; worker khác thấy thay đổi sau tối đa TTL
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1000
+    RESPONSE_CACHE_TTL_SECONDS: float = 30.0
 
     # Email settings
     SMTP_TLS: bool = True
@@ -5,7 +5,9 @@ This module provides:
 - Async database engines (write: port 5432, read: port 6543)
 - RLS (Row Level Security) integration
 - Auth.users table stub for foreign key resolution
-- Read/Write splitting for optimal performance
+- Read/Write splitting for optimal performance: read-only sessions are routed
+  to the read engine unless it is unhealthy/lagging or the current user has
+  just written (read-your-writes)
 """
 
 from sqlalchemy.ext.asyncio import (
@@ -14,15 +16,22 @@ from sqlalchemy.ext.asyncio import (
     async_sessionmaker,
     AsyncEngine,
 )
-from sqlalchemy import text, Table, Column, MetaData
+from sqlalchemy import event, text, Table, Column, MetaData
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
 from fastapi import Depends
 from .config import settings
+from .db_metrics import TimedAsyncQueuePool, instrument_engine
+from ..utils.lru_cache import ExpiringLRUCache
+import asyncio
 import logging
 import os
 import json
-from typing import AsyncGenerator, Optional, Any
+import re
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import AsyncGenerator, Optional, Any, Dict, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -132,41 +141,71 @@ def get_read_database_url() -> Optional[str]:
 database_url = get_database_url()
 read_database_url = get_read_database_url()
 
-# Create async engine for WRITE operations (Port 5432 - Session Mode)
-# Use settings from config.py for pool configuration
-# CRITICAL: Disable prepared statements (statement_cache_size=0) for Supavisor compatibility
-# See: https://github.com/supabase/supavisor/issues/287
-engine_write: AsyncEngine = create_async_engine(
-    database_url,
-    pool_size=getattr(settings, "DATABASE_POOL_SIZE", 3),  # Use config or default to 3
-    max_overflow=getattr(
-        settings, "DATABASE_MAX_OVERFLOW", 3
-    ),  # Allow overflow for concurrent requests
-    pool_timeout=getattr(
-        settings, "DATABASE_POOL_TIMEOUT", 30
-    ),  # Timeout for getting connection from pool
-    pool_pre_ping=True,  # Test connections before using them
-    pool_recycle=300,  # Recycle connections every 5 minutes
-    echo=settings.ENVIRONMENT == "development",
-    future=True,
-    connect_args={
-        "statement_cache_size": 0,  # Disable prepared statements for Supavisor compatibility
-    },
-)
-
-# Create async engine for READ operations (Port 6543 - Transaction Mode)
-# Can use larger pool for read-only operations
-# CRITICAL: Disable prepared statements (statement_cache_size=0) for Supavisor compatibility
-# See: https://github.com/supabase/supavisor/issues/287
-engine_read: Optional[AsyncEngine] = None
-if read_database_url:
+# Engines are created on first use (first query, lifespan, /metrics) rather
+# than at import: importing app.main, alembic's env.py or a script no longer
+# pays for create_async_engine and the asyncpg dialect import.
+_engine_write: Optional[AsyncEngine] = None
+_engine_read: Optional[AsyncEngine] = None
+_engine_read_created = False
+
+
+def get_write_engine() -> AsyncEngine:
+    """Return the write engine (Port 5432 - Session Mode), creating it on first use."""
+    global _engine_write
+    if _engine_write is not None:
+        return _engine_write
+
+    # Create async engine for WRITE operations (Port 5432 - Session Mode)
+    # Use settings from config.py for pool configuration
+    # CRITICAL: Disable prepared statements (statement_cache_size=0) for Supavisor compatibility
+    # See: https://github.com/supabase/supavisor/issues/287
+    engine = create_async_engine(
+        database_url,
+        pool_size=getattr(settings, "DATABASE_POOL_SIZE", 3),  # Use config or default to 3
+        max_overflow=getattr(
+            settings, "DATABASE_MAX_OVERFLOW", 3
+        ),  # Allow overflow for concurrent requests
+        pool_timeout=getattr(
+            settings, "DATABASE_POOL_TIMEOUT", 30
+        ),  # Timeout for getting connection from pool
+        pool_pre_ping=True,  # Test connections before using them
+        pool_recycle=300,  # Recycle connections every 5 minutes
+        poolclass=TimedAsyncQueuePool,  # Records pool checkout wait (db_pool_checkout_wait_seconds)
+        pool_logging_name="write",
+        echo=settings.ENVIRONMENT == "development",
+        future=True,
+        connect_args={
+            "statement_cache_size": 0,  # Disable prepared statements for Supavisor compatibility
+        },
+    )
+    # Time every statement (db_query_duration_seconds)
+    instrument_engine(engine)
+    _engine_write = engine
+    return engine
+
+
+def get_read_engine() -> Optional[AsyncEngine]:
+    """Return the read engine (Port 6543 - Transaction Mode), or None if not configured."""
+    global _engine_read, _engine_read_created
+    if _engine_read_created:
+        return _engine_read
+    _engine_read_created = True
+    if not read_database_url:
+        return None
+
+    # Create async engine for READ operations (Port 6543 - Transaction Mode)
+    # Can use larger pool for read-only operations
+    # CRITICAL: Disable prepared statements (statement_cache_size=0) for Supavisor compatibility
+    # See: https://github.com/supabase/supavisor/issues/287
     try:
-        engine_read = create_async_engine(
+        engine = create_async_engine(
             read_database_url,
             pool_size=5,  # Larger pool for read operations
             max_overflow=10,  # Allow overflow for read operations
             pool_pre_ping=True,
             pool_recycle=180,  # Recycle connections every 3 minutes
+            poolclass=TimedAsyncQueuePool,
+            pool_logging_name="read",
             echo=False,  # Don't echo read queries
             future=True,
             connect_args={
@@ -176,27 +215,206 @@ if read_database_url:
         logger.info("Initialized read-only engine via transaction pooler (port 6543)")
     except Exception as e:
         logger.warning(f"Failed to initialize read-only engine: {e}")
-        engine_read = None
+        read_router.has_replica = False
+        return None
+
+    instrument_engine(engine)
+    event.listen(engine.sync_engine, "handle_error", _on_read_engine_error)
+    _engine_read = engine
+    return engine
+
+
+def __getattr__(name: str) -> Any:
+    # `from app.core.database import engine_write` vẫn hoạt động (tạo engine khi cần)
+    if name == "engine_write":
+        return get_write_engine()
+    if name == "engine_read":
+        return get_read_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# ---------------------------------------------------------------------------
+# Read/write routing
+# ---------------------------------------------------------------------------
+# User của request hiện tại (do middleware.auth gán sau khi verify JWT)
+_request_user_id: ContextVar[Optional[str]] = ContextVar(
+    "db_request_user_id", default=None
+)
+_WROTE_KEY = "has_writes"
+# Session chỉ tăng bộ đếm (view_count, views): không cần vô hiệu hóa cache catalog
+COUNTER_WRITE_KEY = "counter_write"
+
+# Trả về 0 trên primary; trên replica là số giây chậm so với primary
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN pg_is_in_recovery() "
+    "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "ELSE 0 END"
+)
+
+
+def set_request_user(user_id: Any) -> None:
+    """Remember the authenticated user so reads can be pinned after their writes."""
+    _request_user_id.set(str(user_id))
+
+
+class ReadRouter:
+    """Decides whether a read-only session may use `engine_read`.
+
+    Reads go to the primary when no read engine is configured, when the last
+    health check failed or reported lag above `max_lag_seconds`, and for
+    `pin_seconds` after the current user committed a write.
+    """
+
+    def __init__(
+        self,
+        has_replica: bool,
+        *,
+        pin_seconds: float,
+        max_lag_seconds: float,
+        failure_cooldown_seconds: float,
+        pin_cache_size: int = 4096,
+    ) -> None:
+        self.has_replica = has_replica
+        self.pin_seconds = pin_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.failure_cooldown_seconds = failure_cooldown_seconds
+        self.lag_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._unhealthy_until = 0.0
+        self._pinned: ExpiringLRUCache[bool] = ExpiringLRUCache(pin_cache_size)
+
+    @property
+    def replica_available(self) -> bool:
+        return self.has_replica and time.monotonic() >= self._unhealthy_until
+
+    def pin(self, user_id: Optional[str]) -> None:
+        if user_id and self.pin_seconds > 0:
+            self._pinned.set(user_id, True, time.time() + self.pin_seconds)
+
+    def is_pinned(self, user_id: Optional[str]) -> bool:
+        return bool(user_id) and self._pinned.get(user_id) is not None
+
+    def use_primary(self) -> bool:
+        return not self.replica_available or self.is_pinned(_request_user_id.get())
+
+    def mark_unhealthy(self, reason: str) -> None:
+        if self.replica_available:
+            logger.warning(f"Read engine unhealthy, routing reads to primary: {reason}")
+        self.last_error = reason
+        self._unhealthy_until = time.monotonic() + self.failure_cooldown_seconds
+
+    def mark_healthy(self, lag_seconds: float) -> None:
+        if not self.replica_available:
+            logger.info(f"Read engine healthy again (lag {lag_seconds:.2f}s)")
+        self.lag_seconds = lag_seconds
+        self.last_error = None
+        self._unhealthy_until = 0.0
+
+    async def check_health(self, engine: AsyncEngine, timeout: float = 2.0) -> None:
+        try:
+            async with engine.connect() as conn:
+                result = await asyncio.wait_for(conn.execute(_REPLICA_LAG_SQL), timeout)
+                lag = float(result.scalar() or 0)
+        except Exception as e:
+            self.mark_unhealthy(f"{type(e).__name__}: {e}")
+            return
+
+        if lag > self.max_lag_seconds:
+            self.lag_seconds = lag
+            self.mark_unhealthy(f"replication lag {lag:.2f}s")
+        else:
+            self.mark_healthy(lag)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "has_replica": self.has_replica,
+            "replica_available": self.replica_available,
+            "lag_seconds": self.lag_seconds,
+            "last_error": self.last_error,
+            "pinned_users": len(self._pinned),
+        }
+
+
+read_router = ReadRouter(
+    read_database_url is not None,
+    pin_seconds=settings.READ_YOUR_WRITES_SECONDS,
+    max_lag_seconds=settings.READ_REPLICA_MAX_LAG_SECONDS,
+    failure_cooldown_seconds=settings.READ_REPLICA_HEALTH_INTERVAL_SECONDS,
+)
+
+
+async def run_read_replica_health_checks() -> None:
+    """Background loop started from the application lifespan."""
+    engine = get_read_engine()
+    if engine is None:
+        return
+    while True:
+        await read_router.check_health(engine)
+        await asyncio.sleep(settings.READ_REPLICA_HEALTH_INTERVAL_SECONDS)
+
+
+def _on_read_engine_error(exception_context) -> None:
+    # Mất kết nối tới pooler đọc -> chuyển đọc sang primary cho tới lần check sau
+    if exception_context.is_disconnect or exception_context.connection is None:
+        read_router.mark_unhealthy(str(exception_context.original_exception))
+
+
+class _WriteSession(Session):
+    """Session bound to the write engine, resolved lazily on first query."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        return get_write_engine().sync_engine
+
+
+class _ReadRoutingSession(Session):
+    """Session for read-only work; picks the engine when the first query runs."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or read_router.use_primary():
+            return get_write_engine().sync_engine
+        engine = get_read_engine()
+        if engine is None:
+            return get_write_engine().sync_engine
+        return engine.sync_engine
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_session_wrote(session: Session, flush_context: Any) -> None:
+    session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_bulk_write(orm_execute_state: Any) -> None:
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        orm_execute_state.session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _pin_writer_to_primary(session: Session) -> None:
+    if session.info.pop(_WROTE_KEY, False):
+        read_router.pin(_request_user_id.get())
+
 
 # Create async session makers
 AsyncSessionLocalWrite = async_sessionmaker(
-    engine_write,
     class_=AsyncSession,
+    sync_session_class=_WriteSession,
     expire_on_commit=False,
     autocommit=False,
     autoflush=False,
 )
 
-AsyncSessionLocalRead = (
-    async_sessionmaker(
-        engine_read,
-        class_=AsyncSession,
-        expire_on_commit=False,
-        autocommit=False,
-        autoflush=False,
-    )
-    if engine_read
-    else None
+# Luôn khả dụng: khi không có engine_read, _ReadRoutingSession dùng engine_write
+AsyncSessionLocalRead = async_sessionmaker(
+    class_=AsyncSession,
+    sync_session_class=_ReadRoutingSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
 )
 
 
@@ -205,17 +423,11 @@ def stub_auth_users_table():
     Create a stub definition for auth.users table in metadata.
     This allows SQLAlchemy to resolve foreign keys that reference auth.users.id
     without needing to reflect the actual table structure.
+
+    Called when app.models is imported: every ORM flush on a model with an
+    auth.users foreign key needs it, whether or not startup ran any DDL.
     """
     try:
-        # Check if database is PostgreSQL (not SQLite)
-        is_postgresql = database_url.startswith(
-            "postgresql"
-        ) or database_url.startswith("postgres")
-
-        if not is_postgresql:
-            logger.info("SQLite database detected, skipping auth.users stub")
-            return
-
         # Check if auth.users table is already stubbed
         table_key = "auth.users"
         if table_key in Base.metadata.tables:
@@ -230,7 +442,7 @@ def stub_auth_users_table():
             Column("id", UUID(as_uuid=True), primary_key=True),
             schema="auth",
         )
-        logger.info(
+        logger.debug(
             "Created auth.users table stub in metadata for foreign key resolution"
         )
 
@@ -258,7 +470,7 @@ async def init_database():
         stub_auth_users_table()
 
         # Enable required PostgreSQL extensions
-        async with engine_write.begin() as conn:
+        async with get_write_engine().begin() as conn:
             extensions = [
                 "CREATE EXTENSION IF NOT EXISTS vector;",
                 "CREATE EXTENSION IF NOT EXISTS unaccent;",
@@ -277,15 +489,110 @@ async def init_database():
         logger.error(f"Failed to initialize database: {e}")
 
 
+# ---------------------------------------------------------------------------
+# Schema fingerprint (cold start)
+# ---------------------------------------------------------------------------
+ALEMBIC_VERSIONS_DIR = Path(__file__).resolve().parents[2] / "alembic" / "versions"
+REQUIRED_EXTENSIONS = ("vector", "unaccent", "pg_trgm", "btree_gin")
+
+_REVISION_RE = re.compile(r"^revision\s*(?::[^=]*)?=\s*['\"]([^'\"]+)['\"]", re.M)
+_DOWN_REVISION_RE = re.compile(r"^down_revision\s*(?::[^=]*)?=\s*(.+)$", re.M)
+_QUOTED_RE = re.compile(r"['\"]([^'\"]+)['\"]")
+
+# Một query duy nhất: revision alembic hiện tại + số extension đã cài
+_SCHEMA_FINGERPRINT_SQL = text(
+    "SELECT "
+    "(SELECT string_agg(version_num, ',') FROM alembic_version) AS revisions, "
+    "(SELECT count(*) FROM pg_extension WHERE extname IN ("
+    + ", ".join(f"'{name}'" for name in REQUIRED_EXTENSIONS)
+    + ")) AS extensions"
+)
+
+
+def get_alembic_head_revisions(versions_dir: Path = ALEMBIC_VERSIONS_DIR) -> Set[str]:
+    """
+    Return the head revision ids of the migration scripts.
+
+    Reads `revision` / `down_revision` with a regex instead of building an
+    alembic ScriptDirectory, which imports every migration module and costs
+    close to a second on a cold container.
+    """
+    revisions: Set[str] = set()
+    parents: Set[str] = set()
+    for path in versions_dir.glob("*.py"):
+        source = path.read_text(encoding="utf-8")
+        match = _REVISION_RE.search(source)
+        if not match:
+            continue
+        revisions.add(match.group(1))
+        down = _DOWN_REVISION_RE.search(source)
+        if down:
+            parents.update(_QUOTED_RE.findall(down.group(1)))
+    return revisions - parents
+
+
+async def check_schema_current() -> Tuple[bool, str]:
+    """
+    Compare the database's alembic revision and extensions with the code.
+
+    Returns (is_current, reason). Any failure (no alembic_version table,
+    no connection, ...) counts as "not current" so startup falls back to DDL.
+    """
+    expected = get_alembic_head_revisions()
+    if not expected:
+        return False, f"no alembic revisions found in {ALEMBIC_VERSIONS_DIR}"
+
+    try:
+        async with get_write_engine().connect() as conn:
+            row = (await conn.execute(_SCHEMA_FINGERPRINT_SQL)).one()
+    except Exception as e:
+        return False, f"fingerprint query failed: {type(e).__name__}: {e}"
+
+    current = {rev for rev in (row.revisions or "").split(",") if rev}
+    if current != expected:
+        return False, (
+            f"alembic revision {sorted(current) or 'none'} != head {sorted(expected)}"
+        )
+    if int(row.extensions or 0) < len(REQUIRED_EXTENSIONS):
+        return False, "required PostgreSQL extensions missing"
+    return True, f"schema at alembic head {', '.join(sorted(expected))}"
+
+
+# Một statement duy nhất với bound parameter (không ghép chuỗi SQL).
+# set_config(..., is_local=true) tương đương SET LOCAL: chỉ có hiệu lực trong transaction hiện tại.
+_RLS_CONTEXT_SQL = text(
+    "SELECT set_config('role', 'authenticated', true), "
+    "set_config('request.jwt.claims', :claims, true)"
+)
+_RLS_CLAIMS_KEY = "rls_jwt_claims"
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_rls_context(session: Session, transaction: Any, connection: Any) -> None:
+    """Áp RLS context ngay khi session mở transaction, trước query đầu tiên."""
+    claims = session.info.get(_RLS_CLAIMS_KEY)
+    if claims is None:
+        return
+    try:
+        connection.execute(_RLS_CONTEXT_SQL, {"claims": claims})
+    except Exception as e:
+        logger.error(f"Failed to set RLS context: {e}")
+        raise
+
+
 async def set_rls_context(db: AsyncSession, user_id: str) -> None:
     """
     Set Row Level Security (RLS) context for Supabase PostgreSQL.
 
-    This function executes SQL commands to set:
-    1. SET LOCAL role = authenticated
-    2. SET LOCAL request.jwt.claims = '{"sub":"USER_ID"}'
+    The context is applied with a single statement:
+        SELECT set_config('role', 'authenticated', true),
+               set_config('request.jwt.claims', :claims, true)
 
-    This is required for Supabase RLS to work correctly with SQLAlchemy queries.
+    It is deferred until the session begins a transaction, i.e. it is sent
+    together with the first real query instead of as extra round trips up
+    front. Sessions that never query (validation errors, cache hits) do not
+    touch the database at all, and the context is re-applied automatically
+    for every new transaction after a commit.
 
     Args:
         db: SQLAlchemy async database session
@@ -295,24 +602,64 @@ async def set_rls_context(db: AsyncSession, user_id: str) -> None:
         This must be called before any queries that need RLS filtering.
         The RLS context is set per transaction and will be reset after the transaction ends.
     """
-    try:
-        # Convert user_id to string if it's not already
-        user_id_str = str(user_id)
+    user_id_str = str(user_id)
+    db.info[_RLS_CLAIMS_KEY] = json.dumps({"sub": user_id_str})
 
-        # Create JWT claims JSON
-        jwt_claims = json.dumps({"sub": user_id_str})
+    if db.in_transaction():
+        # Transaction đã mở (after_begin đã chạy) -> áp dụng ngay
+        await db.execute(_RLS_CONTEXT_SQL, {"claims": db.info[_RLS_CLAIMS_KEY]})
 
-        # Set RLS context
-        # Note: SET LOCAL only affects the current transaction
-        await db.execute(text("SET LOCAL role = authenticated"))
-        await db.execute(text(f"SET LOCAL request.jwt.claims = '{jwt_claims}'"))
+    logger.debug(f"RLS context set for user_id: {user_id_str}")
 
-        logger.debug(f"RLS context set for user_id: {user_id_str}")
 
-    except Exception as e:
-        logger.error(f"Failed to set RLS context: {e}")
-        # Don't raise exception here, let the query proceed
-        # RLS will still work, but may not filter correctly
+class RequestUnitOfWork:
+    """
+    Database sessions shared by every dependency of one HTTP request.
+
+    FastAPI caches `get_unit_of_work` per request, so `get_db_session_write`,
+    `get_db_session_read` and dependencies built on them (e.g.
+    `get_current_user_profile`) all see the same object. Sessions are created
+    on first use and, like any AsyncSession, only check a connection out of
+    the pool when their first statement runs.
+
+    When reads would be served by the write engine anyway (no read engine,
+    it is currently unhealthy, or the user is pinned by read-your-writes)
+    they reuse the write session, so a request such as `upload_document`
+    holds one write-pool connection instead of two.
+    """
+
+    def __init__(self) -> None:
+        self._write_session: Optional[AsyncSession] = None
+        self._read_session: Optional[AsyncSession] = None
+
+    @property
+    def write_session(self) -> AsyncSession:
+        if self._write_session is None:
+            self._write_session = AsyncSessionLocalWrite()
+        return self._write_session
+
+    @property
+    def read_session(self) -> AsyncSession:
+        if self._read_session is not None:
+            return self._read_session
+        if read_router.use_primary():
+            return self.write_session
+        self._read_session = AsyncSessionLocalRead()
+        return self._read_session
+
+    async def close(self) -> None:
+        for session in (self._read_session, self._write_session):
+            if session is not None:
+                await session.close()
+
+
+async def get_unit_of_work() -> AsyncGenerator[RequestUnitOfWork, None]:
+    """Request-scoped unit of work; closes every session it opened."""
+    uow = RequestUnitOfWork()
+    try:
+        yield uow
+    finally:
+        await uow.close()
 
 
 def _get_current_user_claims_dependency():
@@ -324,17 +671,18 @@ def _get_current_user_claims_dependency():
 
 async def get_db_session_write(
     claims: Any = Depends(_get_current_user_claims_dependency),
+    uow: RequestUnitOfWork = Depends(get_unit_of_work),
 ) -> AsyncGenerator[AsyncSession, None]:
     """
     Get async database session for WRITE operations (Port 5432).
 
     This dependency:
     1. Automatically receives AuthenticatedUser from get_current_user_claims via Depends()
-    2. Creates an async session
+    2. Takes the request's write session from the unit of work (one per request)
     3. Automatically sets RLS context based on claims.user_id
     4. Yields the session
     5. Commits or rolls back as needed
-    6. Closes the session
+    6. The unit of work closes the session at the end of the request
 
     IMPORTANT: This dependency automatically injects get_current_user_claims internally.
     Endpoints do NOT need to declare claims separately - just use:
@@ -349,32 +697,38 @@ async def get_db_session_write(
             # No need to manually call set_rls_context or declare claims
             ...
     """
-    async with AsyncSessionLocalWrite() as session:
-        try:
-            # Automatically set RLS context if claims are provided
-            # FastAPI will inject claims via Depends() automatically
-            if claims and hasattr(claims, "user_id"):
-                user_id = str(claims.user_id)
-                await set_rls_context(session, user_id)
-
-            yield session
-            await session.commit()
-        except Exception:
-            await session.rollback()
-            raise
-        finally:
-            await session.close()
-
-
-async def get_db_session_read() -> AsyncGenerator[AsyncSession, None]:
+    session = uow.write_session
+    try:
+        # Automatically set RLS context if claims are provided
+        # FastAPI will inject claims via Depends() automatically
+        if claims and hasattr(claims, "user_id"):
+            user_id = str(claims.user_id)
+            await set_rls_context(session, user_id)
+
+        yield session
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+
+
+async def get_db_session_read(
+    uow: RequestUnitOfWork = Depends(get_unit_of_work),
+) -> AsyncGenerator[AsyncSession, None]:
     """
-    Get async database session for READ operations (Port 6543 - Transaction Mode).
+    Get async database session for READ operations.
 
-    This dependency:
-    1. Creates an async session from read engine (if available)
-    2. Falls back to write engine if read engine is not configured
-    3. Yields the session
-    4. Closes the session
+    The engine is chosen lazily, when the session runs its first query
+    (after auth dependencies have identified the user):
+    1. Read engine (Port 6543 - Transaction Mode) by default
+    2. Write engine when no read engine is configured, the read engine
+       failed its health check or lags more than READ_REPLICA_MAX_LAG_SECONDS,
+       or the current user committed a write in the last
+       READ_YOUR_WRITES_SECONDS (read-your-writes)
+
+    In case 2 the request's write session is reused instead of checking out
+    a second write-pool connection (the user is known by then when auth
+    dependencies are declared before this one, e.g. get_current_user_profile).
 
     Usage:
         @router.get("/items")
@@ -383,17 +737,45 @@ async def get_db_session_read() -> AsyncGenerator[AsyncSession, None]:
         ):
             ...
     """
-    if AsyncSessionLocalRead is None:
-        # Fallback to write session if read engine is not available
-        async for session in get_db_session_write():
-            yield session
+    yield uow.read_session
+
+
+async def execute_on_primary(
+    statement: Any,
+    params: Optional[Dict[str, Any]] = None,
+    session: Optional[AsyncSession] = None,
+) -> None:
+    """
+    Run a single write statement (e.g. an atomic view counter increment)
+    on the write engine and commit it.
+
+    Pass the request's read `session`: when reads already go to the primary
+    (no healthy read engine, or the user is pinned) the statement runs on that
+    session, which already holds a write-pool connection. Otherwise it runs in
+    its own short transaction, so GET endpoints keep their reads on the read
+    engine and hold a write connection only for the duration of one UPDATE.
+    """
+    if session is not None and read_router.use_primary():
+        await _execute_counter_write(session, statement, params)
         return
+    async with AsyncSessionLocalWrite() as own_session:
+        await _execute_counter_write(own_session, statement, params)
 
-    async with AsyncSessionLocalRead() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
+
+async def _execute_counter_write(
+    session: AsyncSession, statement: Any, params: Optional[Dict[str, Any]]
+) -> None:
+    wrote = session.info.get(_WROTE_KEY, False)
+    # Bộ đếm không làm mất hiệu lực cache/ETag catalog (xem response_cache)
+    session.info[COUNTER_WRITE_KEY] = True
+    try:
+        await session.execute(statement, params or {})
+    finally:
+        session.info.pop(COUNTER_WRITE_KEY, None)
+    if not wrote:
+        # Bộ đếm kiểu view_count không cần read-your-writes -> không pin user
+        session.info.pop(_WROTE_KEY, None)
+    await session.commit()
 
 
 # Helper functions for direct database connection
@@ -402,7 +784,8 @@ async def db_connect():
     Create database engine and connection directly.
     For advanced use cases only.
     """
-    return engine_write, await engine_write.connect()
+    engine = get_write_engine()
+    return engine, await engine.connect()
 
 
 async def create_tables_orm(engine_instance: Optional[AsyncEngine] = None):
@@ -410,6 +793,6 @@ async def create_tables_orm(engine_instance: Optional[AsyncEngine] = None):
     Create tables using ORM Base.
     Similar to reference code pattern.
     """
-    engine_to_use = engine_instance or engine_write
+    engine_to_use = engine_instance or get_write_engine()
     async with engine_to_use.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
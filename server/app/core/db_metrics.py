@@ -0,0 +1,182 @@
+"""
+SQLAlchemy engine instrumentation.
+
+- Times every statement with engine events and records it in
+  `db_query_duration_seconds{operation, table}`
+- Counts failing statements in `db_query_errors_total`
+- Records how long each request waits to check a connection out of the
+  pool in `db_pool_checkout_wait_seconds{pool}`
+- Optionally accumulates statement count, DB time and statement
+  fingerprints for the current HTTP request (N+1 / slow query detector)
+
+Statement classification (operation + main table) is cached per SQL string,
+so the hot path is a dict lookup plus two `perf_counter()` calls. The
+Prometheus objects are owned by `app.main` and handed in through
+`bind_db_metrics()`; until then the hooks only do the timing bookkeeping.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+_query_duration: Any = None
+_query_errors: Any = None
+_pool_checkout_wait: Any = None
+
+_OPERATIONS = {"select", "insert", "update", "delete"}
+_FIRST_WORD = re.compile(r"^\s*(?:/\*.*?\*/\s*)?(\w+)", re.S)
+_TABLE_PATTERNS = {
+    "select": re.compile(r"\bFROM\s+([\w\".]+)", re.I),
+    "insert": re.compile(r"\bINSERT\s+INTO\s+([\w\".]+)", re.I),
+    "update": re.compile(r"\bUPDATE\s+([\w\".]+)", re.I),
+    "delete": re.compile(r"\bDELETE\s+FROM\s+([\w\".]+)", re.I),
+}
+
+_FINGERPRINT_RULES = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),  # string literals
+    (re.compile(r"\$\d+|%\(\w+\)s|:\w+|\b\d+(?:\.\d+)?\b"), "?"),  # params, numbers
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)"), "(?+)"),  # expanded IN lists
+    (re.compile(r"\s+"), " "),
+)
+_FINGERPRINT_MAX_LENGTH = 200
+
+
+@dataclass
+class RequestQueryStats:
+    """Statements executed while handling one HTTP request."""
+
+    count: int = 0
+    duration: float = 0.0
+    fingerprints: Counter = field(default_factory=Counter)
+
+    def top_fingerprints(self, limit: int = 3) -> List[Tuple[str, int]]:
+        return self.fingerprints.most_common(limit)
+
+
+_request_query_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar(
+    "request_query_stats", default=None
+)
+
+
+def start_request_tracking() -> Tuple[RequestQueryStats, Token]:
+    """Begin collecting statements for the current request (see `stop_request_tracking`)."""
+    stats = RequestQueryStats()
+    return stats, _request_query_stats.set(stats)
+
+
+def stop_request_tracking(token: Token) -> None:
+    _request_query_stats.reset(token)
+
+
+def bind_db_metrics(
+    query_duration: Any,
+    query_errors: Any,
+    pool_checkout_wait: Any,
+) -> None:
+    """Register the Prometheus collectors the engine hooks report to."""
+    global _query_duration, _query_errors, _pool_checkout_wait
+    _query_duration = query_duration
+    _query_errors = query_errors
+    _pool_checkout_wait = pool_checkout_wait
+
+
+@lru_cache(maxsize=2048)
+def classify_statement(statement: str) -> Tuple[str, str]:
+    """Return `(operation, table)` for a SQL string, e.g. `("select", "profiles")`."""
+    match = _FIRST_WORD.match(statement)
+    operation = match.group(1).lower() if match else "other"
+    if operation == "with":
+        # CTE: lấy câu lệnh chính sau phần WITH
+        for candidate in ("insert", "update", "delete"):
+            if _TABLE_PATTERNS[candidate].search(statement):
+                operation = candidate
+                break
+        else:
+            operation = "select"
+    if operation not in _OPERATIONS:
+        return "other", "none"
+
+    table_match = _TABLE_PATTERNS[operation].search(statement)
+    if not table_match:
+        return operation, "none"
+    table = table_match.group(1).replace('"', "").rsplit(".", 1)[-1].lower()
+    return operation, table or "none"
+
+
+@lru_cache(maxsize=2048)
+def fingerprint_statement(statement: str) -> str:
+    """Normalise literals and parameters so repeated statements collapse to one key."""
+    fingerprint = statement
+    for pattern, replacement in _FINGERPRINT_RULES:
+        fingerprint = pattern.sub(replacement, fingerprint)
+    return fingerprint.strip()[:_FINGERPRINT_MAX_LENGTH]
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long `connect()` waits for a connection.
+
+    A subclass (rather than patching the pool instance) survives
+    `pool.recreate()`, and the pool name comes from `pool_logging_name`.
+    """
+
+    def connect(self):  # type: ignore[override]
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            if _pool_checkout_wait is not None:
+                _pool_checkout_wait.labels(
+                    pool=self.logging_name or "default"
+                ).observe(time.perf_counter() - start)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start: Optional[float] = getattr(context, "_query_start_time", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+
+    stats = _request_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+        stats.fingerprints[fingerprint_statement(statement)] += 1
+
+    if _query_duration is not None:
+        operation, table = classify_statement(statement)
+        _query_duration.labels(operation=operation, table=table).observe(elapsed)
+
+
+def _handle_error(exception_context) -> None:
+    if _query_errors is None:
+        return
+    operation, _ = classify_statement(exception_context.statement or "")
+    error = exception_context.original_exception or exception_context.sqlalchemy_exception
+    _query_errors.labels(
+        operation=operation, error_type=type(error).__name__
+    ).inc()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Attach the timing hooks to an async engine (idempotent)."""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
@@ -0,0 +1,249 @@
+"""
+Async Supabase JWKS manager.
+
+- Fetches the key set with httpx (never blocks the event loop)
+- Refreshes in the background shortly before the TTL ends and keeps serving
+  the previous key set while the refresh is in flight (stale-while-revalidate)
+- Collapses concurrent refreshes, including misses on an unknown `kid`,
+  into a single HTTP request (single-flight)
+- Spaces fetch attempts, failed ones included, at least
+  `unknown_kid_min_interval` apart: while Supabase is down requests fail fast
+  instead of each running its own retry cycle
+- Builds one ready-to-use public key object per `kid` whenever a new key set
+  is loaded, so verifying a token is a dict lookup plus one signature check
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import httpx
+from jose import jwk
+from jose.backends.base import Key
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSUnavailableError(Exception):
+    """Raised when no key set is cached and Supabase cannot be reached."""
+
+
+@dataclass(frozen=True)
+class VerificationKey:
+    """Public key constructed once per JWKS version."""
+
+    kid: str
+    algorithm: str
+    key: Key
+
+
+def _default_algorithm(jwk_dict: Dict[str, Any]) -> str:
+    if jwk_dict.get("alg"):
+        return str(jwk_dict["alg"])
+    return "ES256" if jwk_dict.get("kty") == "EC" else "RS256"
+
+
+def build_key_registry(jwks: Dict[str, Any]) -> Dict[str, VerificationKey]:
+    """Turn every usable JWKS entry into a `VerificationKey`, indexed by kid."""
+    registry: Dict[str, VerificationKey] = {}
+    for entry in jwks.get("keys", []):
+        if not isinstance(entry, dict) or not entry.get("kid"):
+            continue
+        algorithm = _default_algorithm(entry)
+        try:
+            key = jwk.construct(entry, algorithm)
+        except Exception as exc:
+            logger.warning(
+                "Skipping Supabase JWK %s (%s): %s", entry.get("kid"), algorithm, exc
+            )
+            continue
+        registry[entry["kid"]] = VerificationKey(
+            kid=entry["kid"], algorithm=algorithm, key=key
+        )
+    return registry
+
+
+class JWKSManager:
+    def __init__(
+        self,
+        url: str,
+        *,
+        ttl_seconds: float = 3600,
+        refresh_margin_seconds: float = 300,
+        unknown_kid_min_interval: float = 30,
+        timeout: float = 5.0,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+    ) -> None:
+        self.url = url
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = min(refresh_margin_seconds, ttl_seconds / 2)
+        self.unknown_kid_min_interval = unknown_kid_min_interval
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+
+        self._jwks: Optional[Dict[str, Any]] = None
+        self._keys_by_kid: Dict[str, VerificationKey] = {}
+        self._fetched_at: float = 0.0
+        # -inf: lần fetch đầu không bị chặn (monotonic() có thể nhỏ ngay sau boot)
+        self._last_attempt_at: float = float("-inf")
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.version = 0
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    async def get_jwks(self) -> Dict[str, Any]:
+        """Return the current key set, refreshing in the background when due."""
+        if self._jwks is None:
+            if not self._fetch_allowed():
+                # Cold start và lần fetch trước vừa lỗi: báo lỗi ngay, không retry lại
+                raise JWKSUnavailableError(
+                    "Supabase JWKS unavailable (retrying after back-off)"
+                )
+            await self._refresh()
+            assert self._jwks is not None
+            return self._jwks
+
+        age = time.monotonic() - self._fetched_at
+        if age >= self.ttl_seconds - self.refresh_margin_seconds:
+            # Stale-while-revalidate: trả về key set cũ, refresh chạy nền
+            self._schedule_refresh()
+        return self._jwks
+
+    async def get_key(self, kid: str) -> Optional[VerificationKey]:
+        """Return the verification key for `kid`, refreshing once if the kid is unknown."""
+        await self.get_jwks()
+        key = self._keys_by_kid.get(kid)
+        if key is not None:
+            return key
+
+        # kid lạ: có thể Supabase vừa xoay khóa. Chặn việc token giả với kid
+        # ngẫu nhiên kích hoạt fetch liên tục bằng khoảng cách tối thiểu.
+        if not self._fetch_allowed():
+            return None
+
+        logger.info("Supabase JWKS cache miss for kid %s. Refreshing…", kid)
+        try:
+            await self._refresh()
+        except JWKSUnavailableError:
+            return None
+        return self._keys_by_kid.get(kid)
+
+    async def warm_up(self) -> None:
+        """Prefetch the key set (called from the application lifespan)."""
+        await self.get_jwks()
+
+    def invalidate(self) -> None:
+        self._fetched_at = 0.0
+
+    def load_jwks(self, jwks: Dict[str, Any]) -> None:
+        """Install a key set and rebuild the per-kid key registry."""
+        self._keys_by_kid = build_key_registry(jwks)
+        self._jwks = jwks
+        self._fetched_at = time.monotonic()
+        self.version += 1
+
+    # ------------------------------------------------------------------
+    # Refresh (single-flight)
+    # ------------------------------------------------------------------
+    @property
+    def _refreshing(self) -> bool:
+        return self._refresh_task is not None and not self._refresh_task.done()
+
+    def _fetch_allowed(self) -> bool:
+        """A fetch is running (join it) or the last attempt is old enough."""
+        if self._refreshing:
+            return True
+        since_last = time.monotonic() - self._last_attempt_at
+        return since_last >= self.unknown_kid_min_interval
+
+    def _schedule_refresh(self) -> asyncio.Task:
+        if not self._refreshing:
+            self._refresh_task = asyncio.create_task(self._fetch_and_store())
+            self._refresh_task.add_done_callback(self._consume_task_error)
+        assert self._refresh_task is not None
+        return self._refresh_task
+
+    async def _refresh(self) -> None:
+        # shield: một request bị huỷ không được huỷ luôn lượt fetch dùng chung
+        await asyncio.shield(self._schedule_refresh())
+
+    @staticmethod
+    def _consume_task_error(task: asyncio.Task) -> None:
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch_and_store(self) -> None:
+        self._last_attempt_at = time.monotonic()
+        try:
+            jwks = await self._fetch()
+        except JWKSUnavailableError:
+            if self._jwks is not None:
+                # Giữ key set cũ; thử lại sau unknown_kid_min_interval giây
+                self._fetched_at = max(
+                    self._fetched_at,
+                    time.monotonic()
+                    - self.ttl_seconds
+                    + self.refresh_margin_seconds
+                    + self.unknown_kid_min_interval,
+                )
+                logger.warning("Serving stale Supabase JWKS after refresh failure")
+            raise
+
+        self.load_jwks(jwks)
+
+    async def _fetch(self) -> Dict[str, Any]:
+        last_exception: Optional[BaseException] = None
+        headers = {"User-Agent": "FastAPI-Supabase-Auth/1.0"}
+
+        async with httpx.AsyncClient(timeout=self.timeout, headers=headers) as client:
+            for attempt in range(self.max_retries):
+                try:
+                    response = await client.get(self.url)
+                    response.raise_for_status()
+                    jwks = response.json()
+                    if not isinstance(jwks, dict):
+                        raise ValueError("JWKS response is not a JSON object")
+                    logger.debug(
+                        "Successfully fetched Supabase JWKS (attempt %d)", attempt + 1
+                    )
+                    return jwks
+                except (httpx.TransportError, httpx.HTTPStatusError) as exc:
+                    last_exception = exc
+                    if attempt < self.max_retries - 1:
+                        delay = self.base_delay * (2**attempt)
+                        logger.warning(
+                            "Failed to fetch Supabase JWKS (attempt %d/%d): %s. Retrying in %.2fs...",
+                            attempt + 1,
+                            self.max_retries,
+                            exc,
+                            delay,
+                        )
+                        await asyncio.sleep(delay)
+                    else:
+                        logger.error(
+                            "Failed to fetch Supabase JWKS after %d attempts: %s",
+                            self.max_retries,
+                            exc,
+                        )
+                except Exception as exc:
+                    # Non-retryable errors (e.g., JSON decode error)
+                    logger.error("Failed to fetch Supabase JWKS (non-retryable): %s", exc)
+                    raise JWKSUnavailableError(str(exc)) from exc
+
+        raise JWKSUnavailableError(str(last_exception)) from last_exception
+
+
+jwks_manager = JWKSManager(
+    settings.SUPABASE_JWKS_URL,
+    ttl_seconds=settings.SUPABASE_JWKS_TTL_SECONDS,
+    refresh_margin_seconds=settings.SUPABASE_JWKS_REFRESH_MARGIN_SECONDS,
+)
@@ -0,0 +1,154 @@
+"""
+Logging setup: records leave the event loop through a bounded queue.
+
+- `setup_logging()` installs a single `BoundedQueueHandler` on the root
+  logger; a `QueueListener` thread formats the records and writes them to
+  stderr, so a slow or blocked log sink never stalls request handling
+- The queue is bounded (LOG_QUEUE_SIZE); when it is full new records are
+  dropped instead of blocking, and a warning with the number of dropped
+  records is emitted once there is room again
+- Formatting is lazy: the request path only enqueues the record (message
+  and args untouched); `JsonFormatter` (LOG_FORMAT=json) or the plain text
+  format runs on the listener thread
+- `RequestLogSampler` decides which per-request "Request completed" lines
+  are logged: errors and slow requests always, the rest at
+  LOG_REQUEST_SAMPLE_RATE
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Thuộc tính có sẵn của LogRecord; phần còn lại (extra=...) được đưa vào JSON
+_RESERVED_ATTRS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", (), None)).keys()
+) | {"message", "asctime", "taskName"}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra=` fields become top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler that never blocks and defers formatting to the listener."""
+
+    def __init__(self, maxsize: int) -> None:
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Chỉ render traceback ngay (frame có thể thay đổi); message/args để listener format
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if self.dropped:
+                self.queue.put_nowait(self._dropped_record())
+                self.dropped = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _dropped_record(self) -> logging.LogRecord:
+        return logging.LogRecord(
+            name=__name__,
+            level=logging.WARNING,
+            pathname=__file__,
+            lineno=0,
+            msg="Log queue full: dropped %d records",
+            args=(self.dropped,),
+            exc_info=None,
+        )
+
+
+class RequestLogSampler:
+    """Keep every error or slow request line, sample the rest."""
+
+    def __init__(self, rate: float, slow_ms: float) -> None:
+        self.rate = min(1.0, max(0.0, rate))
+        self.slow_seconds = slow_ms / 1000 if slow_ms > 0 else None
+
+    def keep(self, status_code: int, duration: float) -> bool:
+        if status_code >= 500:
+            return True
+        if self.slow_seconds is not None and duration >= self.slow_seconds:
+            return True
+        return self.rate >= 1.0 or random.random() < self.rate
+
+
+def setup_logging(
+    level: str = "INFO", log_format: str = "json", queue_size: int = 10000
+) -> None:
+    """Configure the root logger (and uvicorn's loggers) once per process."""
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter: logging.Formatter = (
+        JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+    )
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    if queue_size <= 0:
+        # LOG_QUEUE_SIZE=0: ghi đồng bộ như trước (debug)
+        root.addHandler(stream_handler)
+    else:
+        queue_handler = BoundedQueueHandler(queue_size)
+        root.addHandler(queue_handler)
+        _listener = QueueListener(
+            queue_handler.queue, stream_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(stop_logging)
+
+    # uvicorn tự gắn StreamHandler ghi đồng bộ: cho đi qua root (hàng đợi) thay vào đó
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
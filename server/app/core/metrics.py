@@ -0,0 +1,297 @@
+"""
+Prometheus helpers: bounded label cardinality and multi-worker exposition.
+
+- `route_label()` turns a request into the matched route template
+  (`/api/v1/library/documents/{document_id}`) instead of the raw path, with
+  one bucket for mounted apps and one for paths no route matched
+- `SeriesLimiter` wraps a labelled collector and stops creating new series
+  once a metric reaches its cap; further label sets are folded into a
+  single overflow series and counted in `metrics_series_overflow_total`
+- Multiprocess mode: when `PROMETHEUS_MULTIPROC_DIR` is set (it must be in
+  the environment before prometheus_client is imported), every worker writes
+  its samples to files in that directory and `render_latest()` aggregates
+  all of them, so a scrape that lands on any worker sees the whole server.
+  The gunicorn master clears the directory on start and marks exited
+  workers dead (see gunicorn.conf.py)
+- `LatencyWindows` keeps a ring buffer of request-duration histogram
+  snapshots and computes p50/p95/p99 per route over rolling windows for the
+  admin dashboard
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = "__unmatched__"
+OVERFLOW_LABEL = "__overflow__"
+
+
+def route_label(scope: Dict[str, Any]) -> str:
+    """Route template for metric labels; call after the router has run."""
+    route = scope.get("route")
+    template: Optional[str] = getattr(route, "path_format", None) or getattr(
+        route, "path", None
+    )
+    if template is None:
+        if scope.get("endpoint") is not None and scope.get("root_path"):
+            # Ứng dụng mount (vd. StaticFiles /uploads): một series cho cả mount
+            mount = scope["root_path"][len(scope.get("app_root_path", "")) :]
+            return f"{mount}/{{path}}"
+        return UNMATCHED_ROUTE
+
+    # Router được include có thể chỉ lưu template không kèm prefix: dựng lại
+    # phần đã khớp từ path params rồi lấy prefix từ path thực tế
+    path: str = scope.get("path", "")
+    rendered = template
+    for name, value in (scope.get("path_params") or {}).items():
+        rendered = rendered.replace(f"{{{name}}}", str(value))
+    if path != rendered and path.endswith(rendered):
+        return path[: len(path) - len(rendered)] + template
+    return template
+
+
+class SeriesLimiter:
+    """Cap the number of label sets (series) a Prometheus metric may create."""
+
+    def __init__(
+        self, metric: Any, max_series: int, overflow_counter: Any = None
+    ) -> None:
+        self._metric = metric
+        self._max_series = max_series
+        self._overflow_counter = overflow_counter
+        self._seen: Set[Tuple[Tuple[str, str], ...]] = set()
+        self._warned = False
+
+    @property
+    def name(self) -> str:
+        return getattr(self._metric, "_name", "unknown")
+
+    def labels(self, **labels: str) -> Any:
+        if self._max_series <= 0:
+            return self._metric.labels(**labels)
+        key = tuple(sorted(labels.items()))
+        if key not in self._seen:
+            if len(self._seen) >= self._max_series:
+                return self._overflow(labels)
+            self._seen.add(key)
+        return self._metric.labels(**labels)
+
+    def _overflow(self, labels: Dict[str, str]) -> Any:
+        if not self._warned:
+            self._warned = True
+            logger.warning(
+                "Metric %s reached %d series; new label sets go to %s",
+                self.name,
+                self._max_series,
+                OVERFLOW_LABEL,
+            )
+        if self._overflow_counter is not None:
+            self._overflow_counter.labels(metric=self.name).inc()
+        return self._metric.labels(**{name: OVERFLOW_LABEL for name in labels})
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._metric, name)
+
+
+def multiprocess_dir() -> Optional[str]:
+    """Shared metrics directory when multiprocess mode is enabled."""
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.environ.get(
+        "prometheus_multiproc_dir"
+    )
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """Exposition body and content type for `/metrics`."""
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+
+    if multiprocess_dir():
+        from prometheus_client import CollectorRegistry, multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead(pid: Optional[int] = None) -> None:
+    """Drop the live-gauge files of a worker that is exiting."""
+    if not multiprocess_dir():
+        return
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(pid or os.getpid())
+
+
+def collect_family(name: str) -> Optional[Any]:
+    """Return the collected metric family `name` (all workers in multiprocess mode)."""
+    from prometheus_client import REGISTRY
+
+    if multiprocess_dir():
+        from prometheus_client import CollectorRegistry, multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    for family in registry.collect():
+        if family.name == name:
+            return family
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Rolling latency percentiles
+# ---------------------------------------------------------------------------
+
+RouteKey = Tuple[str, str]  # (method, route template)
+
+
+@dataclass
+class HistogramSnapshot:
+    """Cumulative bucket counts per route at one point in time."""
+
+    timestamp: float
+    bounds: Tuple[float, ...] = ()
+    buckets: Dict[RouteKey, List[float]] = field(default_factory=dict)
+    sums: Dict[RouteKey, float] = field(default_factory=dict)
+
+
+def histogram_quantile(
+    quantile: float, bounds: Sequence[float], cumulative: Sequence[float]
+) -> Optional[float]:
+    """Prometheus-style quantile: linear interpolation inside the target bucket."""
+    total = cumulative[-1] if cumulative else 0
+    if total <= 0:
+        return None
+    rank = quantile * total
+    lower, below = 0.0, 0.0
+    for upper, count in zip(bounds, cumulative):
+        if count >= rank:
+            if math.isinf(upper):
+                return lower  # rơi vào bucket +Inf: trả về cận hữu hạn lớn nhất
+            in_bucket = count - below
+            if in_bucket <= 0:
+                return upper
+            return lower + (upper - lower) * (rank - below) / in_bucket
+        lower, below = upper, count
+    return lower
+
+
+class LatencyWindows:
+    """Ring buffer of `http_request_duration_seconds` snapshots.
+
+    A snapshot is taken every `interval` seconds and kept for `horizon`
+    seconds. The percentile for a window is computed from the difference
+    between the live histogram and the newest snapshot at least that old, so
+    the admin UI gets p50/p95/p99 over the last 1/5/60 minutes without an
+    external Prometheus. Accuracy is bounded by the histogram buckets.
+    """
+
+    def __init__(
+        self,
+        metric_name: str = "http_request_duration_seconds",
+        interval: float = 15.0,
+        horizon: float = 3600.0,
+    ) -> None:
+        self.metric_name = metric_name
+        self.interval = interval
+        self._ring: Deque[HistogramSnapshot] = deque(
+            maxlen=int(math.ceil(horizon / interval)) + 1
+        )
+
+    def snapshot(self, now: Optional[float] = None) -> HistogramSnapshot:
+        snap = HistogramSnapshot(timestamp=time.time() if now is None else now)
+        family = collect_family(self.metric_name)
+        if family is None:
+            return snap
+
+        per_route: Dict[RouteKey, Dict[float, float]] = {}
+        for sample in family.samples:
+            key = (sample.labels.get("method", ""), sample.labels.get("endpoint", ""))
+            if sample.name.endswith("_bucket"):
+                per_route.setdefault(key, {})[float(sample.labels["le"])] = sample.value
+            elif sample.name.endswith("_sum"):
+                snap.sums[key] = snap.sums.get(key, 0.0) + sample.value
+
+        bounds = sorted({le for counts in per_route.values() for le in counts})
+        snap.bounds = tuple(bounds)
+        for key, counts in per_route.items():
+            snap.buckets[key] = [counts.get(le, 0.0) for le in bounds]
+        return snap
+
+    def record(self, now: Optional[float] = None) -> None:
+        self._ring.append(self.snapshot(now))
+
+    def _baseline(self, since: float) -> Optional[HistogramSnapshot]:
+        """Newest snapshot taken at or before `since` (else the oldest one)."""
+        baseline = None
+        for snap in self._ring:
+            if snap.timestamp <= since:
+                baseline = snap
+            else:
+                break
+        if baseline is None and self._ring:
+            baseline = self._ring[0]
+        return baseline
+
+    def summarize(
+        self,
+        windows: Sequence[Tuple[str, float]] = (("1m", 60), ("5m", 300), ("60m", 3600)),
+        quantiles: Sequence[float] = (0.5, 0.95, 0.99),
+        now: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        current = self.snapshot(now)
+        result: Dict[str, Any] = {}
+        for label, seconds in windows:
+            baseline = self._baseline(current.timestamp - seconds)
+            routes = []
+            for key, counts in current.buckets.items():
+                if baseline is not None and baseline.bounds == current.bounds:
+                    base = baseline.buckets.get(key, [0.0] * len(counts))
+                    base_sum = baseline.sums.get(key, 0.0)
+                else:
+                    base, base_sum = [0.0] * len(counts), 0.0
+                delta = [max(0.0, c - b) for c, b in zip(counts, base)]
+                requests = delta[-1] if delta else 0
+                if requests <= 0:
+                    continue
+                entry: Dict[str, Any] = {
+                    "route": f"{key[0]} {key[1]}",
+                    "requests": int(requests),
+                    "avg_seconds": round(
+                        max(0.0, current.sums.get(key, 0.0) - base_sum) / requests, 4
+                    ),
+                }
+                for q in quantiles:
+                    value = histogram_quantile(q, current.bounds, delta)
+                    entry[f"p{int(q * 100)}_seconds"] = (
+                        round(value, 4) if value is not None else None
+                    )
+                routes.append(entry)
+            routes.sort(key=lambda entry: entry["requests"], reverse=True)
+            result[label] = {
+                "covered_seconds": round(
+                    current.timestamp - baseline.timestamp, 1
+                )
+                if baseline is not None
+                else None,
+                "routes": routes,
+            }
+        return result
+
+    async def run(self) -> None:
+        while True:
+            try:
+                self.record()
+            except Exception as exc:
+                logger.debug("Latency snapshot failed: %s", exc)
+            await asyncio.sleep(self.interval)
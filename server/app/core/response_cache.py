@@ -0,0 +1,301 @@
+"""
+In-process response cache for public, anonymous catalog reads.
+
+- Entries are JSON bodies in an `ExpiringLRUCache` (RESPONSE_CACHE_MAX_ENTRIES,
+  RESPONSE_CACHE_TTL_SECONDS), keyed by route path plus the endpoint's
+  parsed query parameters (defaults filled in, enums by value, None dropped),
+  so `?limit=50` and no query string share an entry
+- Every entry carries tags (`library:documents`, `library:subject:<code>`,
+  `news`, ...). Invalidating a tag bumps its generation; an entry whose tag
+  generations changed since it was computed is a miss. A `prefix:*` tag
+  invalidates the whole family (`library:subject:*`)
+- Writes invalidate automatically: Session events collect the rows a commit
+  touched and `TABLE_TAGS` / `_row_tags` map them to tags. Counter updates
+  run through `execute_on_primary` are ignored (bounded by the TTL)
+- Concurrent misses for the same key are coalesced (single-flight): one
+  request queries the database, the others await its result
+- Lookups are counted in `response_cache_requests_total{result=hit|miss|coalesced}`
+
+The cache is per worker. Entries also remember the table stamps
+(catalog_versions.catalog_version) their ETag was built from; once this
+worker's stamp picks up a write handled by another worker, the entry is
+recomputed, so a body and its ETag always match. Without ETags
+(CATALOG_ETAG_ENABLED=false) such writes show up when the entry's TTL runs out.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import enum
+import time
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+)
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .database import COUNTER_WRITE_KEY
+from .serialization import list_adapter
+from ..utils.lru_cache import ExpiringLRUCache
+
+_WRITTEN_TAGS_KEY = "response_cache_written_tags"
+
+# Tag bị ảnh hưởng khi không biết dòng cụ thể (bulk update/delete)
+TABLE_TAGS: Dict[str, Tuple[str, ...]] = {
+    "library_documents": ("library:documents", "library:subject:*"),
+    "library_subjects": ("library:subjects",),
+    "news": ("news",),
+    "products": ("products",),
+}
+
+CacheKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class _Entry:
+    __slots__ = ("body", "generations", "version")
+
+    def __init__(
+        self, body: bytes, generations: Tuple[int, ...], version: Optional[str]
+    ) -> None:
+        self.body = body
+        self.generations = generations
+        self.version = version
+
+
+class ResponseCache:
+    """Tagged LRU+TTL cache of JSON bodies with single-flight misses."""
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 30.0) -> None:
+        self.ttl = ttl
+        self._entries: ExpiringLRUCache[Tuple[Tuple[str, ...], _Entry]] = ExpiringLRUCache(
+            max_entries
+        )
+        self._generations: Dict[str, int] = {}
+        self._inflight: Dict[Hashable, "asyncio.Future[bytes]"] = {}
+        self._counter: Any = None
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def key(route: str, **params: Any) -> CacheKey:
+        normalized = []
+        for name, value in params.items():
+            if value is None:
+                continue
+            if isinstance(value, enum.Enum):
+                value = value.value
+            normalized.append((name, str(value)))
+        return route, tuple(sorted(normalized))
+
+    def _generation(self, tag: str) -> int:
+        family = tag.rsplit(":", 1)[0] + ":*" if ":" in tag else None
+        generation = self._generations.get(tag, 0)
+        if family is not None and family != tag:
+            generation += self._generations.get(family, 0)
+        return generation
+
+    def _snapshot(self, tags: Sequence[str]) -> Tuple[int, ...]:
+        return tuple(self._generation(tag) for tag in tags)
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._generations.clear()
+
+    def _record(self, result: str) -> None:
+        if self._counter is not None:
+            self._counter.labels(result=result).inc()
+
+    async def get_or_compute(
+        self,
+        key: CacheKey,
+        tags: Sequence[str],
+        compute: Callable[[], Awaitable[bytes]],
+        version: Optional[str] = None,
+    ) -> bytes:
+        """
+        Cached body for `key`, or the result of `compute()`.
+
+        `version` is the data version the response's ETag was built from: an
+        entry stored under another version is a miss, so a client never gets
+        a new ETag with an old body.
+        """
+        tags = tuple(tags)
+        cached = self._entries.get(key)
+        if cached is not None:
+            entry_tags, entry = cached
+            if (
+                entry_tags == tags
+                and entry.version == version
+                and entry.generations == self._snapshot(tags)
+            ):
+                self.hits += 1
+                self._record("hit")
+                return entry.body
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            self._record("coalesced")
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # Request dẫn đầu bị hủy (client ngắt): tự query
+
+        self.misses += 1
+        self._record("miss")
+        # Chụp generation trước khi query: ghi xảy ra trong lúc query -> entry cũ ngay
+        generations = self._snapshot(tags)
+        future: "asyncio.Future[bytes]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            body = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # không có ai chờ thì không cảnh báo "never retrieved"
+            raise
+        else:
+            future.set_result(body)
+            self._entries.set(
+                key, (tags, _Entry(body, generations, version)), time.time() + self.ttl
+            )
+            return body
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def respond(
+        self,
+        key: CacheKey,
+        tags: Sequence[str],
+        model: Type[BaseModel],
+        load: Callable[[], Awaitable[Sequence[BaseModel]]],
+        headers: Optional[Mapping[str, str]] = None,
+        version: Optional[str] = None,
+    ) -> Response:
+        """JSON response for a list of `model`, served from cache when possible."""
+
+        async def compute() -> bytes:
+            return list_adapter(model).dump_json(await load())
+
+        if settings.RESPONSE_CACHE_ENABLED:
+            body = await self.get_or_compute(key, tags, compute, version)
+        else:
+            body = await compute()
+        response = Response(content=body, media_type="application/json")
+        if headers:
+            # Header đã đặt trên Response tiêm vào endpoint (vd. ETag)
+            for name, value in headers.items():
+                if name.lower() not in ("content-length", "content-type"):
+                    response.headers[name] = value
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "maxsize": self._entries.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            # Request chờ chung một query cũng không chạm DB
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4)
+            if lookups
+            else None,
+        }
+
+
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+)
+
+
+def bind_response_cache_metrics(counter: Any) -> None:
+    """Register a Prometheus Counter (label `result`) for cache lookups."""
+    response_cache._counter = counter
+
+
+# ---------------------------------------------------------------------------
+# Write invalidation
+# ---------------------------------------------------------------------------
+
+
+def _history_values(obj: Any, attribute: str) -> Set[Any]:
+    history = inspect(obj).attrs[attribute].history
+    return {
+        value
+        for value in (*history.added, *history.unchanged, *history.deleted)
+        if value is not None
+    }
+
+
+def _row_tags(obj: Any) -> Set[str]:
+    table = getattr(obj, "__table__", None)
+    if table is None or table.name not in TABLE_TAGS:
+        return set()
+    if table.name == "library_documents":
+        tags = {"library:documents"}
+        # Cả mã môn cũ lẫn mới (đổi môn cho tài liệu)
+        tags.update(f"library:subject:{code}" for code in _history_values(obj, "subject_code"))
+        return tags
+    return set(TABLE_TAGS[table.name])
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tags(session: Session, flush_context: Any) -> None:
+    tags: Set[str] = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        tags.update(_row_tags(obj))
+    if tags:
+        session.info.setdefault(_WRITTEN_TAGS_KEY, set()).update(tags)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_tags(orm_execute_state: Any) -> None:
+    if not (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ) or orm_execute_state.session.info.get(COUNTER_WRITE_KEY):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    tags = TABLE_TAGS.get(getattr(table, "name", None) or "")
+    if tags:
+        orm_execute_state.session.info.setdefault(_WRITTEN_TAGS_KEY, set()).update(tags)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_written_tags(session: Session) -> None:
+    tags = session.info.pop(_WRITTEN_TAGS_KEY, None)
+    if tags:
+        response_cache.invalidate(tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_written_tags(session: Session) -> None:
+    session.info.pop(_WRITTEN_TAGS_KEY, None)
@@ -0,0 +1,54 @@
+"""
+Fast JSON path for list endpoints.
+
+By default a list endpoint builds one Pydantic model per row, then FastAPI
+validates the returned list again against `response_model` before dumping
+it. For models the endpoint has just built from ORM rows that second pass
+is pure overhead, so list endpoints can:
+
+- `validate_list(Model, items)`: validate all rows (dicts or ORM objects,
+  `from_attributes`) in a single pydantic-core call via a cached
+  `TypeAdapter(List[Model])`
+- `trusted_list_response(Model, models)`: dump the validated models to JSON
+  bytes in one call and return a `Response`, which FastAPI sends as-is
+  without re-validating against `response_model` (still declared on the
+  route for OpenAPI)
+
+RESPONSE_SKIP_REVALIDATION=false turns the shortcut off: the models are
+returned to FastAPI and go through the usual response_model validation.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Iterable, List, Sequence, Type, TypeVar, Union
+
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+
+from .config import settings
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """Cached `TypeAdapter(List[model])` (building one compiles a schema)."""
+    return TypeAdapter(List[model])  # type: ignore[valid-type]
+
+
+def validate_list(model: Type[ModelT], items: Iterable[Any]) -> List[ModelT]:
+    """Validate all rows in one call; ORM objects are read by attribute."""
+    return list_adapter(model).validate_python(list(items), from_attributes=True)
+
+
+def trusted_list_response(
+    model: Type[ModelT], items: Sequence[ModelT]
+) -> Union[Response, Sequence[ModelT]]:
+    """Serialize already-validated `model` instances without FastAPI re-validating them."""
+    if not settings.RESPONSE_SKIP_REVALIDATION:
+        return items
+    return Response(
+        content=list_adapter(model).dump_json(items),
+        media_type="application/json",
+    )
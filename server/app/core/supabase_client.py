@@ -9,18 +9,19 @@ other write paths now use SQLAlchemy directly.
 from __future__ import annotations
 
 import logging
-from typing import Optional
-
-from supabase import Client, create_client
+from typing import TYPE_CHECKING, Optional
 
 from .config import settings
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 logger = logging.getLogger(__name__)
 
-_client: Optional[Client] = None
+_client: Optional["Client"] = None
 
 
-def get_supabase_client() -> Optional[Client]:
+def get_supabase_client() -> Optional["Client"]:
     if _client is not None:
         return _client
 
@@ -32,6 +33,9 @@ def get_supabase_client() -> Optional[Client]:
         return None
 
     try:
+        # Import lazily: the supabase SDK adds ~150ms to `import app.main`
+        from supabase import create_client
+
         client = create_client(settings.SUPABASE_URL, settings.SUPABASE_SECRET_KEY)
         logger.info("Supabase client initialised for %s", settings.SUPABASE_URL)
         globals()["_client"] = client
@@ -2,26 +2,58 @@ from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from pathlib import Path
+from typing import Dict, Optional
 import logging
+import os
 import time
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
 
 from .core.config import settings
-from .core.database import init_database, create_tables_orm
+from .core.database import (
+    init_database,
+    create_tables_orm,
+    check_schema_current,
+    run_read_replica_health_checks,
+)
+from .core.jwks import jwks_manager
+from .core.log_setup import RequestLogSampler, setup_logging
 from .api.api_v1.api import api_router
-from .middleware.rate_limiter import rate_limiter
+from .middleware.compression import CompressionMiddleware, brotli_available
+from .middleware.rate_limiter import RateLimitMiddleware, rate_limiter
+from .middleware.auth import bind_token_cache_metrics
+from .core.response_cache import bind_response_cache_metrics
+from .core.metrics import (
+    LatencyWindows,
+    SeriesLimiter,
+    mark_worker_dead,
+    multiprocess_dir,
+    render_latest,
+    route_label,
+)
+from .core.db_metrics import (
+    RequestQueryStats,
+    bind_db_metrics,
+    start_request_tracking,
+    stop_request_tracking,
+)
 
 # Import models to ensure they are registered with SQLAlchemy before database initialization
 import app.models  # noqa: F401
 # NOTE: redis_service removed - server/ does not use Redis according to system architecture
 
 # Setup logging first
-logging.basicConfig(
-    level=getattr(logging, settings.LOG_LEVEL),
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+setup_logging(
+    level=settings.LOG_LEVEL,
+    log_format=settings.LOG_FORMAT,
+    queue_size=settings.LOG_QUEUE_SIZE,
 )
 logger = logging.getLogger(__name__)
+request_log_sampler = RequestLogSampler(
+    settings.LOG_REQUEST_SAMPLE_RATE, settings.LOG_SLOW_REQUEST_MS
+)
 
 # Initialize Prometheus metrics (if enabled)
 prometheus_available = False
@@ -34,14 +66,40 @@ db_query_duration_seconds = None
 db_connections_active = None
 db_connections_idle = None
 db_query_errors_total = None
+db_pool_checkout_wait_seconds = None
 app_uptime_seconds = None
 app_start_time = None
+auth_token_cache_requests_total = None
+response_cache_requests_total = None
+latency_windows: Optional[LatencyWindows] = None
+
+
+def init_prometheus_metrics() -> None:
+    """
+    Create the Prometheus collectors and bind them to the DB/auth hooks.
+
+    Called from the lifespan rather than at import so that `import app.main`
+    (worker boot, scripts, alembic) does not pay for prometheus_client.
+    """
+    global prometheus_available, http_requests_total, http_request_duration_seconds
+    global http_requests_in_progress, http_errors_total, db_query_duration_seconds
+    global db_connections_active, db_connections_idle, db_query_errors_total
+    global db_pool_checkout_wait_seconds, app_uptime_seconds, app_start_time
+    global auth_token_cache_requests_total, response_cache_requests_total, latency_windows
+
+    if not settings.PROMETHEUS_ENABLED:
+        logger.info("Prometheus metrics disabled")
+        return
+    if prometheus_available:
+        return
+
+    shared_dir = multiprocess_dir()
+    if shared_dir:
+        # Mỗi worker ghi vào file trong thư mục chung, /metrics gộp lại
+        os.makedirs(shared_dir, exist_ok=True)
 
-if settings.PROMETHEUS_ENABLED:
     try:
         from prometheus_client import (
-            generate_latest,
-            CONTENT_TYPE_LATEST,
             Counter,
             Histogram,
             Gauge,
@@ -58,7 +116,11 @@ if settings.PROMETHEUS_ENABLED:
             "db_connections_active",
             "db_connections_idle",
             "db_query_errors_total",
+            "db_pool_checkout_wait_seconds",
             "app_uptime_seconds",
+            "auth_token_cache_requests_total",
+            "response_cache_requests_total",
+            "metrics_series_overflow_total",
         ]
         for name in metric_names:
             try:
@@ -68,71 +130,168 @@ if settings.PROMETHEUS_ENABLED:
             except (KeyError, AttributeError, ValueError):
                 pass  # Metric doesn't exist yet, that's fine
 
-        # HTTP Request metrics
-        http_requests_total = Counter(
-            "http_requests_total",
-            "Total number of HTTP requests",
-            ["method", "endpoint", "status_code"],
+        # Cardinality guard: mỗi metric có nhãn tối đa METRICS_MAX_SERIES_PER_METRIC series
+        series_overflow_total = Counter(
+            "metrics_series_overflow_total",
+            "Observations folded into the overflow series after a metric hit its series cap",
+            ["metric"],
+        )
+
+        def capped(metric):
+            return SeriesLimiter(
+                metric, settings.METRICS_MAX_SERIES_PER_METRIC, series_overflow_total
+            )
+
+        # HTTP Request metrics (endpoint = route template, không phải path thực tế)
+        http_requests_total = capped(
+            Counter(
+                "http_requests_total",
+                "Total number of HTTP requests",
+                ["method", "endpoint", "status_code"],
+            )
+        )
+        http_request_duration_seconds = capped(
+            Histogram(
+                "http_request_duration_seconds",
+                "HTTP request duration in seconds",
+                ["method", "endpoint"],
+                # Bucket dày hơn để p50/p95/p99 nội suy trong /admin/metrics đủ chính xác
+                buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+            )
         )
-        http_request_duration_seconds = Histogram(
+        latency_windows = LatencyWindows(
             "http_request_duration_seconds",
-            "HTTP request duration in seconds",
-            ["method", "endpoint"],
-            buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0),
+            interval=settings.METRICS_LATENCY_SNAPSHOT_SECONDS,
         )
         http_requests_in_progress = Gauge(
             "http_requests_in_progress",
             "Number of HTTP requests currently being processed",
+            multiprocess_mode="livesum",
         )
-        http_errors_total = Counter(
-            "http_errors_total",
-            "Total number of HTTP errors",
-            ["method", "endpoint", "error_type"],
+        http_errors_total = capped(
+            Counter(
+                "http_errors_total",
+                "Total number of HTTP errors",
+                ["method", "endpoint", "error_type"],
+            )
         )
 
         # Database metrics
-        db_query_duration_seconds = Histogram(
-            "db_query_duration_seconds",
-            "Database query duration in seconds",
-            ["operation", "table"],
-            buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.0, 5.0),
+        db_query_duration_seconds = capped(
+            Histogram(
+                "db_query_duration_seconds",
+                "Database query duration in seconds",
+                ["operation", "table"],
+                buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.0, 5.0),
+            )
         )
         db_connections_active = Gauge(
             "db_connections_active",
             "Number of active database connections",
             ["pool"],
+            multiprocess_mode="livesum",
         )
         db_connections_idle = Gauge(
             "db_connections_idle",
             "Number of idle database connections",
             ["pool"],
+            multiprocess_mode="livesum",
         )
-        db_query_errors_total = Counter(
-            "db_query_errors_total",
-            "Total number of database query errors",
-            ["operation", "error_type"],
+        db_query_errors_total = capped(
+            Counter(
+                "db_query_errors_total",
+                "Total number of database query errors",
+                ["operation", "error_type"],
+            )
+        )
+        db_pool_checkout_wait_seconds = Histogram(
+            "db_pool_checkout_wait_seconds",
+            "Time spent waiting to check a connection out of the pool",
+            ["pool"],
+            buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0),
+        )
+        bind_db_metrics(
+            db_query_duration_seconds,
+            db_query_errors_total,
+            db_pool_checkout_wait_seconds,
         )
 
         # Application metrics
         app_uptime_seconds = Gauge(
             "app_uptime_seconds",
             "Application uptime in seconds",
+            multiprocess_mode="livemax",
         )
 
+        # Auth metrics
+        auth_token_cache_requests_total = Counter(
+            "auth_token_cache_requests_total",
+            "Verified Supabase JWT cache lookups",
+            ["result"],
+        )
+        bind_token_cache_metrics(auth_token_cache_requests_total)
+
+        # Response cache (hit rate = hit + coalesced trên tổng)
+        response_cache_requests_total = Counter(
+            "response_cache_requests_total",
+            "Public catalog response cache lookups",
+            ["result"],
+        )
+        bind_response_cache_metrics(response_cache_requests_total)
+
         # Track app start time
         app_start_time = time.time()
 
         prometheus_available = True
-        logger.info("Prometheus metrics enabled")
+        if shared_dir:
+            logger.info("Prometheus metrics enabled (multiprocess, dir=%s)", shared_dir)
+        else:
+            logger.info("Prometheus metrics enabled")
     except ImportError:
         prometheus_available = False
         logger.warning(
             "prometheus-client not installed. Install with: uv add prometheus-client"
         )
-else:
-    logger.info("Prometheus metrics disabled")
+
+
+def update_worker_gauges() -> None:
+    """Refresh this worker's uptime and connection pool gauges."""
+    if app_uptime_seconds and app_start_time:
+        app_uptime_seconds.set(time.time() - app_start_time)
+
+    if not (db_connections_active and db_connections_idle):
+        return
+    try:
+        from app.core.database import get_write_engine, get_read_engine
+
+        for pool_name, engine in (
+            ("write", get_write_engine()),
+            ("read", get_read_engine()),
+        ):
+            if engine is None or not hasattr(engine, "pool"):
+                continue
+            pool = engine.pool
+            # SQLAlchemy Pool methods exist but linter doesn't recognize them
+            db_connections_active.labels(pool=pool_name).set(pool.checkedout())  # type: ignore
+            db_connections_idle.labels(pool=pool_name).set(pool.checkedin())  # type: ignore
+    except Exception:
+        # Ignore errors in metrics collection
+        pass
+
+
+async def _refresh_worker_gauges(interval: float = 15.0) -> None:
+    """Multiprocess mode: keep every worker's gauges fresh, not just the scraped one."""
+    import asyncio
+
+    while True:
+        update_worker_gauges()
+        await asyncio.sleep(interval)
+
 
 # Initialize Sentry for error tracking (if DSN is provided)
+# Stays at import time (unlike Prometheus and the DB engines): FastApiIntegration
+# wraps route handlers as they are registered, so it must run before api_router
+# is included below. sentry_sdk is only imported when a DSN is configured.
 if settings.SENTRY_DSN and settings.SENTRY_DSN != "your-sentry-dsn":
     try:
         import sentry_sdk
@@ -165,19 +324,46 @@ else:
     logger.info("Sentry not configured (SENTRY_DSN not set or is placeholder)")
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Application lifespan events"""
-    # Startup
-    logger.info("Starting E-Learning Platform API...")
-
-    # Initialize database with timeout to avoid blocking startup too long
-    # This allows the app to start quickly and respond to health checks
+@contextmanager
+def _startup_phase(timings: Dict[str, float], name: str):
+    """Ghi thời gian (giây) của một pha khởi động vào `timings[name]`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+async def _prepare_database(timings: Dict[str, float]) -> None:
+    """
+    Chuẩn bị schema theo DB_SCHEMA_STARTUP_MODE:
+    - auto: một query so sánh revision alembic + extension; chỉ chạy DDL khi lệch
+    - always: luôn chạy CREATE EXTENSION + create_all (hành vi cũ)
+    - skip: không kiểm tra, không DDL (migration do `alembic upgrade head` đảm nhiệm)
+    """
     import asyncio
 
-    try:
-        # Initialize database (async) with short timeout
-        logger.info("Initializing database...")
+    mode = settings.DB_SCHEMA_STARTUP_MODE.lower()
+    if mode == "skip":
+        logger.info("DB_SCHEMA_STARTUP_MODE=skip: skipping schema check and DDL")
+        return
+
+    if mode == "auto":
+        with _startup_phase(timings, "schema_check"):
+            try:
+                is_current, reason = await asyncio.wait_for(
+                    check_schema_current(), timeout=5.0
+                )
+            except asyncio.TimeoutError:
+                is_current, reason = False, "fingerprint query timed out (5s)"
+        if is_current:
+            logger.info(f"Database schema is current ({reason}), skipping DDL")
+            return
+        logger.info(f"Database schema check: {reason}. Running DDL...")
+
+    # Initialize database (async) with short timeout
+    logger.info("Initializing database...")
+    with _startup_phase(timings, "extensions"):
         try:
             await asyncio.wait_for(init_database(), timeout=5.0)
         except asyncio.TimeoutError:
@@ -185,33 +371,97 @@ async def lifespan(app: FastAPI):
                 "Database initialization timed out (5s), continuing anyway..."
             )
 
-        # Create database tables (only if they don't exist) - async with timeout
-        logger.info("Checking database tables...")
-        table_start = time.time()
+    # Create database tables (only if they don't exist) - async with timeout
+    logger.info("Checking database tables...")
+    with _startup_phase(timings, "create_all"):
         try:
             await asyncio.wait_for(create_tables_orm(), timeout=10.0)
-            table_elapsed = time.time() - table_start
-            logger.info(f"Database tables ready in {table_elapsed:.3f}s")
         except asyncio.TimeoutError:
             logger.warning(
                 "Database table creation timed out (10s), continuing anyway..."
             )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan events"""
+    # Startup
+    logger.info("Starting E-Learning Platform API...")
+    startup_timings: Dict[str, float] = {}
+    startup_start = time.perf_counter()
+
+    with _startup_phase(startup_timings, "metrics"):
+        init_prometheus_metrics()
+
+    # Initialize database with timeout to avoid blocking startup too long
+    # This allows the app to start quickly and respond to health checks
+    import asyncio
+
+    # Prefetch Supabase JWKS so the first authenticated request skips the fetch
+    if settings.SUPABASE_JWKS_URL:
+        with _startup_phase(startup_timings, "jwks"):
+            try:
+                await asyncio.wait_for(jwks_manager.warm_up(), timeout=5.0)
+                logger.info("Supabase JWKS loaded")
+            except Exception as e:
+                logger.warning(
+                    f"Supabase JWKS warm-up failed, will retry on demand: {e}"
+                )
+
+    try:
+        await _prepare_database(startup_timings)
         logger.info("Database initialization complete.")
     except Exception as e:
         logger.error(f"Error during database initialization: {e}", exc_info=True)
         # Don't raise - let the app start anyway, but log the error
         # This allows the server to start even if database connection fails initially
 
-        # NOTE: Redis is not used by server/ according to system architecture
-        # server/ only communicates with Client and Supabase (Port 5432)
+    # NOTE: Redis is not used by server/ according to system architecture
+    # server/ only communicates with Client and Supabase (Port 5432)
+    # (ngoại lệ: RATE_LIMIT_BACKEND=redis để chia sẻ hạn mức giữa các instance)
+    logger.info("Rate limit backend: %s", rate_limiter.backend.name)
+    if settings.COMPRESSION_ENABLED:
+        logger.info(
+            "Response compression: %s",
+            "br, gzip" if brotli_available() else "gzip (install brotli for br)",
+        )
+
+    # Theo dõi sức khoẻ/độ trễ của engine đọc để định tuyến đọc/ghi
+    replica_health_task = asyncio.create_task(run_read_replica_health_checks())
+    gauge_refresh_task = (
+        asyncio.create_task(_refresh_worker_gauges())
+        if prometheus_available and multiprocess_dir()
+        else None
+    )
+    # Snapshot histogram định kỳ cho p50/p95/p99 theo route trong /admin/metrics
+    latency_task = (
+        asyncio.create_task(latency_windows.run()) if latency_windows else None
+    )
 
-        logger.info("Application startup complete. Ready to accept requests.")
+    startup_timings["total"] = time.perf_counter() - startup_start
+    app.state.startup_timings = startup_timings
+    logger.info(
+        "Application startup complete in %.3fs (%s). Ready to accept requests.",
+        startup_timings["total"],
+        ", ".join(
+            f"{name}={seconds:.3f}s"
+            for name, seconds in startup_timings.items()
+            if name != "total"
+        ),
+    )
 
     yield
 
     # Shutdown
     logger.info("Shutting down E-Learning Platform API...")
+    replica_health_task.cancel()
+    if gauge_refresh_task is not None:
+        gauge_refresh_task.cancel()
+    if latency_task is not None:
+        latency_task.cancel()
+    await rate_limiter.backend.close()
+    if prometheus_available:
+        mark_worker_dead()
 
 
 # Create FastAPI app
@@ -223,8 +473,17 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
-# Add middleware
-app.middleware("http")(rate_limiter)
+# Nén response (trong cùng: thời gian nén được tính vào X-Process-Time/metrics)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+
+# Add middleware (pure ASGI, chạy sau CORS)
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
 
 # Set up CORS
 # Always add CORS middleware, use default origins if not set
@@ -245,89 +504,163 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Cache-Control", "Content-Type", "X-Process-Time"],
+    expose_headers=["Cache-Control", "Content-Type", "X-Process-Time", "Server-Timing"],
 )
 
 
-# Request timing middleware with Prometheus metrics
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
-    # Skip logging for health check endpoint (Render sends these every 5 seconds)
-    is_health_check = request.url.path == "/health"
-    is_metrics = request.url.path == "/metrics"
+def _add_server_timing(headers: MutableHeaders, stats: RequestQueryStats) -> None:
+    """Server-Timing for the DB work done before the response headers were sent."""
+    if settings.SERVER_TIMING_ENABLED:
+        headers.append(
+            "Server-Timing",
+            f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"',
+        )
 
-    # Track request in progress (skip metrics endpoint to avoid recursion)
-    if prometheus_available and not is_metrics and http_requests_in_progress:
-        http_requests_in_progress.inc()
 
-    if not is_health_check:
-        logger.info(f"Incoming request: {request.method} {request.url.path}")
+def _warn_heavy_queries(method: str, path: str, stats: RequestQueryStats) -> None:
+    """Warn when a route looks like N+1 or slow SQL."""
+    db_ms = stats.duration * 1000
+    too_many = (
+        settings.DB_REQUEST_QUERY_WARN_COUNT > 0
+        and stats.count >= settings.DB_REQUEST_QUERY_WARN_COUNT
+    )
+    too_slow = (
+        settings.DB_REQUEST_TIME_WARN_MS > 0
+        and db_ms >= settings.DB_REQUEST_TIME_WARN_MS
+    )
+    if too_many or too_slow:
+        top = "; ".join(
+            f"{count}x {fingerprint}" for fingerprint, count in stats.top_fingerprints()
+        )
+        logger.warning(
+            "Heavy DB usage: %s %s ran %d queries (%d distinct) in %.1fms. Top: %s",
+            method,
+            path,
+            stats.count,
+            len(stats.fingerprints),
+            db_ms,
+            top,
+        )
 
-    try:
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        response.headers["X-Process-Time"] = str(process_time)
-
-        # Record Prometheus metrics
-        if prometheus_available and not is_metrics:
-            method = request.method
-            endpoint = request.url.path
-            status_code = str(response.status_code)
-            if http_requests_total:
-                http_requests_total.labels(
-                    method=method, endpoint=endpoint, status_code=status_code
-                ).inc()
-            if http_request_duration_seconds:
-                http_request_duration_seconds.labels(
-                    method=method, endpoint=endpoint
-                ).observe(process_time)
-            if http_requests_in_progress:
-                http_requests_in_progress.dec()
 
-            # Track errors (4xx, 5xx)
-            if response.status_code >= 400 and http_errors_total:
-                error_type = "4xx" if 400 <= response.status_code < 500 else "5xx"
-                http_errors_total.labels(
-                    method=method, endpoint=endpoint, error_type=error_type
-                ).inc()
+def _record_request_metrics(
+    method: str,
+    endpoint: str,
+    status_code: str,
+    process_time: float,
+    error_type: Optional[str],
+) -> None:
+    if http_requests_total:
+        http_requests_total.labels(
+            method=method, endpoint=endpoint, status_code=status_code
+        ).inc()
+    if http_request_duration_seconds:
+        http_request_duration_seconds.labels(
+            method=method, endpoint=endpoint
+        ).observe(process_time)
+    # Track errors (4xx, 5xx, exception type)
+    if error_type and http_errors_total:
+        http_errors_total.labels(
+            method=method, endpoint=endpoint, error_type=error_type
+        ).inc()
+
+
+class ProcessTimeMiddleware:
+    """Request timing, Prometheus metrics and per-request DB stats (pure ASGI).
+
+    X-Process-Time and Server-Timing are added to the `http.response.start`
+    message; body chunks are passed through untouched, so StreamingResponse
+    exports are not buffered through the task/queue machinery of
+    `@app.middleware("http")`. Duration metrics are recorded once the last
+    body chunk has been sent.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.time()
+        method = scope["method"]
+        path = scope["path"]
+        query_stats, query_stats_token = start_request_tracking()
+        # Skip logging for health check endpoint (Render sends these every 5 seconds)
+        is_health_check = path == "/health"
+        # Skip metrics endpoint to avoid recursion
+        track_metrics = prometheus_available and path != "/metrics"
+        status_code = 500
+
+        if track_metrics and http_requests_in_progress:
+            http_requests_in_progress.inc()
 
         if not is_health_check:
-            logger.info(
-                f"Request completed: {request.method} {request.url.path} - {response.status_code} in {process_time:.3f}s"
+            logger.debug("Incoming request: %s %s", method, path)
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers["X-Process-Time"] = str(time.time() - start_time)
+                _add_server_timing(headers, query_stats)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except Exception as e:
+            process_time = time.time() - start_time
+            _warn_heavy_queries(method, path, query_stats)
+            if track_metrics:
+                _record_request_metrics(
+                    method, route_label(scope), "500", process_time, type(e).__name__
+                )
+            logger.error(
+                "Request failed: %s %s after %.3fs - %s: %s",
+                method,
+                path,
+                process_time,
+                type(e).__name__,
+                e,
+                exc_info=True,
             )
-        return response
-    except Exception as e:
-        process_time = time.time() - start_time
-        status_code = "500"
-
-        # Record Prometheus metrics for errors
-        if prometheus_available and not is_metrics:
-            method = request.method
-            endpoint = request.url.path
-            if http_requests_total:
-                http_requests_total.labels(
-                    method=method, endpoint=endpoint, status_code=status_code
-                ).inc()
-            if http_request_duration_seconds:
-                http_request_duration_seconds.labels(
-                    method=method, endpoint=endpoint
-                ).observe(process_time)
-            if http_requests_in_progress:
+            raise
+        else:
+            process_time = time.time() - start_time
+            _warn_heavy_queries(method, path, query_stats)
+            if track_metrics:
+                error_type = None
+                if status_code >= 400:
+                    error_type = "4xx" if status_code < 500 else "5xx"
+                _record_request_metrics(
+                    method, route_label(scope), str(status_code), process_time, error_type
+                )
+            if not is_health_check and request_log_sampler.keep(
+                status_code, process_time
+            ):
+                logger.info(
+                    "Request completed: %s %s - %s in %.3fs",
+                    method,
+                    path,
+                    status_code,
+                    process_time,
+                    extra={
+                        "method": method,
+                        "path": path,
+                        "status_code": status_code,
+                        "duration_ms": round(process_time * 1000, 1),
+                    },
+                )
+        finally:
+            if track_metrics and http_requests_in_progress:
                 http_requests_in_progress.dec()
+            stop_request_tracking(query_stats_token)
 
-            # Track error
-            if http_errors_total:
-                error_type = type(e).__name__
-                http_errors_total.labels(
-                    method=method, endpoint=endpoint, error_type=error_type
-                ).inc()
 
-        logger.error(
-            f"Request failed: {request.method} {request.url.path} after {process_time:.3f}s - {type(e).__name__}: {e}",
-            exc_info=True,
-        )
-        raise
+# Request timing middleware with Prometheus metrics (ngoài cùng: bao cả CORS và rate limit)
+app.add_middleware(ProcessTimeMiddleware)
 
 
 # Include API router
@@ -385,47 +718,10 @@ def health_check():
 async def get_metrics():
     """Prometheus metrics endpoint"""
     if prometheus_available and settings.PROMETHEUS_ENABLED:
-        # Update uptime metric
-        if app_uptime_seconds and app_start_time:
-            app_uptime_seconds.set(time.time() - app_start_time)
-
-        # Update database pool metrics if available
-        try:
-            from app.core.database import engine_write, engine_read
-
-            # Write pool metrics
-            if (
-                engine_write
-                and hasattr(engine_write, "pool")
-                and db_connections_active
-                and db_connections_idle
-            ):
-                pool = engine_write.pool
-                # SQLAlchemy Pool methods exist but linter doesn't recognize them
-                active = pool.size() - pool.checkedout()  # type: ignore
-                idle = pool.checkedin()  # type: ignore
-                db_connections_active.labels(pool="write").set(active)
-                db_connections_idle.labels(pool="write").set(idle)
-
-            # Read pool metrics
-            if (
-                engine_read
-                and hasattr(engine_read, "pool")
-                and db_connections_active
-                and db_connections_idle
-            ):
-                pool = engine_read.pool
-                # SQLAlchemy Pool methods exist but linter doesn't recognize them
-                active = pool.size() - pool.checkedout()  # type: ignore
-                idle = pool.checkedin()  # type: ignore
-                db_connections_active.labels(pool="read").set(active)
-                db_connections_idle.labels(pool="read").set(idle)
-        except Exception:
-            # Ignore errors in metrics collection
-            pass
-
-        # Return Prometheus format metrics
-        return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+        update_worker_gauges()
+        # Return Prometheus format metrics (gộp mọi worker khi chạy multiprocess)
+        content, content_type = render_latest()
+        return Response(content=content, media_type=content_type)
     else:
         # Fallback to basic JSON metrics if Prometheus is disabled
         return {
@@ -1,25 +1,23 @@
 from __future__ import annotations
 
-import json
+import hashlib
 import logging
 import time
 from dataclasses import dataclass
 from typing import Any, Dict, Optional, Set
-from urllib.request import urlopen, Request
-from urllib.error import URLError
-import socket
 from uuid import UUID
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import JWTError, jwk, jwt
-from jose.utils import base64url_decode
+from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.config import settings
-from ..core.database import get_db_session_read
+from ..core.database import get_db_session_read, set_request_user
+from ..core.jwks import JWKSUnavailableError, VerificationKey, jwks_manager
 from ..models.user import Profile
 from ..utils.auth_metadata import normalize_user_role
+from ..utils.lru_cache import ExpiringLRUCache
 
 logger = logging.getLogger(__name__)
 
@@ -28,81 +26,9 @@ security = HTTPBearer()
 # ---------------------------------------------------------------------------
 # Supabase JWT verification helpers
 # ---------------------------------------------------------------------------
-_JWKS_CACHE: Dict[str, Any] | None = None
-_JWKS_CACHE_EXPIRES_AT: float = 0.0
-_JWKS_CACHE_TTL_SECONDS = 3600
 
 
-def _fetch_jwks() -> Dict[str, Any]:
-    """Fetch JWKS from Supabase, caching the result for a short period."""
-    global _JWKS_CACHE, _JWKS_CACHE_EXPIRES_AT
-
-    now = time.time()
-    if _JWKS_CACHE and now < _JWKS_CACHE_EXPIRES_AT:
-        return _JWKS_CACHE
-
-    if not settings.SUPABASE_JWKS_URL:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="SUPABASE_JWKS_URL is not configured",
-        )
-
-    # Retry logic with exponential backoff
-    max_retries = 3
-    base_delay = 0.5  # 500ms
-    timeout = 5  # 5 seconds timeout per request
-
-    last_exception = None
-    for attempt in range(max_retries):
-        try:
-            # Set socket timeout for the request
-            socket.setdefaulttimeout(timeout)
-            request = Request(settings.SUPABASE_JWKS_URL)
-            request.add_header("User-Agent", "FastAPI-Supabase-Auth/1.0")
-
-            with urlopen(request, timeout=timeout) as response:
-                jwks = json.loads(response.read().decode("utf-8"))
-
-            # Success - cache and return
-            _JWKS_CACHE = jwks
-            _JWKS_CACHE_EXPIRES_AT = now + _JWKS_CACHE_TTL_SECONDS
-            logger.debug("Successfully fetched Supabase JWKS (attempt %d)", attempt + 1)
-            return jwks
-
-        except (URLError, socket.timeout, socket.error) as exc:
-            last_exception = exc
-            if attempt < max_retries - 1:
-                delay = base_delay * (2**attempt)  # Exponential backoff
-                logger.warning(
-                    "Failed to fetch Supabase JWKS (attempt %d/%d): %s. Retrying in %.2fs...",
-                    attempt + 1,
-                    max_retries,
-                    exc,
-                    delay,
-                )
-                time.sleep(delay)
-            else:
-                logger.error(
-                    "Failed to fetch Supabase JWKS after %d attempts: %s",
-                    max_retries,
-                    exc,
-                )
-        except Exception as exc:
-            # Non-retryable errors (e.g., JSON decode error)
-            logger.error("Failed to fetch Supabase JWKS (non-retryable): %s", exc)
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Không thể tải khóa Supabase để xác thực token",
-            ) from exc
-
-    # All retries failed
-    raise HTTPException(
-        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-        detail="Không thể kết nối đến Supabase để xác thực token. Vui lòng thử lại sau.",
-    ) from last_exception
-
-
-def _get_signing_key(token: str) -> Dict[str, Any]:
+async def _get_signing_key(token: str) -> VerificationKey:
     # Validate token format - JWT must have 3 parts separated by dots
     if not token or not isinstance(token, str):
         raise HTTPException(
@@ -122,8 +48,19 @@ def _get_signing_key(token: str) -> Dict[str, Any]:
             detail="Token không hợp lệ: định dạng JWT không đúng (phải có 3 phần)",
         )
 
-    jwks = _fetch_jwks()
-    headers = jwt.get_unverified_header(token)
+    if not settings.SUPABASE_JWKS_URL:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="SUPABASE_JWKS_URL is not configured",
+        )
+
+    try:
+        headers = jwt.get_unverified_header(token)
+    except JWTError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token Supabase không hợp lệ",
+        ) from exc
     kid = headers.get("kid")
 
     if not kid:
@@ -132,50 +69,35 @@ def _get_signing_key(token: str) -> Dict[str, Any]:
             detail="Token Supabase thiếu kid",
         )
 
-    keys = jwks.get("keys", [])
-    for key in keys:
-        if key.get("kid") == kid:
-            return key
-
-    # Nếu khóa không có trong cache, làm mới rồi thử lại một lần
-    logger.info("Supabase JWKS cache miss for kid %s. Refreshing…", kid)
-    global _JWKS_CACHE, _JWKS_CACHE_EXPIRES_AT
-    _JWKS_CACHE = None
-    _JWKS_CACHE_EXPIRES_AT = 0
-    jwks = _fetch_jwks()
-    for key in jwks.get("keys", []):
-        if key.get("kid") == kid:
-            return key
-
-    raise HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Không tìm thấy khóa ký Supabase phù hợp",
-    )
+    try:
+        key = await jwks_manager.get_key(kid)
+    except JWKSUnavailableError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Không thể kết nối đến Supabase để xác thực token. Vui lòng thử lại sau.",
+        ) from exc
 
+    if key is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Không tìm thấy khóa ký Supabase phù hợp",
+        )
+    return key
 
-def _decode_supabase_token(token: str) -> Dict[str, Any]:
-    """Decode và verify Supabase JWT bằng JWKS."""
-    signing_key = _get_signing_key(token)
-    algorithm = signing_key.get("alg", "RS256")
 
-    try:
-        public_key = jwk.construct(signing_key)
-        message, encoded_signature = token.rsplit(".", 1)
-        decoded_signature = base64url_decode(encoded_signature.encode("utf-8"))
-        if not public_key.verify(message.encode("utf-8"), decoded_signature):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Chữ ký Supabase token không hợp lệ",
-            )
+async def _decode_supabase_token(token: str) -> Dict[str, Any]:
+    """Decode và verify Supabase JWT bằng khóa đã dựng sẵn theo kid."""
+    signing_key = await _get_signing_key(token)
 
-        options = {"verify_aud": False}
-        claims = jwt.decode(
+    try:
+        # Truyền thẳng Key object: jose chỉ verify chữ ký một lần,
+        # không cần jwk.construct hay chuyển sang PEM cho mỗi request
+        return jwt.decode(
             token,
-            public_key.to_pem().decode("utf-8"),
-            algorithms=[algorithm],
-            options=options,
+            signing_key.key,
+            algorithms=[signing_key.algorithm],
+            options={"verify_aud": False},
         )
-        return claims
     except JWTError as exc:
         logger.warning("JWT decode error: %s", exc)
         raise HTTPException(
@@ -184,6 +106,55 @@ def _decode_supabase_token(token: str) -> Dict[str, Any]:
         ) from exc
 
 
+# ---------------------------------------------------------------------------
+# Verified-claims cache
+# ---------------------------------------------------------------------------
+# Cùng một token được gửi lại nhiều lần mỗi phút (đặc biệt trong giờ thi), nên
+# claims đã verify được cache theo SHA-256 của token cho tới thời điểm `exp`.
+_verified_claims_cache: ExpiringLRUCache[Dict[str, Any]] = ExpiringLRUCache(
+    settings.AUTH_TOKEN_CACHE_SIZE
+)
+_token_cache_counter: Any = None
+
+
+def bind_token_cache_metrics(counter: Any) -> None:
+    """Register a Prometheus Counter (label `result`) for cache hits/misses."""
+    global _token_cache_counter
+    _token_cache_counter = counter
+
+
+def get_token_cache_stats() -> Dict[str, Any]:
+    return _verified_claims_cache.stats()
+
+
+def clear_token_cache() -> None:
+    _verified_claims_cache.clear()
+
+
+def _record_token_cache(result: str) -> None:
+    if _token_cache_counter is not None:
+        _token_cache_counter.labels(result=result).inc()
+
+
+async def _decode_supabase_token_cached(token: str) -> Dict[str, Any]:
+    """Như `_decode_supabase_token` nhưng bỏ qua toàn bộ bước crypto khi cache hit."""
+    cache_key = hashlib.sha256(token.encode("utf-8")).digest()
+    now = time.time()
+
+    claims = _verified_claims_cache.get(cache_key, now=now)
+    if claims is not None:
+        _record_token_cache("hit")
+        return claims
+
+    _record_token_cache("miss")
+    claims = await _decode_supabase_token(token)
+
+    exp = claims.get("exp")
+    if isinstance(exp, (int, float)) and exp > now:
+        _verified_claims_cache.set(cache_key, claims, float(exp))
+    return claims
+
+
 def _extract_role(claims: Dict[str, Any]) -> str:
     """Lấy role từ app_metadata trong Supabase JWT."""
     app_metadata = claims.get("app_metadata") or {}
@@ -216,7 +187,7 @@ class AuthenticatedUser:
     claims: Dict[str, Any]
 
 
-def get_current_user_claims(
+async def get_current_user_claims(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> AuthenticatedUser:
     """Xác thực Supabase JWT và trả về claims đã chuẩn hóa."""
@@ -247,7 +218,7 @@ def get_current_user_claims(
             len(token.split(".")),
         )
 
-    claims = _decode_supabase_token(token)
+    claims = await _decode_supabase_token_cached(token)
 
     sub = claims.get("sub")
     if not sub:
@@ -268,6 +239,7 @@ def get_current_user_claims(
     email = claims.get("email")
 
     logger.debug("Authenticated Supabase user %s with role %s", user_uuid, role)
+    set_request_user(user_uuid)
 
     return AuthenticatedUser(
         user_id=user_uuid,
@@ -311,15 +283,42 @@ get_current_admin_user = _require_role(
 )
 
 
+# ---------------------------------------------------------------------------
+# Profile cache
+# ---------------------------------------------------------------------------
+# Profile trả về đã detach khỏi session (expire_on_commit=False) và chỉ được
+# đọc ở các endpoint, nên có thể dùng chung giữa các request trong TTL ngắn.
+_profile_cache: ExpiringLRUCache[Profile] = ExpiringLRUCache(
+    settings.PROFILE_CACHE_SIZE
+)
+
+
+def invalidate_user_profile(user_id: UUID | str) -> None:
+    """Xoá profile khỏi cache sau khi ghi (PATCH /users/me, endpoint admin...)."""
+    _profile_cache.pop(UUID(str(user_id)))
+
+
 async def get_current_user_profile(
     auth_user: AuthenticatedUser = Depends(get_current_authenticated_user),
     db: AsyncSession = Depends(get_db_session_read),
 ) -> Profile:
-    """Tải profile tương ứng với auth_user từ cơ sở dữ liệu."""
+    """Tải profile tương ứng với auth_user (qua cache, rồi tới cơ sở dữ liệu)."""
+    cached = _profile_cache.get(auth_user.user_id)
+    if cached is not None:
+        return cached
+
     profile = await db.get(Profile, auth_user.user_id)
     if not profile:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Hồ sơ người dùng không tồn tại",
         )
+    # Session có thể là write session dùng chung của request: tách profile ra để
+    # endpoint sửa/rollback bản của riêng nó mà không ảnh hưởng bản trong cache
+    db.expunge(profile)
+    _profile_cache.set(
+        auth_user.user_id,
+        profile,
+        time.time() + settings.PROFILE_CACHE_TTL_SECONDS,
+    )
     return profile
@@ -0,0 +1,256 @@
+"""
+Negotiated response compression (brotli / gzip), pure ASGI.
+
+Single-body responses smaller than `minimum_size` are sent as-is, larger ones
+are compressed in one go, and StreamingResponse bodies (CSV exports) are
+compressed chunk by chunk with a flush after every chunk, so the client still
+receives rows progressively. Already-encoded responses, 206 partial responses,
+file responses sent with `http.response.pathsend` and media that is already
+compressed (images, video, PDF, Office files, ...) are passed through.
+
+brotli is used when the `brotli` (or `brotlicffi`) package is installed and
+the client prefers it; otherwise gzip. Levels are kept low on purpose: the
+CPU cost per response matters more than the last few percent of size.
+
+Only the ASGI message protocol and `starlette.datastructures` are used (no
+`starlette.middleware.gzip` internals), so the middleware behaves the same on
+every Starlette version in uv.lock.
+"""
+
+from __future__ import annotations
+
+import logging
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - tùy môi trường
+    try:
+        import brotlicffi as brotli  # type: ignore[no-redef]
+    except ImportError:
+        brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Đã nén sẵn: nén lại chỉ tốn CPU ("type/*" khớp cả nhóm)
+EXCLUDED_CONTENT_TYPES: Tuple[str, ...] = (
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "application/x-7z-compressed",
+    "application/vnd.rar",
+    "application/pdf",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "audio/*",
+    "font/woff",
+    "font/woff2",
+    "image/avif",
+    "image/gif",
+    "image/jpeg",
+    "image/png",
+    "image/webp",
+    "video/*",
+    "text/event-stream",
+)
+
+# Chunk lớn hơn ngưỡng này được nén trong thread pool để không chặn event loop
+THREAD_MINIMUM_SIZE = 128 * 1024
+
+
+def brotli_available() -> bool:
+    return brotli is not None
+
+
+def parse_accept_encoding(value: str) -> Dict[str, float]:
+    """`br;q=1.0, gzip;q=0.5` -> {"br": 1.0, "gzip": 0.5}."""
+    encodings: Dict[str, float] = {}
+    for part in value.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, raw = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(raw)
+                except ValueError:
+                    quality = 0.0
+        encodings[name] = quality
+    return encodings
+
+
+def choose_encoding(accept_encoding: str, offered: Tuple[str, ...]) -> Optional[str]:
+    """Best of `offered` (in server preference order) the client accepts."""
+    accepted = parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in offered:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_excluded_content_type(content_type: str, excluded: Tuple[str, ...]) -> bool:
+    media_type = content_type.partition(";")[0].strip().lower()
+    return media_type in excluded or media_type.partition("/")[0] + "/*" in excluded
+
+
+class GzipCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        data = self._compressor.compress(body)
+        if more_body:
+            return data + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return data + self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int) -> None:
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        data = self._compressor.process(body) if body else b""
+        if more_body:
+            return data + self._compressor.flush()
+        return data + self._compressor.finish()
+
+
+class _CompressionResponder:
+    """
+    Wraps `send` for one request.
+
+    `encoding` None means the client accepts nothing we offer: the body is
+    passed through but compressible responses still get Vary: Accept-Encoding.
+    """
+
+    def __init__(
+        self,
+        middleware: "CompressionMiddleware",
+        encoding: Optional[str],
+        send: Send,
+    ) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.compressor: Any = None
+        self.initial_message: Message = {}
+        self.passthrough = False
+        self.started = False
+
+    def _new_compressor(self) -> Any:
+        if self.encoding == "br":
+            return BrotliCompressor(self.middleware.brotli_quality)
+        return GzipCompressor(self.middleware.gzip_level)
+
+    async def _compress(self, body: bytes, more_body: bool) -> bytes:
+        if self.compressor is None:
+            self.compressor = self._new_compressor()
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            return await anyio.to_thread.run_sync(self.compressor.compress, body, more_body)
+        return self.compressor.compress(body, more_body)
+
+    async def __call__(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # Giữ lại cho tới khi biết có nén hay không (header thay đổi)
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] == 206
+                or is_excluded_content_type(
+                    headers.get("content-type", ""), self.middleware.exclude_content_types
+                )
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if self.passthrough or message_type not in (
+            "http.response.body",
+            "http.response.pathsend",
+        ):
+            # trailers, early hints, ... và response không nén
+            await self.send(message)
+            return
+
+        if message_type == "http.response.pathsend":
+            # File gửi thẳng bởi server: không nén
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.started:
+            # Các chunk tiếp theo của StreamingResponse
+            if self.compressor is not None:
+                message["body"] = await self._compress(body, more_body)
+            await self.send(message)
+            return
+
+        self.started = True
+        if not more_body and len(body) < self.middleware.minimum_size:
+            await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        if self.encoding is not None:
+            message["body"] = await self._compress(body, more_body)
+            headers["Content-Encoding"] = self.encoding
+            if more_body or self.initial_message.get("trailers", False):
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(message["body"]))
+        await self.send(self.initial_message)
+        await self.send(message)
+
+
+class CompressionMiddleware:
+    """Compress responses with the best encoding the client accepts."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 5,
+        brotli_quality: int = 4,
+        exclude_content_types: Tuple[str, ...] = EXCLUDED_CONTENT_TYPES,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.exclude_content_types = tuple(t.lower() for t in exclude_content_types)
+        self.offered: Tuple[str, ...] = (
+            ("br", "gzip") if brotli_available() else ("gzip",)
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("Accept-Encoding", "")
+        encoding = (
+            choose_encoding(accept_encoding, self.offered) if accept_encoding else None
+        )
+        await self.app(scope, receive, _CompressionResponder(self, encoding, send))
@@ -0,0 +1,394 @@
+"""
+Storage backends for the sliding-window rate limiter.
+
+Every backend stores, per client key, the request count of the current and
+the previous fixed window, and performs "estimate, compare with the limit,
+increment if allowed" as one atomic step:
+
+- `memory` (default): dict in the worker process. Limits are per worker and
+  reset on restart.
+- `shared_memory`: fixed-size hash table in an mmap'd file (under /dev/shm
+  by default) shared by every worker on the host; buckets are guarded by
+  `fcntl` byte-range locks. Survives worker restarts and deploys on the same
+  host, not reboots.
+- `redis`: one key per client and window, checked and incremented by a Lua
+  script, with a TTL of two windows. Shared by every instance. Needs the
+  `redis` package and `REDIS_URL`; while Redis is unreachable the limiter
+  falls back to the per-worker memory backend instead of failing requests.
+
+Estimated requests in the last `window` seconds =
+    previous * (1 - elapsed_fraction) + current
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimitHit:
+    """Outcome of counting one request."""
+
+    allowed: bool
+    estimated: float
+
+
+def window_position(now: float, window: int) -> Tuple[int, float]:
+    """Return `(window_index, previous_weight)` for a timestamp."""
+    window_index = int(now // window)
+    elapsed_fraction = (now - window_index * window) / window
+    return window_index, 1 - elapsed_fraction
+
+
+class RateLimitBackend:
+    """Interface shared by all backends."""
+
+    name = "base"
+
+    async def hit(
+        self, key: str, limit: int, window: int, now: float, cost: int = 1
+    ) -> RateLimitHit:
+        """Add `cost` to `key` if the total still fits under `limit` (atomically)."""
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# In-process memory
+# ---------------------------------------------------------------------------
+
+
+class _WindowCounter:
+    """Sliding-window counter state: O(1) time and memory per client."""
+
+    __slots__ = ("window_index", "current", "previous")
+
+    def __init__(self, window_index: int) -> None:
+        self.window_index = window_index
+        self.current = 0
+        self.previous = 0
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    name = "memory"
+
+    def __init__(self, evict_interval: float = 60.0) -> None:
+        self.evict_interval = evict_interval
+        self._store: Dict[str, _WindowCounter] = {}
+        self._next_eviction_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def _evict_idle_keys(self, window_index: int) -> int:
+        """Drop clients with no request in the current or previous window."""
+        stale = [
+            key
+            for key, counter in self._store.items()
+            if counter.window_index < window_index - 1
+        ]
+        for key in stale:
+            del self._store[key]
+        if stale:
+            logger.debug(f"Evicted {len(stale)} idle rate limit keys")
+        return len(stale)
+
+    def hit_sync(
+        self, key: str, limit: int, window: int, now: float, cost: int = 1
+    ) -> RateLimitHit:
+        window_index, previous_weight = window_position(now, window)
+
+        if now >= self._next_eviction_at:
+            self._next_eviction_at = now + self.evict_interval
+            self._evict_idle_keys(window_index)
+
+        counter = self._store.get(key)
+        if counter is None:
+            counter = self._store[key] = _WindowCounter(window_index)
+        elif counter.window_index != window_index:
+            # Sang cửa sổ mới: cửa sổ hiện tại thành "previous" (nếu liền kề)
+            counter.previous = (
+                counter.current if counter.window_index == window_index - 1 else 0
+            )
+            counter.current = 0
+            counter.window_index = window_index
+
+        estimated = counter.previous * previous_weight + counter.current
+        allowed = estimated + cost <= limit
+        if allowed:
+            counter.current += cost
+            estimated += cost
+        return RateLimitHit(allowed, estimated)
+
+    async def hit(
+        self, key: str, limit: int, window: int, now: float, cost: int = 1
+    ) -> RateLimitHit:
+        return self.hit_sync(key, limit, window, now, cost)
+
+    async def clear(self) -> None:
+        self._store.clear()
+
+
+# ---------------------------------------------------------------------------
+# Shared memory (multi-worker, single host)
+# ---------------------------------------------------------------------------
+
+# key_hash (u64, 0 = trống), window_index (i64), current (u32), previous (u32)
+_SLOT = struct.Struct("<QqII")
+_BUCKET_SLOTS = 8
+
+
+def _default_shm_path() -> str:
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "elearning-rate-limit")
+
+
+class SharedMemoryRateLimitBackend(RateLimitBackend):
+    """Open-addressing table in a shared mmap, one lock per bucket of 8 slots.
+
+    A client key is reduced to a 64-bit hash and probed only inside its
+    bucket. Slots whose last request is older than the previous window are
+    reused on insert; when a bucket is full of active clients the one with
+    the oldest window (then the fewest requests) is replaced, so size
+    `slots` above the number of clients active per two windows.
+    """
+
+    name = "shared_memory"
+
+    def __init__(self, path: str = "", slots: int = 65536) -> None:
+        self.path = path or _default_shm_path()
+        self.buckets = max(1, slots // _BUCKET_SLOTS)
+        self._size = self.buckets * _BUCKET_SLOTS * _SLOT.size
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+
+    def _open(self) -> mmap.mmap:
+        if self._map is None:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(fd).st_size < self._size:
+                os.ftruncate(fd, self._size)
+            self._fd = fd
+            self._map = mmap.mmap(fd, self._size)
+            logger.info(
+                "Shared-memory rate limit table: %s (%d slots)",
+                self.path,
+                self.buckets * _BUCKET_SLOTS,
+            )
+        return self._map
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little") or 1
+
+    def hit_sync(
+        self, key: str, limit: int, window: int, now: float, cost: int = 1
+    ) -> RateLimitHit:
+        import fcntl
+
+        table = self._open()
+        window_index, previous_weight = window_position(now, window)
+        key_hash = self._hash(key)
+        bucket_offset = (key_hash % self.buckets) * _BUCKET_SLOTS * _SLOT.size
+        bucket_size = _BUCKET_SLOTS * _SLOT.size
+
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, bucket_size, bucket_offset)
+        try:
+            offset, current, previous = self._find_slot(
+                table, bucket_offset, key_hash, window_index
+            )
+            estimated = previous * previous_weight + current
+            allowed = estimated + cost <= limit
+            if allowed:
+                current += cost
+                estimated += cost
+            _SLOT.pack_into(table, offset, key_hash, window_index, current, previous)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, bucket_size, bucket_offset)
+        return RateLimitHit(allowed, estimated)
+
+    @staticmethod
+    def _find_slot(
+        table: mmap.mmap, bucket_offset: int, key_hash: int, window_index: int
+    ) -> Tuple[int, int, int]:
+        """Return `(offset, current, previous)` rolled forward to `window_index`."""
+        victim: Optional[Tuple[int, int, int]] = None  # (window, current, offset)
+        for slot in range(_BUCKET_SLOTS):
+            offset = bucket_offset + slot * _SLOT.size
+            slot_hash, slot_window, current, previous = _SLOT.unpack_from(table, offset)
+            if slot_hash == key_hash:
+                if slot_window == window_index:
+                    return offset, current, previous
+                if slot_window == window_index - 1:
+                    return offset, 0, current
+                return offset, 0, 0
+            if slot_hash == 0 or slot_window < window_index - 1:
+                candidate = (-1, 0, offset)
+            else:
+                candidate = (slot_window, current, offset)
+            if victim is None or candidate < victim:
+                victim = candidate
+        return victim[2], 0, 0  # type: ignore[index]
+
+    async def hit(
+        self, key: str, limit: int, window: int, now: float, cost: int = 1
+    ) -> RateLimitHit:
+        return self.hit_sync(key, limit, window, now, cost)
+
+    async def clear(self) -> None:
+        import fcntl
+
+        table = self._open()
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self._size, 0)
+        try:
+            table[:] = bytes(self._size)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self._size, 0)
+
+    async def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+# ---------------------------------------------------------------------------
+# Redis (multi-instance)
+# ---------------------------------------------------------------------------
+
+# KEYS[1] = current window, KEYS[2] = previous window
+# ARGV[1] = limit, ARGV[2] = previous weight, ARGV[3] = TTL (seconds), ARGV[4] = cost
+_REDIS_HIT_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local weighted = previous * tonumber(ARGV[2])
+local cost = tonumber(ARGV[4])
+if weighted + current + cost <= tonumber(ARGV[1]) then
+    current = redis.call('INCRBY', KEYS[1], cost)
+    if current == cost then
+        redis.call('EXPIRE', KEYS[1], ARGV[3])
+    end
+    return {1, tostring(weighted + current)}
+end
+return {0, tostring(weighted + current)}
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    name = "redis"
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        timeout: float = 0.5,
+        retry_interval: float = 10.0,
+        fallback: Optional[RateLimitBackend] = None,
+    ) -> None:
+        if not url:
+            raise ValueError("RATE_LIMIT_BACKEND=redis cần REDIS_URL")
+        self.url = url
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.fallback = fallback or MemoryRateLimitBackend()
+        self._client: Any = None
+        self._script: Any = None
+        self._unavailable_until = 0.0
+
+    def _get_script(self) -> Any:
+        if self._script is None:
+            # Import lười: redis chỉ cần khi bật backend này
+            import redis.asyncio as redis
+
+            self._client = redis.from_url(
+                self.url,
+                socket_timeout=self.timeout,
+                socket_connect_timeout=self.timeout,
+            )
+            self._script = self._client.register_script(_REDIS_HIT_SCRIPT)
+        return self._script
+
+    @staticmethod
+    def _window_key(key: str, window_index: int) -> str:
+        # Hash tag {key}: hai cửa sổ của một client nằm cùng slot trên Redis Cluster
+        return f"{{{key}}}:{window_index}"
+
+    async def hit(
+        self, key: str, limit: int, window: int, now: float, cost: int = 1
+    ) -> RateLimitHit:
+        if now < self._unavailable_until:
+            return await self.fallback.hit(key, limit, window, now, cost)
+
+        window_index, previous_weight = window_position(now, window)
+        try:
+            allowed, estimated = await self._get_script()(
+                keys=[
+                    self._window_key(key, window_index),
+                    self._window_key(key, window_index - 1),
+                ],
+                args=[limit, previous_weight, window * 2, cost],
+            )
+        except Exception as exc:
+            self._unavailable_until = now + self.retry_interval
+            logger.warning(
+                "Redis rate limit backend unavailable (%s); using per-worker memory for %.0fs",
+                exc,
+                self.retry_interval,
+            )
+            return await self.fallback.hit(key, limit, window, now, cost)
+        return RateLimitHit(bool(allowed), float(estimated))
+
+    async def clear(self) -> None:
+        await self.fallback.clear()
+        self._get_script()
+        batch = []
+        async for redis_key in self._client.scan_iter(match="{rate_limit:*", count=500):
+            batch.append(redis_key)
+            if len(batch) >= 500:
+                await self._client.unlink(*batch)
+                batch.clear()
+        if batch:
+            await self._client.unlink(*batch)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._script = None
+
+
+def create_rate_limit_backend(name: str) -> RateLimitBackend:
+    """Build the backend selected by `RATE_LIMIT_BACKEND`."""
+    name = (name or "memory").strip().lower()
+    if name == "memory":
+        return MemoryRateLimitBackend()
+    if name == "shared_memory":
+        return SharedMemoryRateLimitBackend(
+            settings.RATE_LIMIT_SHM_PATH, settings.RATE_LIMIT_SHM_SLOTS
+        )
+    if name == "redis":
+        if importlib.util.find_spec("redis") is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis cần cài package redis (uv add redis)")
+        return RedisRateLimitBackend(settings.REDIS_URL)
+    raise ValueError(
+        f"RATE_LIMIT_BACKEND không hợp lệ: {name!r} (memory | shared_memory | redis)"
+    )
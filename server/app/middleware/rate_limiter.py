@@ -1,150 +1,236 @@
-from fastapi import Request, status
+from fastapi import status
 from fastapi.responses import JSONResponse
-from typing import Callable, Dict
-from collections import defaultdict
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Pattern
+import math
+import re
 import time
 import logging
 from ..core.config import settings
+from .rate_limit_backends import (
+    MemoryRateLimitBackend,
+    RateLimitBackend,
+    create_rate_limit_backend,
+)
 
 logger = logging.getLogger(__name__)
 
-# In-memory rate limiting (simple implementation without Redis)
-# NOTE: server/ does not use Redis according to system architecture
-_rate_limit_store: Dict[str, list] = defaultdict(list)
+# Trạng thái lưu trong backend chọn bởi RATE_LIMIT_BACKEND (xem rate_limit_backends):
+# memory (mặc định, theo worker) | shared_memory (các worker cùng host) | redis
+
+# Không giới hạn: khớp chính xác hoặc tiền tố + "/" (vd. /api/v1/auth/oauth/google/callback),
+# nhưng không khớp /api/v1/auth/login123
+SKIP_PATHS = (
+    "/health",
+    "/metrics",
+    "/api/v1/auth/oauth/google",  # OAuth endpoints need higher limits
+    "/api/v1/auth/login",  # Login endpoint
+    "/api/v1/auth/register",  # Register endpoint
+    "/api/v1/auth/refresh",  # Refresh token endpoint
+    "/api/v1/auth/verify-email",  # Email verification endpoint
+)
+
+
+def compile_path_matcher(paths: Iterable[str]) -> Pattern[str]:
+    """One regex matching any of `paths` exactly or as a path prefix."""
+    alternatives = "|".join(re.escape(path.rstrip("/")) for path in paths)
+    return re.compile(rf"(?:{alternatives})(?:/|$)")
 
 
-def clear_rate_limit_store():
+# ---------------------------------------------------------------------------
+# Route classes
+# ---------------------------------------------------------------------------
+# Mỗi lớp có ngân sách riêng (token mỗi cửa sổ) và chi phí mỗi request, để
+# export CSV hay upload không tốn ngang /notifications/unread và không ăn
+# vào ngân sách đọc thông thường.
+
+ROUTE_CLASSES = ("read", "write", "upload", "export", "admin_analytics")
+
+_SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+_EXPORT_PATH = re.compile(r"/export(?:/|$)")
+_UPLOAD_PATH = re.compile(r"/upload(?:/|$)")
+_ANALYTICS_PATH = re.compile(
+    r"/(?:analytics|statistics|stats)(?:/|$)|/api/v1/admin/(?:dashboard|metrics)(?:/|$)"
+)
+
+
+@dataclass(frozen=True)
+class RouteClass:
+    name: str
+    budget: int  # token mỗi cửa sổ
+    cost: int  # token mỗi request
+
+
+def classify_route(method: str, path: str) -> str:
+    """Map a request to one of `ROUTE_CLASSES`."""
+    if _EXPORT_PATH.search(path):
+        return "export"
+    if method in _SAFE_METHODS:
+        return "admin_analytics" if _ANALYTICS_PATH.search(path) else "read"
+    if _UPLOAD_PATH.search(path):
+        return "upload"
+    return "write"
+
+
+def route_classes_from_settings() -> Dict[str, RouteClass]:
+    """Build route classes from RATE_LIMIT_ROUTE_COSTS / RATE_LIMIT_ROUTE_BUDGETS."""
+    unknown = (
+        set(settings.RATE_LIMIT_ROUTE_COSTS) | set(settings.RATE_LIMIT_ROUTE_BUDGETS)
+    ) - set(ROUTE_CLASSES)
+    if unknown:
+        raise ValueError(
+            f"Lớp route không hợp lệ trong cấu hình rate limit: {sorted(unknown)}"
+        )
+    classes = {}
+    for name in ROUTE_CLASSES:
+        cost = max(1, settings.RATE_LIMIT_ROUTE_COSTS.get(name, 1))
+        classes[name] = RouteClass(
+            name=name,
+            # Mặc định: vẫn RATE_LIMIT_REQUESTS request mỗi cửa sổ cho lớp này
+            budget=settings.RATE_LIMIT_ROUTE_BUDGETS.get(
+                name, cost * settings.RATE_LIMIT_REQUESTS
+            ),
+            cost=cost,
+        )
+    return classes
+
+
+async def clear_rate_limit_store():
     """Clear all rate limit entries (useful for testing or resetting limits)"""
-    global _rate_limit_store
-    _rate_limit_store.clear()
+    await rate_limiter.backend.clear()
     logger.info("Rate limit store cleared")
 
 
 class RateLimiter:
-    def __init__(self, requests: int = 100, window: int = 3600):
+    def __init__(
+        self,
+        requests: int = 100,
+        window: int = 3600,
+        backend: Optional[RateLimitBackend] = None,
+        route_classes: Optional[Dict[str, RouteClass]] = None,
+        skip_paths: Iterable[str] = SKIP_PATHS,
+    ):
         self.requests = requests
         self.window = window
+        self.backend = backend or MemoryRateLimitBackend()
+        self.route_classes = route_classes or {
+            name: RouteClass(name, requests, 1) for name in ROUTE_CLASSES
+        }
+        self._skip_matcher = compile_path_matcher(skip_paths)
 
-    def _check_rate_limit(self, key: str) -> Dict:
-        """Simple in-memory rate limiting"""
-        current_time = time.time()
-        window_start = current_time - self.window
-
-        # Clean old entries
-        _rate_limit_store[key] = [
-            ts for ts in _rate_limit_store[key] if ts > window_start
-        ]
-
-        # Add current request
-        _rate_limit_store[key].append(current_time)
+    def should_skip(self, path: str) -> bool:
+        return self._skip_matcher.match(path) is not None
 
-        current_count = len(_rate_limit_store[key])
-        allowed = current_count <= self.requests
+    async def _check_rate_limit(
+        self, key: str, cost: int = 1, limit: Optional[int] = None
+    ) -> Dict:
+        """Sliding window counter (fixed windows + weighted previous window)."""
+        limit = self.requests if limit is None else limit
+        current_time = time.time()
+        hit = await self.backend.hit(key, limit, self.window, current_time, cost)
 
+        current_count = math.ceil(hit.estimated)
+        window_end = (int(current_time // self.window) + 1) * self.window
         return {
-            "allowed": allowed,
+            "allowed": hit.allowed,
             "current_count": current_count,
-            "limit": self.requests,
-            "remaining": max(0, self.requests - current_count),
-            "reset_time": self.window,
+            "limit": limit,
+            "remaining": max(0, limit - current_count),
+            "reset_time": math.ceil(window_end - current_time),
         }
 
-    async def __call__(self, request: Request, call_next: Callable):
+    def _get_client_id(self, request: HTTPConnection) -> str:
+        """Get unique client identifier"""
+        # Try to get user ID from token first
+        user_id = getattr(request.state, "user_id", None)
+        if user_id:
+            return f"user:{user_id}"
+
+        # Fall back to IP address
+        forwarded_for = request.headers.get("X-Forwarded-For")
+        if forwarded_for:
+            client_ip = forwarded_for.split(",")[0].strip()
+        else:
+            client_ip = request.client.host if request.client else "unknown"
+
+        return f"ip:{client_ip}"
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware for `RateLimiter`.
+
+    Only the `http.response.start` message is touched (to add the
+    X-RateLimit-* headers); body chunks, including StreamingResponse exports,
+    are passed through as-is without the task/queue wrapping of
+    `@app.middleware("http")`.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: "RateLimiter") -> None:
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         # Skip rate limiting for development environment
-        if settings.ENVIRONMENT == "development":
-            response = await call_next(request)
-            return response
-
-        # Skip rate limiting for certain endpoints (auth endpoints need higher limits)
-        # Use exact match or path prefix matching
-        skip_paths = [
-            "/health",
-            "/metrics",
-            "/api/v1/auth/oauth/google",  # OAuth endpoints need higher limits
-            "/api/v1/auth/login",  # Login endpoint
-            "/api/v1/auth/register",  # Register endpoint
-            "/api/v1/auth/refresh",  # Refresh token endpoint
-            "/api/v1/auth/verify-email",  # Email verification endpoint
+        if scope["type"] != "http" or settings.ENVIRONMENT == "development":
+            await self.app(scope, receive, send)
+            return
+
+        request_path = scope["path"]
+        if self.limiter.should_skip(request_path):
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiter
+        route_class = limiter.route_classes[
+            classify_route(scope["method"], request_path)
         ]
-
-        # Check if path matches any skip path (exact match or starts with)
-        request_path = request.url.path
-        should_skip = False
-
-        for path in skip_paths:
-            # Exact match
-            if request_path == path:
-                should_skip = True
-                # Skip logging for health check to reduce log spam
-                if request_path != "/health":
-                    logger.info(
-                        f"Rate limit SKIPPED (exact match) for path: {request_path}"
-                    )
-                break
-            # Path starts with skip path + "/" (handles /api/v1/auth/oauth/google/callback, etc.)
-            # This ensures we don't have false positives (e.g., /api/v1/auth/login123 should not match /api/v1/auth/login)
-            if request_path.startswith(path + "/"):
-                should_skip = True
-                logger.info(
-                    f"Rate limit SKIPPED (prefix match) for path: {request_path} (matches: {path})"
-                )
-                break
-
-        if should_skip:
-            # Skip rate limiting for these endpoints - return immediately without checking rate limit
-            response = await call_next(request)
-            return response
-
-        # Get client identifier
-        client_id = self._get_client_id(request)
-
-        # Check rate limit
-        rate_limit_key = f"rate_limit:{client_id}"
-        rate_limit_result = self._check_rate_limit(rate_limit_key)
+        client_id = limiter._get_client_id(HTTPConnection(scope))
+        rate_limit_key = f"rate_limit:{route_class.name}:{client_id}"
+        rate_limit_result = await limiter._check_rate_limit(
+            rate_limit_key, cost=route_class.cost, limit=route_class.budget
+        )
+        headers = {
+            "X-RateLimit-Limit": str(rate_limit_result["limit"]),
+            "X-RateLimit-Remaining": str(rate_limit_result["remaining"]),
+            "X-RateLimit-Reset": str(rate_limit_result["reset_time"]),
+            "X-RateLimit-Class": route_class.name,
+        }
 
         if not rate_limit_result["allowed"]:
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 content={
                     "detail": "Rate limit exceeded",
+                    "route_class": route_class.name,
+                    "cost": route_class.cost,
                     "limit": rate_limit_result["limit"],
                     "remaining": rate_limit_result["remaining"],
                     "reset_time": rate_limit_result["reset_time"],
                 },
-                headers={
-                    "X-RateLimit-Limit": str(rate_limit_result["limit"]),
-                    "X-RateLimit-Remaining": str(rate_limit_result["remaining"]),
-                    "X-RateLimit-Reset": str(rate_limit_result["reset_time"]),
-                },
+                headers=headers,
             )
+            await response(scope, receive, send)
+            return
 
         # Add rate limit headers to response
-        response = await call_next(request)
-        response.headers["X-RateLimit-Limit"] = str(rate_limit_result["limit"])
-        response.headers["X-RateLimit-Remaining"] = str(rate_limit_result["remaining"])
-        response.headers["X-RateLimit-Reset"] = str(rate_limit_result["reset_time"])
-
-        return response
-
-    def _get_client_id(self, request: Request) -> str:
-        """Get unique client identifier"""
-        # Try to get user ID from token first
-        user_id = getattr(request.state, "user_id", None)
-        if user_id:
-            return f"user:{user_id}"
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response_headers = MutableHeaders(scope=message)
+                for name, value in headers.items():
+                    response_headers[name] = value
+            await send(message)
 
-        # Fall back to IP address
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            client_ip = forwarded_for.split(",")[0].strip()
-        else:
-            client_ip = request.client.host if request.client else "unknown"
-
-        return f"ip:{client_ip}"
+        await self.app(scope, receive, send_with_headers)
 
 
 # Rate limiter instance
 # NOTE: Chat and AI rate limiters removed - AI features are handled by ai-server/ (Cloud Run)
 rate_limiter = RateLimiter(
-    requests=settings.RATE_LIMIT_REQUESTS, window=settings.RATE_LIMIT_WINDOW
+    requests=settings.RATE_LIMIT_REQUESTS,
+    window=settings.RATE_LIMIT_WINDOW,
+    backend=create_rate_limit_backend(settings.RATE_LIMIT_BACKEND),
+    route_classes=route_classes_from_settings(),
 )
@@ -18,6 +18,12 @@ from .assessment_result import AssessmentResult
 from .notification import Notification, NotificationType
 from .gemini_file import GeminiFile, FileSearchStatus
 
+from ..core.database import stub_auth_users_table
+
+# FK tới auth.users (Supabase) cần bảng stub trong metadata cho mọi flush,
+# kể cả khi startup bỏ qua DDL (DB_SCHEMA_STARTUP_MODE=auto/skip)
+stub_auth_users_table()
+
 __all__ = [
     # Profile
     "Profile",
@@ -164,7 +164,7 @@ async def get_user_notifications(
     query = query.order_by(Notification.created_at.desc()).offset(skip).limit(limit)
     result = await db.execute(query)
     notifications = list(result.scalars().all())
-    logger.info("Fetched %s notifications for user %s", len(notifications), user_id)
+    logger.debug("Fetched %s notifications for user %s", len(notifications), user_id)
     return notifications
 
 
@@ -183,7 +183,7 @@ async def get_unread_count(
 
     result = await db.execute(query)
     count = result.scalar_one() or 0
-    logger.info("Unread count for user %s: %s", user_id, count)
+    logger.debug("Unread count for user %s: %s", user_id, count)
     return count
 
 
@@ -0,0 +1,37 @@
+"""
+Gunicorn hooks, loaded automatically from the working directory.
+
+With PROMETHEUS_MULTIPROC_DIR set, every worker writes its Prometheus samples
+to files in that directory and /metrics aggregates them (see
+app/core/metrics.py). The master removes files left over from the previous
+run before forking workers, and drops the live-gauge files of each worker
+that exits so dead workers stop counting towards in-progress requests and
+connection pool sizes.
+"""
+
+import glob
+import os
+
+
+def _multiproc_dir():
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.environ.get(
+        "prometheus_multiproc_dir"
+    )
+
+
+def on_starting(server):
+    path = _multiproc_dir()
+    if not path:
+        return
+    os.makedirs(path, exist_ok=True)
+    for stale in glob.glob(os.path.join(path, "*.db")):
+        os.remove(stale)
+    server.log.info("Prometheus multiprocess dir: %s", path)
+
+
+def child_exit(server, worker):
+    if not _multiproc_dir():
+        return
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,140 @@
+"""
+Microbenchmark: Supabase JWT verification throughput.
+
+Compares the legacy path (jwk.construct + manual verify + to_pem + second
+jwt.decode on every request) against the per-kid key registry, and the
+registry plus the verified-claims cache. No network access is needed: a
+local RSA/EC key pair stands in for Supabase's JWKS.
+
+Usage:
+    python -m scripts.bench_jwt_verify
+    python -m scripts.bench_jwt_verify --alg ES256 --iterations 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Callable, Dict
+
+# Add parent directory to path để import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault(
+    "SUPABASE_JWKS_URL", "https://bench.invalid/auth/v1/.well-known/jwks.json"
+)
+
+from cryptography.hazmat.primitives import serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import ec, rsa  # noqa: E402
+from jose import jwk, jwt  # noqa: E402
+from jose.utils import base64url_decode  # noqa: E402
+
+from app.core.jwks import jwks_manager  # noqa: E402
+from app.middleware import auth  # noqa: E402
+
+KID = "bench-key"
+
+
+def _make_key_pair(alg: str) -> tuple[str, Dict[str, Any]]:
+    if alg.startswith("RS"):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode("utf-8")
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    public_jwk = jwk.construct(public_pem, alg).to_dict()
+    public_jwk.update({"kid": KID, "alg": alg, "use": "sig"})
+    return private_pem, public_jwk
+
+
+def _legacy_decode(token: str, jwks: Dict[str, Any]) -> Dict[str, Any]:
+    """Verification path as it was before the key registry."""
+    kid = jwt.get_unverified_header(token)["kid"]
+    signing_key = next(k for k in jwks["keys"] if k.get("kid") == kid)
+    algorithm = signing_key.get("alg", "RS256")
+    public_key = jwk.construct(signing_key)
+    message, encoded_signature = token.rsplit(".", 1)
+    decoded_signature = base64url_decode(encoded_signature.encode("utf-8"))
+    if not public_key.verify(message.encode("utf-8"), decoded_signature):
+        raise ValueError("bad signature")
+    return jwt.decode(
+        token,
+        public_key.to_pem().decode("utf-8"),
+        algorithms=[algorithm],
+        options={"verify_aud": False},
+    )
+
+
+def _measure(label: str, iterations: int, fn: Callable[[int], Any]) -> float:
+    fn(0)  # warm-up
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    rate = iterations / elapsed
+    print(f"{label:<38} {rate:>12,.0f} tokens/s  ({elapsed * 1e6 / iterations:8.1f} µs/token)")
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--alg", default="RS256", choices=["RS256", "ES256"])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument(
+        "--distinct-tokens",
+        type=int,
+        default=200,
+        help="Số token khác nhau (mô phỏng nhiều sinh viên)",
+    )
+    args = parser.parse_args()
+
+    private_pem, public_jwk = _make_key_pair(args.alg)
+    jwks = {"keys": [public_jwk]}
+    jwks_manager.load_jwks(jwks)
+
+    exp = int(time.time()) + 3600
+    tokens = [
+        jwt.encode(
+            {"sub": f"00000000-0000-0000-0000-{i:012d}", "exp": exp, "role": "authenticated"},
+            private_pem,
+            algorithm=args.alg,
+            headers={"kid": KID},
+        )
+        for i in range(args.distinct_tokens)
+    ]
+
+    loop = asyncio.new_event_loop()
+
+    def registry(i: int) -> Any:
+        return loop.run_until_complete(auth._decode_supabase_token(tokens[i % len(tokens)]))
+
+    def registry_cached(i: int) -> Any:
+        return loop.run_until_complete(
+            auth._decode_supabase_token_cached(tokens[i % len(tokens)])
+        )
+
+    print(f"alg={args.alg} iterations={args.iterations} distinct_tokens={len(tokens)}")
+    before = _measure(
+        "before: construct + verify x2", args.iterations,
+        lambda i: _legacy_decode(tokens[i % len(tokens)], jwks),
+    )
+    after = _measure("after: key registry", args.iterations, registry)
+    auth.clear_token_cache()
+    cached = _measure("after: key registry + claims cache", args.iterations, registry_cached)
+    loop.close()
+
+    print(f"\nspeed-up (registry):          {after / before:5.1f}x")
+    print(f"speed-up (registry + cache):  {cached / before:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
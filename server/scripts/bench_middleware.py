@@ -0,0 +1,230 @@
+"""
+Microbenchmark: `@app.middleware("http")` vs pure ASGI middleware.
+
+Builds two FastAPI apps with the same endpoints (a small JSON response and a
+StreamingResponse CSV-style export) and the same per-request work (rate-limit
+check, X-Process-Time / Server-Timing headers, DB query tracking, Prometheus
+metrics). "before" registers that work with `app.middleware("http")` like the
+previous main.py; "after" uses RateLimitMiddleware and ProcessTimeMiddleware.
+Requests are driven straight through the ASGI interface, so the numbers show
+middleware overhead without network or server noise.
+
+Usage:
+    python -m scripts.bench_middleware
+    python -m scripts.bench_middleware --requests 5000 --concurrency 50 --chunks 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from typing import Callable, Tuple
+
+# Add parent directory to path để import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import StreamingResponse  # noqa: E402
+
+from app import main as app_main  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.db_metrics import start_request_tracking, stop_request_tracking  # noqa: E402
+from app.core.metrics import route_label  # noqa: E402
+from app.middleware.rate_limiter import (  # noqa: E402
+    RateLimiter,
+    RateLimitMiddleware,
+    classify_route,
+)
+
+
+def _add_endpoints(app: FastAPI, chunks: int, chunk_size: int) -> None:
+    row = b"x" * (chunk_size - 1) + b"\n"
+
+    @app.get("/api/v1/items")
+    async def items():
+        return {"items": [{"id": i, "title": f"Item {i}"} for i in range(20)]}
+
+    @app.get("/api/v1/results/assessment/{assessment_id}/export")
+    async def export(assessment_id: int):
+        async def rows():
+            for _ in range(chunks):
+                yield row
+
+        return StreamingResponse(rows(), media_type="text/csv")
+
+
+def build_before(limiter: RateLimiter, chunks: int, chunk_size: int) -> FastAPI:
+    """The previous stack: both middlewares via `@app.middleware("http")`."""
+    app = FastAPI()
+
+    async def rate_limit(request: Request, call_next):
+        route_class = limiter.route_classes[
+            classify_route(request.method, request.url.path)
+        ]
+        key = f"rate_limit:{route_class.name}:{limiter._get_client_id(request)}"
+        result = await limiter._check_rate_limit(
+            key, cost=route_class.cost, limit=route_class.budget
+        )
+        response = await call_next(request)
+        response.headers["X-RateLimit-Limit"] = str(result["limit"])
+        response.headers["X-RateLimit-Remaining"] = str(result["remaining"])
+        response.headers["X-RateLimit-Reset"] = str(result["reset_time"])
+        response.headers["X-RateLimit-Class"] = route_class.name
+        return response
+
+    async def process_time(request: Request, call_next):
+        start_time = time.time()
+        stats, token = start_request_tracking()
+        try:
+            response = await call_next(request)
+            elapsed = time.time() - start_time
+            response.headers["X-Process-Time"] = str(elapsed)
+            response.headers.append(
+                "Server-Timing", f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"'
+            )
+            app_main._record_request_metrics(
+                request.method,
+                route_label(request.scope),
+                str(response.status_code),
+                elapsed,
+                None,
+            )
+            return response
+        finally:
+            stop_request_tracking(token)
+
+    app.middleware("http")(rate_limit)
+    app.middleware("http")(process_time)
+    _add_endpoints(app, chunks, chunk_size)
+    return app
+
+
+def build_after(limiter: RateLimiter, chunks: int, chunk_size: int) -> FastAPI:
+    """The current stack: pure ASGI middleware classes."""
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    app.add_middleware(app_main.ProcessTimeMiddleware)
+    _add_endpoints(app, chunks, chunk_size)
+    return app
+
+
+async def _call(app: FastAPI, path: str) -> Tuple[int, int]:
+    """Run one request through the ASGI app; return (status, body bytes)."""
+    done = asyncio.Event()
+    request_sent = False
+    status = 0
+    received = 0
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, received
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+            if not message.get("more_body", False):
+                done.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("10.0.0.1", 50000),
+        "server": ("bench", 80),
+        "state": {},
+    }
+    await app(scope, receive, send)
+    return status, received
+
+
+async def _requests_per_second(app: FastAPI, total: int, concurrency: int) -> float:
+    async def worker(count: int) -> None:
+        for _ in range(count):
+            status, _ = await _call(app, "/api/v1/items")
+            assert status == 200, status
+
+    await worker(50)  # warm-up
+    start = time.perf_counter()
+    per_worker = total // concurrency
+    await asyncio.gather(*(worker(per_worker) for _ in range(concurrency)))
+    return per_worker * concurrency / (time.perf_counter() - start)
+
+
+async def _stream_throughput(app: FastAPI, repeats: int) -> Tuple[float, float]:
+    """Return (MiB/s, ms per export)."""
+    path = "/api/v1/results/assessment/1/export"
+    await _call(app, path)  # warm-up
+    received = 0
+    start = time.perf_counter()
+    for _ in range(repeats):
+        status, size = await _call(app, path)
+        assert status == 200, status
+        received += size
+    elapsed = time.perf_counter() - start
+    return received / elapsed / (1024 * 1024), elapsed * 1000 / repeats
+
+
+def _bench(label: str, build: Callable[[], FastAPI], args: argparse.Namespace) -> Tuple[float, float]:
+    app = build()
+    rps = asyncio.run(_requests_per_second(app, args.requests, args.concurrency))
+    mib_s, ms_per_export = asyncio.run(_stream_throughput(app, args.exports))
+    print(
+        f"  {label:<8} {rps:>10,.0f} req/s   stream {mib_s:>8,.1f} MiB/s "
+        f"({ms_per_export:6.1f} ms per export)"
+    )
+    return rps, mib_s
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--chunks", type=int, default=2000, help="Chunks per export")
+    parser.add_argument("--chunk-size", type=int, default=4096)
+    parser.add_argument("--exports", type=int, default=20)
+    args = parser.parse_args()
+
+    # Đo overhead middleware, không đo log
+    logging.disable(logging.INFO)
+    settings.ENVIRONMENT = "production"  # rate limiter bỏ qua môi trường development
+    app_main.init_prometheus_metrics()
+
+    def limiter() -> RateLimiter:
+        return RateLimiter(requests=10**9, window=3600)
+
+    print(
+        f"requests={args.requests:,} concurrency={args.concurrency} "
+        f"export={args.chunks:,} x {args.chunk_size:,} B"
+    )
+    before_rps, before_mib = _bench(
+        "before", lambda: build_before(limiter(), args.chunks, args.chunk_size), args
+    )
+    after_rps, after_mib = _bench(
+        "after", lambda: build_after(limiter(), args.chunks, args.chunk_size), args
+    )
+    print(
+        f"\nrequests/s: {after_rps / before_rps:.2f}x   "
+        f"streaming: {after_mib / before_mib:.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
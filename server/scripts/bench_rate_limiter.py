@@ -0,0 +1,188 @@
+"""
+Microbenchmark: in-memory rate limiter with many distinct clients.
+
+Compares the legacy implementation (a list of every request timestamp per
+client, rebuilt on each call, never evicted) against the sliding-window
+counter in app.middleware.rate_limiter, on any of its backends. Reports
+throughput and, for the memory backend, memory held by the store and how
+many idle keys the periodic eviction removes once their windows have
+passed. A fake clock is used, so no sleeping is involved.
+
+Usage:
+    python -m scripts.bench_rate_limiter
+    python -m scripts.bench_rate_limiter --clients 100000 --hot-clients 2000
+    python -m scripts.bench_rate_limiter --backend shared_memory
+    REDIS_URL=redis://localhost:6379/0 python -m scripts.bench_rate_limiter --backend redis
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List
+from unittest import mock
+
+# Add parent directory to path để import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.middleware import rate_limiter as rl  # noqa: E402
+from app.middleware.rate_limit_backends import (  # noqa: E402
+    MemoryRateLimitBackend,
+    create_rate_limit_backend,
+)
+
+
+class LegacyRateLimiter:
+    """Rate limiter as it was before the sliding-window counter."""
+
+    def __init__(self, requests: int, window: int) -> None:
+        self.requests = requests
+        self.window = window
+        self.store: Dict[str, list] = defaultdict(list)
+
+    def check(self, key: str) -> Dict:
+        current_time = time.time()
+        window_start = current_time - self.window
+        self.store[key] = [ts for ts in self.store[key] if ts > window_start]
+        # Cả request bị từ chối cũng được ghi lại, nên list của client vượt hạn mức cứ dài thêm
+        self.store[key].append(current_time)
+        current_count = len(self.store[key])
+        return {
+            "allowed": current_count <= self.requests,
+            "current_count": current_count,
+            "limit": self.requests,
+            "remaining": max(0, self.requests - current_count),
+            "reset_time": self.window,
+        }
+
+
+class FakeClock:
+    def __init__(self, start: float) -> None:
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _report(label: str, count: int, elapsed: float) -> float:
+    rate = count / elapsed
+    print(f"  {label:<28} {rate:>12,.0f} checks/s  ({elapsed * 1e6 / count:6.2f} µs/check)")
+    return rate
+
+
+def _run(label: str, keys: List[str], check: Callable[[str], object], clock: FakeClock) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    for key in keys:
+        clock.now += 0.0001  # 10k requests/s
+        check(key)
+    return _report(label, len(keys), time.perf_counter() - start)
+
+
+def _run_async(
+    label: str, keys: List[str], check: Callable[[str], Awaitable[object]], clock: FakeClock
+) -> float:
+    async def loop() -> float:
+        start = time.perf_counter()
+        for key in keys:
+            clock.now += 0.0001
+            await check(key)
+        return time.perf_counter() - start
+
+    gc.collect()
+    return _report(label, len(keys), asyncio.run(loop()))
+
+
+def _store_size(build: Callable[[], object]) -> float:
+    gc.collect()
+    tracemalloc.start()
+    store = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return current / (1024 * 1024)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--hot-clients", type=int, default=1_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--window", type=int, default=3600)
+    parser.add_argument(
+        "--backend",
+        default="memory",
+        choices=["memory", "shared_memory", "redis"],
+        help="Backend for the sliding-window limiter",
+    )
+    parser.add_argument(
+        "--burst", type=int, default=3, help="Hot clients send limit * burst requests"
+    )
+    args = parser.parse_args()
+
+    spread = [f"rate_limit:ip:10.{i // 65536}.{i // 256 % 256}.{i % 256}" for i in range(args.clients)]
+    hot = [f"rate_limit:user:{i}" for i in range(args.hot_clients)] * (args.limit * args.burst)
+    clock = FakeClock(1_700_000_000.0)
+
+    print(
+        f"clients={args.clients:,} hot_clients={args.hot_clients:,} "
+        f"limit={args.limit}/{args.window}s burst={args.burst}x backend={args.backend}"
+    )
+    backend = create_rate_limit_backend(args.backend)
+    limiter = rl.RateLimiter(requests=args.limit, window=args.window, backend=backend)
+    after_label = f"after: {backend.name}"
+    with mock.patch.object(rl.time, "time", clock):
+        legacy = LegacyRateLimiter(args.limit, args.window)
+        asyncio.run(backend.clear())
+
+        print(f"\n{args.clients:,} distinct clients, 1 request each:")
+        before = _run("before: timestamp lists", spread, legacy.check, clock)
+        after = _run_async(after_label, spread, limiter._check_rate_limit, clock)
+        print(f"  speed-up: {after / before:.1f}x")
+
+        print(
+            f"\n{args.hot_clients:,} clients over the limit "
+            f"({args.limit * args.burst} requests each):"
+        )
+        before = _run("before: timestamp lists", hot, legacy.check, clock)
+        after = _run_async(after_label, hot, limiter._check_rate_limit, clock)
+        print(f"  speed-up: {after / before:.1f}x")
+        asyncio.run(backend.clear())
+        asyncio.run(backend.close())
+
+        if not isinstance(backend, MemoryRateLimitBackend):
+            return
+
+        def build_legacy() -> object:
+            store = LegacyRateLimiter(args.limit, args.window)
+            for key in spread + hot:
+                store.check(key)
+            return store
+
+        def build_counter() -> object:
+            store = MemoryRateLimitBackend()
+            for key in spread + hot:
+                store.hit_sync(key, args.limit, args.window, clock())
+            return store
+
+        print("\nMemory held by the store:")
+        print(f"  before: timestamp lists     {_store_size(build_legacy):8.1f} MiB")
+        print(f"  after: sliding window       {_store_size(build_counter):8.1f} MiB")
+
+        store = build_counter()
+        keys_before = len(store)
+        clock.now += 2 * args.window + store.evict_interval
+        store.hit_sync("rate_limit:ip:127.0.0.1", args.limit, args.window, clock())
+        print(
+            f"\nEviction after 2 idle windows: {keys_before:,} -> "
+            f"{len(store):,} keys (legacy keeps {len(legacy.store):,})"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Microbenchmark: list endpoint serialization, per-row models vs bulk fast path.
+
+For list_lectures, list_ai_files and list_assessments, builds a page of
+in-memory ORM rows and serves it from a FastAPI app twice: "before" builds
+one response model per row the way the endpoints used to (for assessments:
+model_validate -> model_dump -> AssessmentSchema(**data)) and lets FastAPI
+re-validate the list against `response_model`; "after" validates the page
+with one TypeAdapter call and returns pre-dumped JSON bytes
+(app.core.serialization). Both bodies are checked to be identical.
+
+Usage:
+    python -m scripts.bench_serialization
+    python -m scripts.bench_serialization --rows 200 --iterations 200 --repeats 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+# Add parent directory to path để import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI  # noqa: E402
+
+from app.api.api_v1.endpoints import ai_files, lectures  # noqa: E402
+from app.core.serialization import trusted_list_response, validate_list  # noqa: E402
+from app.models.assessment import Assessment, AssessmentType  # noqa: E402
+from app.models.content import Material, MaterialType  # noqa: E402
+from app.models.gemini_file import FileSearchStatus, GeminiFile  # noqa: E402
+from app.models.library import LibrarySubject  # noqa: E402
+from app.models.user import Profile  # noqa: E402
+from app.schemas.admin import AIDataItemResponse  # noqa: E402
+from app.schemas.assessment import Assessment as AssessmentSchema  # noqa: E402
+
+
+def _rows(count: int) -> Dict[str, List[Any]]:
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    user_id = uuid.uuid4()
+    subject = LibrarySubject(id=1, code="CS101", name="Nhập môn lập trình")
+    uploader = Profile(id=user_id, full_name="Nguyễn Văn A", username="nva")
+    materials, files, assessments = [], [], []
+    for i in range(count):
+        created = now + timedelta(minutes=i)
+        materials.append(
+            Material(
+                id=i + 1,
+                title=f"Bài giảng {i}",
+                description="Mô tả bài giảng " * 4,
+                content_html="<p>" + "Nội dung " * 20 + "</p>",
+                file_url=f"/uploads/lectures/{i}.pdf",
+                file_type="pdf",
+                subject_id=1,
+                subject=subject,
+                uploaded_by=user_id,
+                uploader=uploader,
+                chapter_number=i % 12,
+                chapter_title=f"Chương {i % 12}",
+                lesson_number=i % 5,
+                lesson_title=f"Bài {i % 5}",
+                material_type=MaterialType.DOCUMENT,
+                is_published=True,
+                file_metadata={"uploaded_for": "lecture", "duration": "45:00"},
+                created_at=created,
+                updated_at=created,
+            )
+        )
+        files.append(
+            GeminiFile(
+                id=i + 1,
+                title=f"Tài liệu AI {i}",
+                description="Tài liệu cho RAG",
+                file_name=f"files/{uuid.uuid4().hex}",
+                display_name=f"doc-{i}.pdf",
+                file_type="pdf",
+                file_size=1024 * (i + 1),
+                mime_type="application/pdf",
+                subject_id=1,
+                status=FileSearchStatus.COMPLETED,
+                tags=["cs101", "week-1"],
+                uploaded_by=user_id,
+                uploader_name="Nguyễn Văn A",
+                uploaded_at=created,
+                indexed_at=created,
+                created_at=created,
+                updated_at=created,
+            )
+        )
+        assessments.append(
+            (
+                Assessment(
+                    id=i + 1,
+                    title=f"Bài kiểm tra {i}",
+                    description="Kiểm tra giữa kỳ",
+                    assessment_type=AssessmentType.QUIZ,
+                    subject_id=1,
+                    created_by=user_id,
+                    time_limit_minutes=45,
+                    max_attempts=3,
+                    is_published=True,
+                    is_randomized=False,
+                    rating=4.5,
+                    rating_count=10,
+                    show_results=True,
+                    show_explanations=True,
+                    created_at=created,
+                    updated_at=created,
+                ),
+                "CS101",
+                "Nhập môn lập trình",
+                20,
+            )
+        )
+    return {"lectures": materials, "ai_files": files, "assessments": assessments}
+
+
+def build_app(rows: Dict[str, List[Any]]) -> FastAPI:
+    app = FastAPI()
+    LectureResponse = lectures.LectureResponse
+
+    @app.get("/before/lectures", response_model=List[LectureResponse])
+    async def lectures_before():
+        return [lectures._material_to_response(m) for m in rows["lectures"]]
+
+    @app.get("/after/lectures", response_model=List[LectureResponse])
+    async def lectures_after():
+        items = validate_list(
+            LectureResponse, [lectures._material_fields(m) for m in rows["lectures"]]
+        )
+        return trusted_list_response(LectureResponse, items)
+
+    @app.get("/before/ai_files", response_model=List[AIDataItemResponse])
+    async def ai_files_before():
+        return [ai_files._build_ai_data_response(f, "Nhập môn lập trình") for f in rows["ai_files"]]
+
+    @app.get("/after/ai_files", response_model=List[AIDataItemResponse])
+    async def ai_files_after():
+        items = validate_list(
+            AIDataItemResponse,
+            [ai_files._ai_data_fields(f, "Nhập môn lập trình") for f in rows["ai_files"]],
+        )
+        return trusted_list_response(AIDataItemResponse, items)
+
+    @app.get("/before/assessments", response_model=List[AssessmentSchema])
+    async def assessments_before():
+        result = []
+        for assessment, subj_code, subj_name, questions_count in rows["assessments"]:
+            base_data = AssessmentSchema.model_validate(
+                assessment, from_attributes=True
+            ).model_dump()
+            base_data.update(
+                {
+                    "subject_code": subj_code,
+                    "subject_name": subj_name,
+                    "questions_count": questions_count or 0,
+                }
+            )
+            result.append(AssessmentSchema(**base_data))
+        return result
+
+    @app.get("/after/assessments", response_model=List[AssessmentSchema])
+    async def assessments_after():
+        page = rows["assessments"]
+        items = validate_list(AssessmentSchema, [row[0] for row in page])
+        for item, (_, subj_code, subj_name, questions_count) in zip(items, page):
+            item.subject_code = subj_code
+            item.subject_name = subj_name
+            item.questions_count = questions_count or 0
+        return trusted_list_response(AssessmentSchema, items)
+
+    return app
+
+
+async def _get(app: FastAPI, path: str) -> bytes:
+    """One GET straight through the ASGI interface; returns the body."""
+    chunks: List[bytes] = []
+    status = 0
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    assert status == 200, status
+    return b"".join(chunks)
+
+
+async def _measure(app: FastAPI, path: str, iterations: int, repeats: int) -> Dict[str, Any]:
+    body = await _get(app, path)  # warm-up
+    best = float("inf")
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await _get(app, path)
+        best = min(best, (time.perf_counter() - start) / iterations)
+    return {"ms": best * 1000, "body": body}
+
+
+async def _run(args: argparse.Namespace) -> None:
+    app = build_app(_rows(args.rows))
+    for name in ("lectures", "ai_files", "assessments"):
+        before = await _measure(app, f"/before/{name}", args.iterations, args.repeats)
+        after = await _measure(app, f"/after/{name}", args.iterations, args.repeats)
+        same = before["body"] == after["body"]
+        print(
+            f"  {name:<12} before {before['ms']:6.2f} ms   after {after['ms']:6.2f} ms   "
+            f"{before['ms'] / after['ms']:4.2f}x   "
+            f"({len(after['body']) / 1024:.0f} KiB, identical={same})"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=200, help="Rows per page")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=5, help="Best of N batches")
+    args = parser.parse_args()
+
+    print(
+        f"rows={args.rows} iterations={args.iterations} x best of {args.repeats} "
+        "(ms per request, in-process)"
+    )
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
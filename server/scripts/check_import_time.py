@@ -0,0 +1,105 @@
+"""
+Import-time budget for the server package.
+
+Measures `import app.main` in fresh interpreters (best of --runs), prints the
+slowest modules from `python -X importtime`, and exits with status 1 when the
+best run exceeds the budget. Worker boot and scale-from-zero pay this cost on
+every start, so run it in CI or before deploying.
+
+Usage:
+    python -m scripts.check_import_time
+    python -m scripts.check_import_time --budget-ms 800 --runs 5 --top 25
+    IMPORT_TIME_BUDGET_MS=800 python -m scripts.check_import_time
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_MS = 1500
+MODULE = "app.main"
+
+_TIMER_SNIPPET = (
+    "import time; start = time.perf_counter(); import {module}; "
+    "print((time.perf_counter() - start) * 1000)"
+)
+
+
+def _child_env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in (SERVER_DIR, env.get("PYTHONPATH", "")) if p
+    )
+    env.setdefault("PYTHONDONTWRITEBYTECODE", "1")
+    return env
+
+
+def measure_import_ms(module: str) -> float:
+    """Wall-clock milliseconds for `import module` in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-c", _TIMER_SNIPPET.format(module=module)],
+        cwd=SERVER_DIR,
+        env=_child_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_modules(module: str, top: int) -> List[Tuple[float, float, str]]:
+    """Return (cumulative_ms, self_ms, name) for the slowest imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SERVER_DIR,
+        env=_child_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows: List[Tuple[float, float, str]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us) / 1000, int(self_us) / 1000, name.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.getenv("IMPORT_TIME_BUDGET_MS", DEFAULT_BUDGET_MS)),
+        help="Ngân sách thời gian import (ms), mặc định IMPORT_TIME_BUDGET_MS hoặc 1500",
+    )
+    parser.add_argument("--runs", type=int, default=3, help="Số lần đo (lấy nhanh nhất)")
+    parser.add_argument("--top", type=int, default=20, help="Số module chậm nhất cần in")
+    parser.add_argument("--module", default=MODULE)
+    args = parser.parse_args()
+
+    timings = [measure_import_ms(args.module) for _ in range(max(1, args.runs))]
+    best = min(timings)
+
+    print(f"Slowest imports for `import {args.module}` (cumulative / self, ms):")
+    for cumulative_ms, self_ms, name in slowest_modules(args.module, args.top):
+        print(f"  {cumulative_ms:9.1f} {self_ms:9.1f}  {name}")
+
+    runs = ", ".join(f"{t:.0f}" for t in timings)
+    print(f"\nimport {args.module}: best {best:.0f}ms (runs: {runs}), budget {args.budget_ms:.0f}ms")
+    if best > args.budget_ms:
+        print(f"FAIL: over budget by {best - args.budget_ms:.0f}ms")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
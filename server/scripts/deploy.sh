@@ -56,6 +56,11 @@ echo "[start] Starting Gunicorn server on ${HOST}:${PORT}..."
 echo "[start] PYTHONPATH=${PYTHONPATH}"
 echo "[start] gunicorn -w 4 -k uvicorn.workers.UvicornWorker ${APP} --bind ${HOST}:${PORT} --log-level info"
 
+# Prometheus multiprocess mode: metrics of all workers are aggregated on /metrics
+# (stale files are cleared and exited workers cleaned up by gunicorn.conf.py)
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus-multiproc}"
+echo "[start] PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR}"
+
 # Use exec to replace shell process with Gunicorn (for proper signal handling)
 # Ensure PYTHONPATH is passed to gunicorn process
 # Reduced workers to 2 for Render (better for smaller instances)
@@ -166,6 +166,10 @@ if [[ "${ENVIRONMENT}" != "production" ]]; then
 fi
 
 # 7) Start server
+if [[ "${ENVIRONMENT}" == "production" ]] || [[ $USE_GUNICORN -eq 1 ]]; then
+  # Multiple Gunicorn workers: aggregate Prometheus metrics across workers (see gunicorn.conf.py)
+  export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus-multiproc}"
+fi
 if [[ "${ENVIRONMENT}" == "production" ]]; then
   # Production: Use Gunicorn with Uvicorn workers (for Render)
   WORKERS="${WORKERS:-4}"
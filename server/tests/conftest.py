@@ -0,0 +1,55 @@
+"""
+Shared fixtures.
+
+Run from server/: `uv run --with pytest --with aiosqlite pytest tests`.
+Database tests use an in-memory SQLite database (aiosqlite) with an attached
+`auth` schema standing in for Supabase's auth.users.
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path để import app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def sqlite_db(monkeypatch):
+    """
+    Point the write engine at a fresh in-memory SQLite database.
+
+    Returns `create_tables(*models)`, an async helper that creates the given
+    models' tables (foreign key constraints are left out, as in SQLite tests
+    they would have to name auth.users across schemas).
+    """
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy import event
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import StaticPool
+    from sqlalchemy.schema import CreateTable
+
+    from app.core import database
+
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    event.listen(
+        engine.sync_engine,
+        "connect",
+        lambda dbapi_connection, record: dbapi_connection.execute(
+            "ATTACH ':memory:' AS auth"
+        ),
+    )
+    monkeypatch.setattr(database, "_engine_write", engine)
+    monkeypatch.setattr(database, "_engine_read", None)
+    monkeypatch.setattr(database, "_engine_read_created", True)
+
+    async def create_tables(*models):
+        async with engine.begin() as conn:
+            for model in models:
+                await conn.execute(
+                    CreateTable(model.__table__, include_foreign_key_constraints=[])
+                )
+
+    yield create_tables
+    database.read_router._pinned.clear()
@@ -0,0 +1,50 @@
+"""JWKSManager back-off while Supabase JWKS is unreachable."""
+
+import asyncio
+import time
+
+import pytest
+
+from app.core.jwks import JWKSManager, JWKSUnavailableError
+
+
+def test_cold_start_failures_are_throttled():
+    manager = JWKSManager("http://jwks.invalid", unknown_kid_min_interval=0.2)
+    calls = 0
+    available = False
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        if not available:
+            raise JWKSUnavailableError("down")
+        return {"keys": []}
+
+    manager._fetch = fetch
+
+    async def run():
+        nonlocal available
+        # Concurrent cold-start requests share one fetch
+        results = await asyncio.gather(
+            *[manager.get_key("kid-1") for _ in range(10)], return_exceptions=True
+        )
+        assert all(isinstance(r, JWKSUnavailableError) for r in results)
+        assert calls == 1
+
+        # Inside the back-off window: fail fast without fetching again
+        started = time.monotonic()
+        for _ in range(20):
+            with pytest.raises(JWKSUnavailableError):
+                await manager.get_key("kid-1")
+        assert calls == 1
+        assert time.monotonic() - started < 0.1
+
+        # After the window one new attempt is made
+        await asyncio.sleep(0.25)
+        available = True
+        assert await manager.get_key("kid-1") is None  # key set loaded, kid not in it
+        assert calls == 2
+        assert manager._jwks == {"keys": []}
+
+    asyncio.run(run())
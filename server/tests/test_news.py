@@ -0,0 +1,73 @@
+"""Permission checks on GET /news/{id} (read session, no RLS context)."""
+
+import asyncio
+import uuid
+
+import httpx
+
+from app.core.database import AsyncSessionLocalWrite
+from app.main import app
+from app.middleware.auth import AuthenticatedUser, get_current_user_claims
+from app.models import News, NewsStatus
+
+AUTHOR_ID = uuid.uuid4()
+
+
+def _user(role: str, user_id: uuid.UUID) -> AuthenticatedUser:
+    return AuthenticatedUser(user_id=user_id, role=role, email=None, claims={})
+
+
+async def _seed(create_tables) -> None:
+    await create_tables(News)
+    async with AsyncSessionLocalWrite() as session:
+        for news_id, status in ((1, NewsStatus.DRAFT), (2, NewsStatus.PUBLISHED)):
+            session.add(
+                News(
+                    id=news_id,
+                    title=f"Tin {news_id}",
+                    slug=f"tin-{news_id}",
+                    content="Nội dung",
+                    author_id=AUTHOR_ID,
+                    author_name="Tác giả",
+                    status=status,
+                    views=0,
+                )
+            )
+        await session.commit()
+
+
+async def _get(path: str, user: AuthenticatedUser | None = None) -> httpx.Response:
+    app.dependency_overrides.pop(get_current_user_claims, None)
+    if user is not None:
+        app.dependency_overrides[get_current_user_claims] = lambda: user
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path)
+    finally:
+        app.dependency_overrides.pop(get_current_user_claims, None)
+
+
+def test_get_news_hides_unpublished_articles(sqlite_db):
+    student = _user("student", uuid.uuid4())
+
+    async def run():
+        await _seed(sqlite_db)
+        return {
+            "anonymous draft": (await _get("/api/v1/news/1")).status_code,
+            "student draft": (await _get("/api/v1/news/1", student)).status_code,
+            "author draft": (
+                await _get("/api/v1/news/1", _user("instructor", AUTHOR_ID))
+            ).status_code,
+            "admin draft": (
+                await _get("/api/v1/news/1", _user("admin", uuid.uuid4()))
+            ).status_code,
+            "student published": (await _get("/api/v1/news/2", student)).status_code,
+        }
+
+    statuses = asyncio.run(run())
+    assert statuses["anonymous draft"] in (401, 403)
+    assert statuses["student draft"] == 404
+    assert statuses["author draft"] == 200
+    assert statuses["admin draft"] == 200
+    assert statuses["student published"] == 200
@@ -0,0 +1,45 @@
+"""Startup with DB_SCHEMA_STARTUP_MODE=auto when the schema is already current."""
+
+import asyncio
+import uuid
+
+from app import main
+from app.core.config import settings
+from app.core.database import AsyncSessionLocalWrite
+from app.models import News, NewsStatus
+
+
+async def _no_ddl(*args, **kwargs):
+    raise AssertionError("startup must not run DDL when the schema is current")
+
+
+async def _schema_current():
+    return True, "revision matches"
+
+
+def test_auto_mode_current_schema_allows_orm_writes(sqlite_db, monkeypatch):
+    monkeypatch.setattr(settings, "DB_SCHEMA_STARTUP_MODE", "auto")
+    monkeypatch.setattr(settings, "SUPABASE_JWKS_URL", None)
+    monkeypatch.setattr(main, "check_schema_current", _schema_current)
+    monkeypatch.setattr(main, "init_database", _no_ddl)
+    monkeypatch.setattr(main, "create_tables_orm", _no_ddl)
+
+    async def run():
+        await sqlite_db(News)
+        async with main.app.router.lifespan_context(main.app):
+            # News.author_id -> auth.users.id: the flush needs the auth.users stub
+            async with AsyncSessionLocalWrite() as session:
+                session.add(
+                    News(
+                        title="Thông báo",
+                        slug="thong-bao",
+                        content="Nội dung",
+                        author_id=uuid.uuid4(),
+                        author_name="Admin",
+                        status=NewsStatus.PUBLISHED,
+                    )
+                )
+                await session.commit()
+                return (await session.get(News, 1)).slug
+
+    assert asyncio.run(run()) == "thong-bao"